@@ -0,0 +1,229 @@
+import copy
+import hmac
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from .models import PREFIX_LENGTH, AuthToken, hash_key
+
+CACHE_ALIAS = "tokens"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_timeout():
+    return getattr(settings, "ACCOUNTS_TOKEN_CACHE_TIMEOUT", 60)
+
+
+def get_size():
+    return getattr(settings, "ACCOUNTS_TOKEN_CACHE_SIZE", 10000)
+
+
+def get_shared_cache():
+    """
+    The cache the processes share authenticated tokens in, or None if none
+    is configured
+    """
+    if CACHE_ALIAS not in settings.CACHES:
+        return None
+    return caches[CACHE_ALIAS]
+
+
+def get_legacy_tokens():
+    return getattr(settings, "ACCOUNTS_LEGACY_TOKENS", True)
+
+
+def shared_key(digest):
+    return f"token:{digest}"
+
+
+class TokenCache:
+    """
+    The users of recently authenticated tokens, by digest of their keys,
+    least recently used ones evicted first, each kept for a limited time
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.user_keys = defaultdict(set)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, user, token = entry
+            if expires <= time.monotonic():
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return user, token
+
+    def set(self, key, user, token, size, timeout):
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = (time.monotonic() + timeout, user, token)
+            self.user_keys[user.pk].add(key)
+            while len(self.entries) > size:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            user_id = entry[1].pk
+            self.user_keys[user_id].discard(key)
+            if not self.user_keys[user_id]:
+                del self.user_keys[user_id]
+
+    def discard(self, keys=(), user_ids=()):
+        with self.lock:
+            for user_id in user_ids:
+                keys = [*keys, *self.user_keys.get(user_id, ())]
+            for key in keys:
+                self.remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.user_keys.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+tokens = TokenCache()
+
+
+def count(event):
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def token_cache_stats():
+    """Hits of this process' and of the shared cache, and misses"""
+    with _stats_lock:
+        return {
+            event: _stats[event]
+            for event in ("hits", "shared_hits", "misses")
+        }
+
+
+def reset_token_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def forget_tokens(digests=(), user_ids=()):
+    """
+    Drop tokens from the caches, given by the digests of their keys or by
+    their users.
+    Processes other than this one keep their copy of the users for up to
+    ACCOUNTS_TOKEN_CACHE_TIMEOUT seconds. Tokens are dropped again after the
+    transaction commits, since another request could have cached the rows
+    before the change was visible
+    """
+    digests = list(digests)
+
+    def forget():
+        tokens.discard(digests, user_ids)
+        cache = get_shared_cache()
+        if cache is not None and digests:
+            cache.delete_many([shared_key(digest) for digest in digests])
+
+    forget()
+    if connection.in_atomic_block:
+        transaction.on_commit(forget)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication remembering the user of a token for a while, in the
+    process and optionally in the `tokens` cache, instead of looking both up
+    on every request. Deleting a token, or saving its user, e.g. to
+    deactivate them, drops it. Requests get their own copy of the user
+    """
+
+    def lookup(self, key):
+        """The user and token of a key, verified against the database"""
+        return super().authenticate_credentials(key)
+
+    def get_cache_timeout(self, token):
+        return get_timeout()
+
+    def authenticate_credentials(self, key):
+        size = get_size()
+        if size <= 0:
+            return self.lookup(key)
+        # token keys are credentials, they aren't kept as is
+        digest = hash_key(key)
+        entry = tokens.get(digest)
+        if entry is not None:
+            count("hits")
+        else:
+            cache = get_shared_cache()
+            entry = (
+                cache.get(shared_key(digest)) if cache is not None else None
+            )
+            if entry is not None:
+                count("shared_hits")
+            else:
+                count("misses")
+                entry = self.lookup(key)
+                if cache is not None:
+                    cache.set(
+                        shared_key(digest),
+                        entry,
+                        self.get_cache_timeout(entry[1]),
+                    )
+            tokens.set(
+                digest, *entry, size, self.get_cache_timeout(entry[1])
+            )
+        user, token = copy.copy(entry[0]), copy.copy(entry[1])
+        token.user = user
+        return user, token
+
+
+class HashedTokenAuthentication(CachedTokenAuthentication):
+    """
+    Authenticates the expiring tokens of which only digests are stored, see
+    AuthToken, finding them by the prefix of their key, then comparing the
+    digests in constant time. Tokens of rest_framework.authtoken still work
+    as long as ACCOUNTS_LEGACY_TOKENS is set
+    """
+
+    def lookup(self, key):
+        token = (
+            AuthToken.objects.select_related("user")
+            .filter(prefix=key[:PREFIX_LENGTH])
+            .first()
+        )
+        if token is None:
+            if get_legacy_tokens():
+                return super().lookup(key)
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        # the prefix alone doesn't prove anything
+        if not hmac.compare_digest(token.digest, hash_key(key)):
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if token.has_expired():
+            raise exceptions.AuthenticationFailed(_("Token has expired."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _("User inactive or deleted.")
+            )
+        return token.user, token
+
+    def get_cache_timeout(self, token):
+        timeout = super().get_cache_timeout(token)
+        if getattr(token, "expires", None) is None:
+            return timeout
+        # not a moment longer than the token is valid
+        remaining = (token.expires - timezone.now()).total_seconds()
+        return int(max(0, min(timeout, remaining)))
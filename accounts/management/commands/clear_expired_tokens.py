@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from accounts.models import AuthToken
+
+
+class Command(BaseCommand):
+    help = "Delete the tokens which have expired"
+
+    def handle(self, *args, **options):
+        deleted, _ = AuthToken.objects.expired().delete()
+        self.stdout.write(f"Deleted {deleted} expired tokens")
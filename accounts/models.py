@@ -1,6 +1,84 @@
-from django.db import models
+import hashlib
+import secrets
+from datetime import timedelta
+from django.db import IntegrityError, models, transaction
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+
+# characters of a token key stored as is to find the token by
+PREFIX_LENGTH = 8
 
 
 class User(AbstractUser):
     pass
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def get_lifetime():
+    days = getattr(settings, "ACCOUNTS_TOKEN_LIFETIME_DAYS", 30)
+    return timedelta(days=days) if days > 0 else None
+
+
+class AuthTokenQuerySet(models.QuerySet):
+    def expired(self, now=None):
+        return self.filter(expires__lte=now or timezone.now())
+
+    def issue(self, user, name="", attempts=5):
+        """
+        Create a token for the user and return it with its key, which is
+        not stored and can't be recovered later
+        """
+        lifetime = get_lifetime()
+        for attempt in range(attempts):
+            key = secrets.token_hex(20)
+            try:
+                # a savepoint, so that a taken prefix doesn't break the
+                # transaction of the caller
+                with transaction.atomic():
+                    token = self.create(
+                        user=user,
+                        prefix=key[:PREFIX_LENGTH],
+                        digest=hash_key(key),
+                        name=name,
+                        expires=(
+                            timezone.now() + lifetime if lifetime else None
+                        ),
+                    )
+            except IntegrityError:
+                if attempt == attempts - 1:
+                    raise
+            else:
+                return token, key
+
+
+class AuthToken(models.Model):
+    """
+    An API token of a user, who can have several, e.g. one per device. Only
+    a digest of its key is stored, the first characters of which are kept
+    as is to find the token by
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="auth_tokens",
+        on_delete=models.CASCADE,
+    )
+    prefix = models.CharField(max_length=PREFIX_LENGTH, unique=True)
+    digest = models.CharField(max_length=64)
+    name = models.CharField(max_length=100, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField(null=True, blank=True)
+
+    objects = AuthTokenQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.prefix}... of {self.user_id}"
+
+    def has_expired(self, now=None):
+        return self.expires is not None and self.expires <= (
+            now or timezone.now()
+        )
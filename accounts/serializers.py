@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from .models import AuthToken
 
 
 User = get_user_model()
@@ -10,3 +11,10 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "first_name", "last_name", "email"]
+
+
+class TokenSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = AuthToken
+        fields = ["id", "name", "prefix", "created", "expires"]
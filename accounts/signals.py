@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import forget_tokens
+from .models import AuthToken, hash_key
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def forget_changed_token(sender, instance, **kwargs):
+    forget_tokens(digests=[hash_key(instance.key)])
+
+
+@receiver(post_save, sender=AuthToken)
+@receiver(post_delete, sender=AuthToken)
+def forget_changed_auth_token(sender, instance, **kwargs):
+    forget_tokens(digests=[instance.digest])
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    # requests get the cached user, which has to be deactivated, lose
+    # permissions or be renamed with it
+    if created:
+        return
+    keys = Token.objects.filter(user=instance).values_list("key", flat=True)
+    forget_tokens(
+        digests=[
+            *map(hash_key, keys),
+            *instance.auth_tokens.values_list("digest", flat=True),
+        ],
+        user_ids=[instance.pk],
+    )
@@ -19,4 +19,4 @@ class UserTests(APITestCase):
         self.client.force_authenticate(user=user)
         response = self.client.get(users_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["username"], "jim")
+        self.assertEqual(response.data["results"][0]["username"], "jim")
@@ -0,0 +1,225 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import connection, reset_queries
+from django.core.management import call_command
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from accounts.authentication import (
+    HashedTokenAuthentication,
+    reset_token_cache_stats,
+    token_cache_stats,
+    tokens,
+)
+from accounts.models import PREFIX_LENGTH, AuthToken, hash_key
+
+User = get_user_model()
+
+SHARED_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    "tokens": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tokens-tests",
+    },
+}
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        tokens.clear()
+        reset_token_cache_stats()
+        self.addCleanup(tokens.clear)
+        self.user = User.objects.create_user(username="jim", password="123456")
+        self.token, self.key = AuthToken.objects.issue(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.key}")
+
+    def count_queries(self, url):
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_token_is_looked_up_once(self):
+        for url in (reverse("reservations-list"), reverse("rooms-list")):
+            with self.subTest(url=url):
+                tokens.clear()
+                first = self.count_queries(url)
+                self.assertEqual(self.count_queries(url), first - 1)
+        self.assertEqual(
+            token_cache_stats(), {"hits": 2, "shared_hits": 0, "misses": 2}
+        )
+
+    @override_settings(ACCOUNTS_TOKEN_CACHE_SIZE=0)
+    def test_disabled(self):
+        url = reverse("rooms-list")
+        self.assertEqual(self.count_queries(url), self.count_queries(url))
+        self.assertEqual(len(tokens), 0)
+
+    def test_deleted_tokens_are_forgotten(self):
+        url = reverse("rooms-list")
+        self.client.get(url)
+        self.token.delete()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_users_are_forgotten(self):
+        url = reverse("rooms-list")
+        self.client.get(url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_requests_get_their_own_user(self):
+        authentication = HashedTokenAuthentication()
+        user, token = authentication.authenticate_credentials(self.key)
+        user.username = "changed"
+        again, token = authentication.authenticate_credentials(self.key)
+        self.assertEqual(again.username, "jim")
+        self.assertIs(token.user, again)
+
+    @override_settings(ACCOUNTS_TOKEN_CACHE_SIZE=1)
+    def test_least_recently_used_tokens_are_evicted(self):
+        _, other = AuthToken.objects.issue(
+            User.objects.create_user(username="tom", password="123456")
+        )
+        authentication = HashedTokenAuthentication()
+        authentication.authenticate_credentials(self.key)
+        authentication.authenticate_credentials(other)
+        self.assertEqual(len(tokens), 1)
+        with self.assertNumQueries(1):
+            authentication.authenticate_credentials(self.key)
+
+    @override_settings(ACCOUNTS_TOKEN_CACHE_TIMEOUT=10)
+    def test_tokens_expire(self):
+        authentication = HashedTokenAuthentication()
+        with mock.patch("accounts.authentication.time.monotonic") as clock:
+            clock.return_value = 100
+            authentication.authenticate_credentials(self.key)
+            clock.return_value = 109
+            with self.assertNumQueries(0):
+                authentication.authenticate_credentials(self.key)
+            clock.return_value = 110
+            with self.assertNumQueries(1):
+                authentication.authenticate_credentials(self.key)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_shared_cache(self):
+        authentication = HashedTokenAuthentication()
+        authentication.authenticate_credentials(self.key)
+        # as in another process
+        tokens.clear()
+        with self.assertNumQueries(0):
+            user, _ = authentication.authenticate_credentials(self.key)
+        self.assertEqual(user, self.user)
+        self.assertEqual(token_cache_stats()["shared_hits"], 1)
+
+        tokens.clear()
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            authentication.authenticate_credentials(self.key)
+
+
+class HashedTokenTests(APITestCase):
+    def setUp(self):
+        tokens.clear()
+        self.addCleanup(tokens.clear)
+        self.user = User.objects.create_user(username="jim", password="123456")
+        self.authentication = HashedTokenAuthentication()
+
+    def obtain(self, **data):
+        response = self.client.post(
+            "/api-token-auth/",
+            {"username": "jim", "password": "123456", **data},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def assertRejected(self, key, message="Invalid token."):
+        with self.assertRaisesMessage(
+            exceptions.AuthenticationFailed, message
+        ):
+            self.authentication.authenticate_credentials(key)
+
+    def test_obtain_several_tokens(self):
+        phone = self.obtain(name="phone")
+        laptop = self.obtain()
+        self.assertNotEqual(phone["token"], laptop["token"])
+        token = AuthToken.objects.get(id=phone["id"])
+        self.assertEqual(token.name, "phone")
+        self.assertEqual(token.prefix, phone["token"][:PREFIX_LENGTH])
+        self.assertEqual(token.digest, hash_key(phone["token"]))
+        self.assertNotIn(phone["token"], token.digest)
+        self.assertAlmostEqual(
+            token.expires,
+            timezone.now() + timedelta(days=30),
+            delta=timedelta(minutes=1),
+        )
+        for data in (phone, laptop):
+            user, _ = self.authentication.authenticate_credentials(
+                data["token"]
+            )
+            self.assertEqual(user, self.user)
+
+    def test_keys_have_to_match_the_whole_digest(self):
+        token, key = AuthToken.objects.issue(self.user)
+        forged = key[:PREFIX_LENGTH].ljust(len(key), "0")
+        self.assertRejected(forged)
+        self.assertRejected("unknown")
+
+    def test_expired_tokens_are_rejected(self):
+        token, key = AuthToken.objects.issue(self.user)
+        token.expires = timezone.now() + timedelta(seconds=5)
+        token.save()
+        self.authentication.authenticate_credentials(key)
+        with mock.patch("accounts.authentication.time.monotonic") as clock:
+            # the cached token expires with it
+            clock.return_value = 10 ** 9
+            token.expires = timezone.now() - timedelta(seconds=1)
+            AuthToken.objects.filter(id=token.id).update(
+                expires=token.expires
+            )
+            self.assertRejected(key, "Token has expired.")
+
+        out = StringIO()
+        call_command("clear_expired_tokens", stdout=out)
+        self.assertEqual(out.getvalue().strip(), "Deleted 1 expired tokens")
+        self.assertFalse(AuthToken.objects.exists())
+
+    @override_settings(ACCOUNTS_TOKEN_LIFETIME_DAYS=0)
+    def test_tokens_without_expiry(self):
+        token, _ = AuthToken.objects.issue(self.user)
+        self.assertIsNone(token.expires)
+
+    def test_legacy_tokens(self):
+        legacy = Token.objects.create(user=self.user)
+        user, _ = self.authentication.authenticate_credentials(legacy.key)
+        self.assertEqual(user, self.user)
+        tokens.clear()
+        with override_settings(ACCOUNTS_LEGACY_TOKENS=False):
+            self.assertRejected(legacy.key)
+
+    def test_list_and_revoke_tokens(self):
+        key = self.obtain(name="phone")["token"]
+        other = User.objects.create_user(username="tom", password="123456")
+        AuthToken.objects.issue(other)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+
+        response = self.client.get(reverse("tokens-list"))
+        self.assertEqual(
+            [token["name"] for token in response.data["results"]], ["phone"]
+        )
+        self.assertNotIn("digest", response.data["results"][0])
+        response = self.client.delete(
+            reverse("tokens-detail", args=[response.data["results"][0]["id"]])
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(reverse("tokens-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
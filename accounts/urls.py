@@ -1,5 +1,6 @@
 from rest_framework import routers
-from . views import UserViewset
+from . views import TokenViewset, UserViewset
 
 router = routers.SimpleRouter()
 router.register(r"users", UserViewset, basename="users")
+router.register(r"tokens", TokenViewset, basename="tokens")
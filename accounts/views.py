@@ -1,6 +1,9 @@
-from rest_framework import viewsets
+from rest_framework import mixins, viewsets
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from django.contrib.auth import get_user_model
-from . serializers import UserSerializer
+from .models import AuthToken
+from . serializers import TokenSerializer, UserSerializer
 
 User = get_user_model()
 
@@ -8,3 +11,35 @@ User = get_user_model()
 class UserViewset(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+
+
+class ObtainTokenView(ObtainAuthToken):
+    """
+    Issue a new token for the credentials, optionally named, e.g. after the
+    device it is used on. Its key is only ever shown in this response
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, key = AuthToken.objects.issue(
+            serializer.validated_data["user"],
+            name=str(request.data.get("name", ""))[:100],
+        )
+        return Response({"token": key, **TokenSerializer(token).data})
+
+
+class TokenViewset(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """The tokens of the user, deleting one revokes it"""
+
+    serializer_class = TokenSerializer
+
+    def get_queryset(self):
+        return AuthToken.objects.filter(user=self.request.user).order_by(
+            "-created"
+        )
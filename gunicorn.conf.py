@@ -0,0 +1,22 @@
+# Production server: gunicorn -c gunicorn.conf.py meetings.asgi:application
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(
+    os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+)
+# uvicorn workers serve the ASGI application, with the async views and the
+# room event streams. Sync views run in a thread of each worker and the
+# async views' queries in a pool of threads, all of them sharing
+# DATABASE_POOL_SIZE connections handed back after every request
+worker_class = os.environ.get(
+    "GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker"
+)
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+# restart workers now and then, with jitter so they don't all at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
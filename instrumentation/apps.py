@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class InstrumentationConfig(AppConfig):
+    name = "instrumentation"
+
+    def ready(self):
+        from .middleware import (
+            install_query_measurement,
+            install_serialization_measurement,
+        )
+
+        connection_created.connect(install_query_measurement)
+        install_serialization_measurement()
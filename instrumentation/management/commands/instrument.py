@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from instrumentation.recorder import recorder
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Request API paths repeatedly with every request instrumented and "
+        "print the query counts and timing percentiles of each view"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="+",
+            help="Paths to GET, e.g. /api/reservations/?user_id=1",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of requests per path",
+        )
+        parser.add_argument(
+            "--username",
+            help="User to authenticate as, the first superuser by default",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["username"]:
+            user = users.filter(username=options["username"]).first()
+        else:
+            user = users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("No user to authenticate the requests as")
+
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(user=user)
+        recorder.clear()
+        with override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0):
+            for path in options["paths"]:
+                for _ in range(options["repeat"]):
+                    client.get(path)
+
+        self.stdout.write(
+            f"{'view':<32} {'requests':>8} {'queries':>8} "
+            f"{'sql p50':>8} {'serialize p50':>13} {'render p50':>10} "
+            f"{'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for view, entry in recorder.summary().items():
+            duration = entry["duration"]
+            self.stdout.write(
+                f"{view:<32} {entry['count']:>8} "
+                f"{entry['queries']['p50']:>8} "
+                f"{entry['sql_time']['p50'] * 1000:>8.1f} "
+                f"{entry['serialize_time']['p50'] * 1000:>13.1f} "
+                f"{entry['render_time']['p50'] * 1000:>10.1f} "
+                f"{duration['p50'] * 1000:>8.1f} "
+                f"{duration['p95'] * 1000:>8.1f} "
+                f"{duration['p99'] * 1000:>8.1f}"
+            )
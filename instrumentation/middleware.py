@@ -0,0 +1,180 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from rest_framework.serializers import BaseSerializer
+from .recorder import Sample, get_sample_rate, recorder
+
+# the measurement of the request being handled, which follows it into the
+# threads async views run their queries in
+current_measurement = ContextVar("current_measurement", default=None)
+# whether data is being serialized, so nested serializers aren't timed twice
+serializing = ContextVar("serializing", default=False)
+
+
+class RequestMeasurement:
+    """
+    Counts and times the SQL queries of a request, and times the
+    serialization of its data and the rendering of its response
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        # queries of async views can run in several threads at once
+        self.lock = threading.Lock()
+
+    def add_query(self, duration):
+        with self.lock:
+            self.sql_time += duration
+            self.queries += 1
+
+    def add_serialization(self, duration):
+        with self.lock:
+            self.serialize_time += duration
+
+
+def measure_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper, installed on every connection, timing the
+    queries of measured requests
+    """
+    measurement = current_measurement.get()
+    if measurement is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        measurement.add_query(time.perf_counter() - started)
+
+
+def install_query_measurement(sender, connection, **kwargs):
+    """connection_created receiver adding measure_queries to connections"""
+    if measure_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(measure_queries)
+
+
+@contextmanager
+def measure_serialization():
+    """
+    Time building the data of a measured response, queries it runs
+    included, unless it is part of data already being timed. Also usable
+    as a decorator, e.g. of functions building data without serializers
+    """
+    measurement = current_measurement.get()
+    if measurement is None or serializing.get():
+        yield
+        return
+    token = serializing.set(True)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        measurement.add_serialization(time.perf_counter() - started)
+        serializing.reset(token)
+
+
+def install_serialization_measurement():
+    """
+    Time the data of serializers, which every serializer class gets from
+    BaseSerializer.data, whether it is a single object or a list
+    """
+    data = BaseSerializer.data.fget
+    if getattr(data, "measured", False):
+        return
+
+    def measured_data(serializer):
+        with measure_serialization():
+            return data(serializer)
+
+    measured_data.measured = True
+    BaseSerializer.data = property(measured_data)
+
+
+class InstrumentationMiddleware:
+    """
+    Record the number of queries, the SQL time, the serialization time, the
+    rendering time and the total duration of a sample of requests, `INSTRUMENTATION_SAMPLE_RATE`
+    of them. Requests which are not sampled only cost a random number.
+    Works for both WSGI and ASGI, so async views stay async
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # marks the instance as a coroutine function for Django, like
+            # MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        measurement = request.instrumentation = RequestMeasurement()
+        token = current_measurement.set(measurement)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_measurement.reset(token)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        measurement = request.instrumentation = RequestMeasurement()
+        token = current_measurement.set(measurement)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_measurement.reset(token)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    def sampled(self):
+        rate = get_sample_rate()
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def record(self, request, response, duration):
+        measurement = request.instrumentation
+        match = request.resolver_match
+        recorder.record(
+            Sample(
+                view=match.view_name if match else "unresolved",
+                method=request.method,
+                status=response.status_code,
+                queries=measurement.queries,
+                sql_time=measurement.sql_time,
+                serialize_time=measurement.serialize_time,
+                render_time=measurement.render_time,
+                duration=duration,
+                timestamp=time.time(),
+            )
+        )
+
+    def process_template_response(self, request, response):
+        """
+        Called right before the response, e.g. a DRF one, is rendered
+        """
+        measurement = getattr(request, "instrumentation", None)
+        if measurement is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                measurement.render_time = time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
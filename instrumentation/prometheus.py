@@ -0,0 +1,72 @@
+from rest_framework.renderers import BaseRenderer
+from .recorder import QUANTILES, quantile_key
+
+# metric name, measurement and help text of every exported summary
+SUMMARIES = (
+    (
+        "meetings_request_duration_seconds",
+        "duration",
+        "Total time spent handling requests",
+    ),
+    (
+        "meetings_request_sql_seconds",
+        "sql_time",
+        "Time spent in SQL queries per request",
+    ),
+    (
+        "meetings_request_serialize_seconds",
+        "serialize_time",
+        "Time spent serializing response data",
+    ),
+    (
+        "meetings_request_render_seconds",
+        "render_time",
+        "Time spent rendering responses",
+    ),
+    ("meetings_request_queries", "queries", "SQL queries per request"),
+)
+
+
+def escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def to_prometheus(summary):
+    """
+    Render a recorder summary in the Prometheus text exposition format.
+    Quantiles cover the buffered samples, sums and counts all of them
+    """
+    lines = []
+    for name, metric, help_text in SUMMARIES:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} summary")
+        for view, entry in summary.items():
+            label = f'view="{escape(view)}"'
+            for quantile in QUANTILES:
+                value = entry[metric][quantile_key(quantile)]
+                if value is not None:
+                    lines.append(
+                        f'{name}{{{label},quantile="{quantile}"}} {value}'
+                    )
+            lines.append(f"{name}_sum{{{label}}} {entry['totals'][metric]}")
+            lines.append(f"{name}_count{{{label}}} {entry['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = renderer_context and renderer_context.get("response")
+        if response is not None and response.status_code >= 400:
+            return "\n".join(
+                f"# {key}: {value}" for key, value in data.items()
+            ) + "\n"
+        return to_prometheus(data)
@@ -0,0 +1,120 @@
+import math
+import threading
+from collections import defaultdict, deque, namedtuple
+from django.conf import settings
+
+# durations are in seconds
+Sample = namedtuple(
+    "Sample",
+    [
+        "view",
+        "method",
+        "status",
+        "queries",
+        "sql_time",
+        "serialize_time",
+        "render_time",
+        "duration",
+        "timestamp",
+    ],
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# measurements summarized for every view
+METRICS = (
+    "duration",
+    "sql_time",
+    "serialize_time",
+    "render_time",
+    "queries",
+)
+
+
+def get_sample_rate():
+    return getattr(settings, "INSTRUMENTATION_SAMPLE_RATE", 1.0)
+
+
+def get_buffer_size():
+    return getattr(settings, "INSTRUMENTATION_BUFFER_SIZE", 10000)
+
+
+def quantile_key(quantile):
+    return f"p{round(quantile * 100)}"
+
+
+def percentile(ordered, quantile):
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return None
+    rank = max(math.ceil(quantile * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class Recorder:
+    """
+    Keeps the latest request samples in a ring buffer, so memory stays
+    bounded however long the process runs, along with running totals of
+    every sample ever recorded, which Prometheus expects to only grow
+    """
+
+    def __init__(self, size=None):
+        self._size = size
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._samples = deque(maxlen=self._size or get_buffer_size())
+            self._totals = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+            self._counts = defaultdict(int)
+
+    def record(self, sample):
+        with self._lock:
+            self._samples.append(sample)
+            self._counts[sample.view] += 1
+            totals = self._totals[sample.view]
+            for metric in METRICS:
+                totals[metric] += getattr(sample, metric)
+
+    def samples(self):
+        with self._lock:
+            return list(self._samples)
+
+    def summary(self):
+        """
+        Per view percentiles of every measurement over the buffered samples,
+        and the totals over all samples
+        """
+        with self._lock:
+            samples = list(self._samples)
+            totals = {
+                view: dict(values) for view, values in self._totals.items()
+            }
+            counts = dict(self._counts)
+
+        by_view = defaultdict(list)
+        for sample in samples:
+            by_view[sample.view].append(sample)
+
+        summary = {}
+        for view in sorted(counts):
+            view_samples = by_view.get(view, [])
+            entry = {
+                "count": counts[view],
+                "buffered": len(view_samples),
+                "totals": totals[view],
+            }
+            for metric in METRICS:
+                ordered = sorted(
+                    getattr(sample, metric) for sample in view_samples
+                )
+                entry[metric] = {
+                    quantile_key(quantile): percentile(ordered, quantile)
+                    for quantile in QUANTILES
+                }
+            summary[view] = entry
+        return summary
+
+
+recorder = Recorder()
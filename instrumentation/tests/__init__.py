@@ -0,0 +1,2 @@
+from .recorder import *
+from .api import *
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from instrumentation.recorder import recorder
+from reservations.models import MeetingRoom
+
+User = get_user_model()
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0)
+class InstrumentationApiTests(APITestCase):
+    def setUp(self):
+        recorder.clear()
+        self.admin = User.objects.create(
+            username="admin", password="123456", is_staff=True
+        )
+        self.user = User.objects.create(username="jim", password="123456")
+        MeetingRoom.objects.create(title="Board room")
+
+    def test_requests_are_measured_per_view(self):
+        self.client.force_authenticate(user=self.user)
+        for _ in range(3):
+            self.client.get(reverse("rooms-list"))
+
+        [sample] = {
+            (sample.view, sample.queries) for sample in recorder.samples()
+        }
+        self.assertEqual(sample, ("rooms-list", 2))
+        summary = recorder.summary()["rooms-list"]
+        self.assertEqual(summary["count"], 3)
+        self.assertGreater(summary["duration"]["p50"], 0)
+        self.assertGreater(summary["render_time"]["p50"], 0)
+        self.assertGreaterEqual(
+            summary["duration"]["p99"], summary["sql_time"]["p99"]
+        )
+
+    def test_serialization_is_measured_with_and_without_serializers(self):
+        self.client.force_authenticate(user=self.user)
+        for fast_reads in (True, False):
+            with self.subTest(fast_reads=fast_reads), override_settings(
+                RESERVATIONS_FAST_READS=fast_reads
+            ):
+                recorder.clear()
+                self.client.get(reverse("rooms-list"))
+                [sample] = recorder.samples()
+                self.assertGreater(sample.serialize_time, 0)
+                self.assertLess(sample.serialize_time, sample.duration)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_requests_can_be_left_out(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get(reverse("rooms-list"))
+        self.assertEqual(recorder.samples(), [])
+
+    def test_stats_are_only_shown_to_admins(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("instrumentation-stats"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        self.client.get(reverse("rooms-list"))
+        response = self.client.get(reverse("instrumentation-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["views"]["rooms-list"]["count"], 1)
+
+    def test_metrics_are_exported_for_prometheus(self):
+        self.client.force_authenticate(user=self.admin)
+        self.client.get(reverse("rooms-list"))
+        response = self.client.get(reverse("instrumentation-metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            b'meetings_request_queries_count{view="rooms-list"} 1',
+            response.content,
+        )
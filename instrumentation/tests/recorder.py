@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase
+from instrumentation.prometheus import to_prometheus
+from instrumentation.recorder import Recorder, Sample, percentile
+
+
+def sample(view, duration, queries=1):
+    return Sample(
+        view, "GET", 200, queries, duration / 2, 0.002, 0.001, duration, 0
+    )
+
+
+class RecorderTests(SimpleTestCase):
+    def test_percentiles_use_nearest_rank(self):
+        ordered = list(range(1, 101))
+        self.assertEqual(percentile(ordered, 0.5), 50)
+        self.assertEqual(percentile(ordered, 0.95), 95)
+        self.assertEqual(percentile(ordered, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_buffer_keeps_the_latest_samples_and_all_totals(self):
+        recorder = Recorder(size=3)
+        for duration in (10, 1, 2, 3):
+            recorder.record(sample("rooms-list", duration))
+
+        summary = recorder.summary()["rooms-list"]
+        self.assertEqual(len(recorder.samples()), 3)
+        self.assertEqual(summary["count"], 4)
+        self.assertEqual(summary["buffered"], 3)
+        self.assertEqual(summary["duration"]["p99"], 3)
+        self.assertEqual(summary["totals"]["duration"], 16)
+
+    def test_summary_is_exported_as_prometheus_text(self):
+        recorder = Recorder(size=10)
+        recorder.record(sample("rooms-list", 0.5, queries=3))
+        text = to_prometheus(recorder.summary())
+        self.assertIn(
+            "# TYPE meetings_request_duration_seconds summary", text
+        )
+        self.assertIn(
+            'meetings_request_duration_seconds{view="rooms-list",'
+            'quantile="0.99"} 0.5',
+            text,
+        )
+        self.assertIn(
+            'meetings_request_queries_sum{view="rooms-list"} 3', text
+        )
+        self.assertIn(
+            'meetings_request_queries_count{view="rooms-list"} 1', text
+        )
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import MetricsView, StatsView
+
+urlpatterns = [
+    path("stats/", StatsView.as_view(), name="instrumentation-stats"),
+    path("metrics/", MetricsView.as_view(), name="instrumentation-metrics"),
+]
@@ -0,0 +1,32 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .prometheus import PrometheusRenderer
+from .recorder import get_sample_rate, recorder
+
+
+class StatsView(APIView):
+    """
+    Query counts, SQL time, serialization time, rendering time and duration
+    percentiles of the recently sampled requests of every view in this
+    process
+    """
+
+    permission_classes = [IsAdminUser]
+    renderer_classes = [JSONRenderer]
+
+    def get(self, request):
+        return Response(
+            {"sample_rate": get_sample_rate(), "views": recorder.summary()}
+        )
+
+
+class MetricsView(APIView):
+    """The same measurements in the Prometheus text format"""
+
+    permission_classes = [IsAdminUser]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request):
+        return Response(recorder.summary())
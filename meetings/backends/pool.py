@@ -0,0 +1,246 @@
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger("django")
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    A bounded set of open database connections shared by the threads of a
+    process. Connections are handed out most recently used first, so the
+    ones left idle after a burst are the ones closed when the pool is. A
+    thread asking for one while all are in use waits up to `timeout`
+    seconds for another thread to release one
+    """
+
+    def __init__(self, size, timeout=30):
+        self.size = size
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.idle = []
+        self.checked_out = 0
+        self.stats = Counter()
+
+    def acquire(self, connect, check=None):
+        """
+        An idle connection, or a new one from `connect()` if there is none.
+        Idle connections failing `check(connection)` are closed and skipped
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.stats["waits"] += 1
+            if not self.slots.acquire(timeout=self.timeout):
+                raise PoolTimeout(
+                    f"No database connection was released within "
+                    f"{self.timeout} seconds, all {self.size} are in use"
+                )
+        try:
+            while True:
+                with self.lock:
+                    connection = self.idle.pop() if self.idle else None
+                if connection is None:
+                    connection, reused = connect(), False
+                    break
+                if check is None or check(connection):
+                    reused = True
+                    break
+                with self.lock:
+                    self.stats["discarded"] += 1
+                close_quietly(connection)
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.checked_out += 1
+            self.stats["reused" if reused else "created"] += 1
+        return connection, reused
+
+    def release(self, connection, check=None):
+        """
+        Hand a connection back, rolling back whatever transaction it was
+        left in. Connections which fail that, or `check(connection)`
+        afterwards, are closed instead
+        """
+        discard = False
+        try:
+            try:
+                connection.rollback()
+                discard = check is not None and not check(connection)
+            except Exception:
+                discard = True
+            if discard:
+                close_quietly(connection)
+        finally:
+            with self.lock:
+                if discard:
+                    self.stats["discarded"] += 1
+                else:
+                    self.idle.append(connection)
+                self.checked_out -= 1
+            self.slots.release()
+
+    def close(self):
+        """Close the idle connections"""
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            close_quietly(connection)
+
+
+def close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        logger.warning("Failed to close a database connection", exc_info=True)
+
+
+def get_pool(key, size, timeout):
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(size, timeout)
+        return pool
+
+
+def close_pools():
+    """
+    Close the idle connections of every pool, e.g. before the database they
+    are connected to is dropped
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    """Connections created, reused, discarded and waits for one, by pool"""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        key[0]: {
+            **{
+                event: pool.stats[event]
+                for event in ("created", "reused", "discarded", "waits")
+            },
+            "idle": len(pool.idle),
+            "in_use": pool.checked_out,
+        }
+        for key, pool in pools
+    }
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Adds to a database backend of Django 3.1:
+
+    - `POOL_SIZE`: connections are taken from a pool of the process shared
+      by its threads, and handed back instead of being closed, at the end of
+      every request whatever `CONN_MAX_AGE` is. A thread keeping one would
+      hold its slot until its next request, or for good once it ends. 0
+      disables it. `POOL_TIMEOUT` is how long to wait for one when all are
+      in use.
+    - `CONN_HEALTH_CHECKS`, like Django 4.1's: a connection kept from a
+      previous request, or taken from the pool, is checked before its first
+      query, and replaced if the database server dropped it.
+    """
+
+    health_check_done = False
+    connection_pool = None
+    # whether the current connection was taken from the pool
+    connection_reused = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get("CONN_HEALTH_CHECKS", False)
+
+    def get_pool(self, conn_params):
+        size = self.settings_dict.get("POOL_SIZE") or 0
+        if size <= 0:
+            return None
+        key = (self.alias, repr(sorted(conn_params.items())), size)
+        return get_pool(key, size, self.settings_dict.get("POOL_TIMEOUT", 30))
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        if pool is None:
+            self.connection_reused = False
+            return super().get_new_connection(conn_params)
+        try:
+            connection, self.connection_reused = pool.acquire(
+                lambda: super(
+                    PooledDatabaseWrapperMixin, self
+                ).get_new_connection(conn_params),
+                self.ping if self.health_check_enabled else None,
+            )
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error))
+        self.connection_pool = pool
+        return connection
+
+    def ping(self, connection):
+        """
+        Whether a connection outside of a transaction still works, unlike
+        is_usable() which doesn't check SQLite's
+        """
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+            connection.rollback()
+        except self.Database.Error:
+            return False
+        return True
+
+    def connect(self):
+        super().connect()
+        # a pooled connection was checked as it was taken
+        self.health_check_done = True
+
+    def _close(self):
+        pool = self.connection_pool
+        if pool is None:
+            return super()._close()
+        self.connection_pool = None
+        # a connection which had errors may have been dropped
+        pool.release(
+            self.connection, self.ping if self.errors_occurred else None
+        )
+
+    def close_if_unusable_or_obsolete(self):
+        self.health_check_done = False
+        if self.connection is not None and self.connection_pool is not None:
+            self.close()
+            return
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        """
+        Replace a connection the server dropped before its first query in a
+        request. A connection in a transaction can't be replaced anyway
+        """
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+            or self.in_atomic_block
+        ):
+            return
+        if not self.ping(self.connection):
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
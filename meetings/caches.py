@@ -0,0 +1,28 @@
+from urllib.parse import urlparse
+
+BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "dummy": "django.core.cache.backends.dummy.DummyCache",
+    # Redis and servers speaking its protocol, with django-redis
+    "redis": "django_redis.cache.RedisCache",
+    "rediss": "django_redis.cache.RedisCache",
+}
+
+
+def parse_cache_url(url):
+    """
+    Build a CACHES entry from a URL, in the spirit of dj-database-url:
+    locmem://name, file:///path/to/dir, redis://host:port/db or dummy://
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in BACKENDS:
+        raise ValueError(f"Unsupported cache URL scheme: {parsed.scheme}")
+    config = {"BACKEND": BACKENDS[parsed.scheme]}
+    if parsed.scheme == "locmem":
+        config["LOCATION"] = parsed.netloc
+    elif parsed.scheme == "file":
+        config["LOCATION"] = parsed.path
+    elif parsed.scheme in ("redis", "rediss"):
+        config["LOCATION"] = url
+    return config
@@ -0,0 +1,24 @@
+# backends of this project adding a connection pool and health checks to
+# Django's, see meetings/backends/pool.py
+BACKENDS = {
+    "django.db.backends.postgresql": "meetings.backends.postgresql",
+    "django.db.backends.postgresql_psycopg2": "meetings.backends.postgresql",
+    "django.db.backends.sqlite3": "meetings.backends.sqlite3",
+}
+
+
+def configure_database(
+    config, conn_max_age=0, health_checks=False, pool_size=0, pool_timeout=30
+):
+    """
+    Complete a DATABASES entry parsed by dj-database-url with the connection
+    settings, switching to this project's backend for the database
+    """
+    config = dict(config)
+    if config.get("ENGINE") in BACKENDS:
+        config["ENGINE"] = BACKENDS[config["ENGINE"]]
+    config["CONN_MAX_AGE"] = conn_max_age
+    config["CONN_HEALTH_CHECKS"] = health_checks
+    config["POOL_SIZE"] = pool_size
+    config["POOL_TIMEOUT"] = pool_timeout
+    return config
@@ -3,11 +3,15 @@ import dj_database_url
 from pathlib import Path
 import sentry_sdk
 from sentry_sdk.integrations.django import DjangoIntegration
+from meetings.caches import parse_cache_url
+from meetings.databases import configure_database
 
 sentry_sdk.init(
     dsn=os.environ.get('SENTRY_URL'),
     integrations=[DjangoIntegration()],
-    traces_sample_rate=1.0,
+    traces_sample_rate=float(
+        os.environ.get('SENTRY_TRACES_SAMPLE_RATE', 1.0)
+    ),
     send_default_pii=True
 )
 
@@ -38,11 +42,13 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'accounts',
     'reservations',
+    'instrumentation',
     'rest_framework',
     'rest_framework.authtoken',
 ]
 
 MIDDLEWARE = [
+    'instrumentation.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,13 +82,83 @@ WSGI_APPLICATION = 'meetings.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# DATABASE_CONN_MAX_AGE is how many seconds a thread keeps its connection
+# for its next requests, 0 closes it after every request. A pool of
+# DATABASE_POOL_SIZE connections shared by the threads of a process hands
+# them back after every request instead, whatever the age, 0 disables it.
+# Health checks replace a kept or pooled connection the database server
+# dropped before it is used
 DATABASES = {
-    "default": dj_database_url.config(
-        default=os.environ.get('DATABASE_URL')
+    "default": configure_database(
+        dj_database_url.config(default=os.environ.get('DATABASE_URL')),
+        conn_max_age=int(os.environ.get('DATABASE_CONN_MAX_AGE', 0)),
+        health_checks=os.environ.get(
+            'DATABASE_CONN_HEALTH_CHECKS', 'true'
+        ).lower() == 'true',
+        pool_size=int(os.environ.get('DATABASE_POOL_SIZE', 0)),
+        pool_timeout=float(os.environ.get('DATABASE_POOL_TIMEOUT', 30)),
     )
 }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # per user reservation lists, e.g. locmem://reservations,
+    # file:///var/tmp/reservations or redis://localhost:6379/1
+    'reservations': parse_cache_url(
+        os.environ.get('RESERVATIONS_CACHE_URL', 'locmem://reservations')
+    ),
+}
+
+# Seconds cached reservation lists are kept for
+RESERVATIONS_CACHE_TIMEOUT = int(
+    os.environ.get('RESERVATIONS_CACHE_TIMEOUT', 300)
+)
+
+# computed utilization reports, e.g. locmem://analytics or
+# redis://localhost:6379/3, they are computed on every request otherwise
+if os.environ.get('RESERVATIONS_ANALYTICS_CACHE_URL'):
+    CACHES['analytics'] = parse_cache_url(
+        os.environ['RESERVATIONS_ANALYTICS_CACHE_URL']
+    )
+
+# Seconds utilization reports are cached for, changes to the reservations
+# only show in them after that
+RESERVATIONS_ANALYTICS_CACHE_TIMEOUT = int(
+    os.environ.get('RESERVATIONS_ANALYTICS_CACHE_TIMEOUT', 3600)
+)
+
+# users of authenticated tokens can be shared by the processes too, e.g.
+# redis://localhost:6379/2, they are only kept by each process otherwise
+if os.environ.get('ACCOUNTS_TOKEN_CACHE_URL'):
+    CACHES['tokens'] = parse_cache_url(
+        os.environ['ACCOUNTS_TOKEN_CACHE_URL']
+    )
+
+# How many authenticated tokens each process remembers the users of, 0
+# looks them up on every request, and for how many seconds. A token
+# deleted, or a user changed, by another process is only forgotten after
+# that time unless the tokens are shared
+ACCOUNTS_TOKEN_CACHE_SIZE = int(
+    os.environ.get('ACCOUNTS_TOKEN_CACHE_SIZE', 10000)
+)
+ACCOUNTS_TOKEN_CACHE_TIMEOUT = int(
+    os.environ.get('ACCOUNTS_TOKEN_CACHE_TIMEOUT', 60)
+)
+
+# Days tokens issued by api-token-auth/ are valid for, 0 for ever
+ACCOUNTS_TOKEN_LIFETIME_DAYS = int(
+    os.environ.get('ACCOUNTS_TOKEN_LIFETIME_DAYS', 30)
+)
+
+# Whether the permanent tokens issued before are still accepted
+ACCOUNTS_LEGACY_TOKENS = (
+    os.environ.get('ACCOUNTS_LEGACY_TOKENS', 'true').lower() == 'true'
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -125,13 +201,28 @@ AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.HashedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'meetings.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
 }
 
+# Encode and decode JSON with orjson, when it is installed, instead of the
+# standard library. Responses are the same either way.
+if os.environ.get('FAST_JSON', 'true').lower() == 'true':
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'meetings.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'meetings.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
 LOGGING = {
     'version':1,
     'disable_existing_loggers': False,
@@ -154,4 +245,73 @@ LOGGING = {
             'style': '{',
             }
         },
-}
\ No newline at end of file
+}
+
+# Check booking conflicts against a process-local sorted index of each room's
+# reservations instead of querying the database. Only suitable when a single
+# process writes reservations.
+RESERVATIONS_INTERVAL_INDEX = (
+    os.environ.get('RESERVATIONS_INTERVAL_INDEX', 'false').lower() == 'true'
+)
+
+# Build reservation and room responses of list and detail requests straight
+# from database rows instead of through the serializers. The output is the
+# same, the serializers are kept as the reference implementation.
+RESERVATIONS_FAST_READS = (
+    os.environ.get('RESERVATIONS_FAST_READS', 'true').lower() == 'true'
+)
+
+# Rooms list the reservations of this many days from now, unless the request
+# gives another window
+RESERVATIONS_ROOM_WINDOW_DAYS = int(
+    os.environ.get('RESERVATIONS_ROOM_WINDOW_DAYS', 30)
+)
+
+# Keep a row per room and day listing its reservations, which rooms/schedule/
+# serves. Turning it off saves the writes, the rows are left stale and have
+# to be rebuilt with rebuild_schedules() when it is turned back on.
+RESERVATIONS_SCHEDULES = (
+    os.environ.get('RESERVATIONS_SCHEDULES', 'true').lower() == 'true'
+)
+
+# What to do when the creator or a guest of a reservation has another meeting
+# at the same time: 'error' turns the reservation down, 'warn' books it and
+# lists the other meetings in the response, 'off' doesn't look them up.
+RESERVATIONS_ATTENDEE_CONFLICTS = os.environ.get(
+    'RESERVATIONS_ATTENDEE_CONFLICTS', 'warn'
+).lower()
+
+# Async availability searches over many rooms split them into up to this many
+# groups of at least RESERVATIONS_ASYNC_FANOUT_MIN_ROOMS rooms, searched
+# concurrently with a database connection each
+RESERVATIONS_ASYNC_FANOUT = int(
+    os.environ.get('RESERVATIONS_ASYNC_FANOUT', 4)
+)
+RESERVATIONS_ASYNC_FANOUT_MIN_ROOMS = int(
+    os.environ.get('RESERVATIONS_ASYNC_FANOUT_MIN_ROOMS', 250)
+)
+
+# Events a room's event stream queues for a slow client before resetting it,
+# and seconds between the comments keeping idle streams open
+RESERVATIONS_EVENTS_QUEUE_SIZE = int(
+    os.environ.get('RESERVATIONS_EVENTS_QUEUE_SIZE', 100)
+)
+RESERVATIONS_EVENTS_HEARTBEAT = float(
+    os.environ.get('RESERVATIONS_EVENTS_HEARTBEAT', 15)
+)
+
+# Send reservation changes to the event streams of every process with
+# PostgreSQL's NOTIFY, needed with more than one worker process. Each
+# process streaming rooms listens with a connection of its own
+RESERVATIONS_EVENTS_NOTIFY = os.environ.get(
+    'RESERVATIONS_EVENTS_NOTIFY', 'false'
+).lower() == 'true'
+
+# Share of requests whose queries and timings are recorded, and how many of
+# the latest samples are kept for the percentiles
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.environ.get('INSTRUMENTATION_SAMPLE_RATE', 0.1)
+)
+INSTRUMENTATION_BUFFER_SIZE = int(
+    os.environ.get('INSTRUMENTATION_BUFFER_SIZE', 10000)
+)
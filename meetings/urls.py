@@ -1,8 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import routers
-from rest_framework.authtoken.views import obtain_auth_token
 from accounts.urls import router as accounts_router
+from accounts.views import ObtainTokenView
+from reservations.urls import async_urlpatterns
 from reservations.urls import router as reservations_router
 
 
@@ -13,5 +14,7 @@ router.registry.extend(reservations_router.registry)
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include(router.urls)),
-    path("api-token-auth/", obtain_auth_token),
+    path("api/async/", include(async_urlpatterns)),
+    path("api/instrumentation/", include("instrumentation.urls")),
+    path("api-token-auth/", ObtainTokenView.as_view()),
 ]
@@ -0,0 +1,282 @@
+import hashlib
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import BigIntegerField, Count, Func
+from django.utils import timezone
+import numpy as np
+from .intervals import recurring_filter, single_filter, window_filter
+from .models import Invitation, MeetingRoom, Reservation
+from .recurrence import Series, occurrences
+from .schedule import day_start
+
+CACHE_ALIAS = "analytics"
+
+# daily occupancy is counted in tenths of a day
+OCCUPANCY_BINS = 10
+PEAK_HOURS = 5
+STATUSES = [status for status, _ in Invitation.STATUS]
+
+
+def get_cache():
+    """The cache of computed reports, or None if none is configured"""
+    if CACHE_ALIAS not in settings.CACHES:
+        return None
+    return caches[CACHE_ALIAS]
+
+
+def get_timeout():
+    return getattr(settings, "RESERVATIONS_ANALYTICS_CACHE_TIMEOUT", 3600)
+
+
+class Epoch(Func):
+    """
+    Whole seconds since the epoch of a datetime, computed by the database,
+    which is several times faster than having each value converted to a
+    datetime and back
+    """
+
+    output_field = BigIntegerField()
+    template = "CAST(EXTRACT(EPOCH FROM %(expressions)s) AS BIGINT)"
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template=(
+                "CAST(ROUND((julianday(%(expressions)s) - 2440587.5) "
+                "* 86400) AS INTEGER)"
+            ),
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="UNIX_TIMESTAMP(%(expressions)s)",
+            **extra_context,
+        )
+
+
+def hour_of_week(seconds):
+    """The hour of the week of the server's time zone, Monday 0:00 is 0"""
+    local = timezone.localtime(
+        datetime.fromtimestamp(seconds, timezone.utc),
+        timezone.get_default_timezone(),
+    )
+    return local.weekday() * 24 + local.hour
+
+
+def busy_intervals(start, end, room_ids=None):
+    """
+    The rooms, starts and ends, in seconds since the epoch, of every
+    reservation and occurrence of a recurring one overlapping [start, end)
+    in the given rooms or in all of them, as arrays
+    """
+    reservations = Reservation.objects.filter(single_filter(start, end))
+    recurring = Reservation.objects.filter(recurring_filter(start, end))
+    if room_ids is not None:
+        reservations = reservations.filter(room_id__in=room_ids)
+        recurring = recurring.filter(room_id__in=room_ids)
+    rows = list(
+        reservations.values_list(
+            "room_id", Epoch("from_date"), Epoch("to_date")
+        )
+    )
+    for row in recurring.values_list("room_id", *Series._fields):
+        rows.extend(
+            (row[0], int(begins.timestamp()), int(ends.timestamp()))
+            for begins, ends in occurrences(Series(*row[1:]), start, end)
+        )
+    if not rows:
+        return tuple(np.zeros(0, dtype=np.int64) for _ in range(3))
+    rooms, starts, ends = np.array(rows, dtype=np.int64).T
+    return rooms, starts, ends
+
+
+def covered(starts, ends, bounds):
+    """
+    How much of the [starts, ends) intervals lies between each two
+    consecutive bounds. The length covered before a bound T is the sum of
+    T - s over the starts s before it less the sum of T - e over the ends e
+    before it, both of which come from sorted prefix sums, so this takes
+    O((n + bounds) log n) whatever the length of the intervals
+    """
+    starts = np.sort(starts)
+    ends = np.sort(ends)
+    start_sums = np.concatenate(([0], np.cumsum(starts)))
+    end_sums = np.concatenate(([0], np.cumsum(ends)))
+    started = np.searchsorted(starts, bounds)
+    ended = np.searchsorted(ends, bounds)
+    before = (
+        bounds * started
+        - start_sums[started]
+        - (bounds * ended - end_sums[ended])
+    )
+    return np.diff(before, axis=-1)
+
+
+def utilization_report(first_day, last_day, room_ids=None):
+    """
+    Room utilization from `first_day` up to and including `last_day`, days
+    of the server's time zone: the booked hours and share of the time of
+    every room, how many of its days were booked for each tenth of the day,
+    the share of every hour of the week booked in all the rooms, the peak
+    ones, and the answers to the invitations of every room's reservations
+    """
+    day_bounds = [
+        day_start(first_day + timedelta(days=day))
+        for day in range((last_day - first_day).days + 2)
+    ]
+    start, end = day_bounds[0], day_bounds[-1]
+    origin = int(start.timestamp())
+    length = int(end.timestamp()) - origin
+
+    rooms = MeetingRoom.objects.order_by("id")
+    if room_ids is not None:
+        rooms = rooms.filter(id__in=room_ids)
+    rooms = list(rooms.values_list("id", "title"))
+    ids = np.array([room_id for room_id, _ in rooms], dtype=np.int64)
+
+    room_of, starts, ends = busy_intervals(start, end, room_ids)
+    index = np.searchsorted(ids, room_of)
+    # rooms created since they were listed
+    known = index < len(ids)
+    known[known] = ids[index[known]] == room_of[known]
+    index = index[known]
+    # seconds from the start of the window, within it
+    starts = np.clip(starts[known] - origin, 0, length)
+    ends = np.clip(ends[known] - origin, 0, length)
+
+    # every room gets its own stretch of a single time line, so that one
+    # pass finds the booked time of every day of every room
+    offsets = index * length
+    day_offsets = np.array(
+        [int(bound.timestamp()) - origin for bound in day_bounds],
+        dtype=np.int64,
+    )
+    room_days = covered(
+        starts + offsets,
+        ends + offsets,
+        np.arange(len(rooms), dtype=np.int64)[:, None] * length + day_offsets,
+    )
+    occupancy = room_days / np.diff(day_offsets)
+    bins = np.minimum(
+        (occupancy * OCCUPANCY_BINS).astype(np.int64), OCCUPANCY_BINS - 1
+    )
+    histograms = np.bincount(
+        (np.arange(len(rooms))[:, None] * OCCUPANCY_BINS + bins).ravel(),
+        minlength=len(rooms) * OCCUPANCY_BINS,
+    ).reshape(len(rooms), OCCUPANCY_BINS)
+    booked = room_days.sum(axis=1)
+
+    # hour bounds in seconds, each labelled with its local hour of the week
+    hour_offsets = np.arange(0, length + 1, 3600, dtype=np.int64)
+    if hour_offsets[-1] != length:
+        hour_offsets = np.append(hour_offsets, length)
+    hours = covered(starts, ends, hour_offsets)
+    labels = np.array(
+        [hour_of_week(origin + int(offset)) for offset in hour_offsets[:-1]],
+        dtype=np.int64,
+    )
+    capacity = np.bincount(
+        labels, weights=np.diff(hour_offsets), minlength=7 * 24
+    ) * max(len(rooms), 1)
+    heatmap = np.divide(
+        np.bincount(labels, weights=hours, minlength=7 * 24),
+        capacity,
+        out=np.zeros(7 * 24),
+        where=capacity > 0,
+    )
+    peaks = np.argsort(-heatmap, kind="stable")[:PEAK_HOURS]
+
+    answers = attendance(start, end, room_ids)
+    return {
+        "from": first_day,
+        "to": last_day,
+        "rooms": [
+            {
+                "id": room_id,
+                "title": title,
+                "booked_hours": round(float(booked[position]) / 3600, 2),
+                "utilization": round(float(booked[position]) / length, 4),
+                "daily_occupancy": histograms[position].tolist(),
+                **answers.get(room_id, empty_answers()),
+            }
+            for position, (room_id, title) in enumerate(rooms)
+        ],
+        "hour_of_week": np.round(heatmap, 4).reshape(7, 24).tolist(),
+        "peak_hours": [
+            {
+                "weekday": int(peak) // 24,
+                "hour": int(peak) % 24,
+                "utilization": round(float(heatmap[peak]), 4),
+            }
+            for peak in peaks
+            if heatmap[peak] > 0
+        ],
+    }
+
+
+def empty_answers():
+    return {
+        "invitations": {status: 0 for status in STATUSES},
+        "attendance": None,
+        "declined": None,
+    }
+
+
+def attendance(start, end, room_ids=None):
+    """
+    The answers to the invitations to the reservations of every room, or of
+    the given ones, overlapping [start, end), and the shares of guests
+    attending and not attending. Counting is left to the database, which
+    returns a row per room and answer
+    """
+    invitations = Invitation.objects.filter(
+        window_filter(start, end, prefix="reservation__")
+    )
+    if room_ids is not None:
+        invitations = invitations.filter(reservation__room_id__in=room_ids)
+    counts = (
+        invitations.values_list("reservation__room_id", "status")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    answers = {}
+    for room_id, status, count in counts:
+        answers.setdefault(room_id, empty_answers())["invitations"][
+            status
+        ] = count
+    for room in answers.values():
+        total = sum(room["invitations"].values())
+        room["attendance"] = round(
+            room["invitations"][Invitation.ATTENDING] / total, 4
+        )
+        room["declined"] = round(
+            room["invitations"][Invitation.NOT_ATTENDING] / total, 4
+        )
+    return answers
+
+
+def cached_report(first_day, last_day, room_ids=None):
+    """
+    The report for the days and rooms, from the `analytics` cache when one
+    is configured. Reports are kept for RESERVATIONS_ANALYTICS_CACHE_TIMEOUT
+    seconds, changes to the reservations don't show in them until then
+    """
+    cache = get_cache()
+    if cache is None:
+        return utilization_report(first_day, last_day, room_ids)
+    rooms = ",".join(map(str, sorted(set(room_ids)))) if room_ids else ""
+    key = "report:{}:{}:{}".format(
+        first_day,
+        last_day,
+        hashlib.sha256(rooms.encode("ascii")).hexdigest()[:16],
+    )
+    report = cache.get(key)
+    if report is None:
+        report = utilization_report(first_day, last_day, room_ids)
+        cache.set(key, report, get_timeout())
+    return report
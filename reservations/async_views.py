@@ -0,0 +1,182 @@
+import asyncio
+from datetime import timedelta
+from functools import wraps
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+from meetings.renderers import FastJSONRenderer
+from .availability import find_free_slots
+from .models import MeetingRoom
+from .representations import represent_availability
+from .serializers import AvailabilitySerializer
+from .views import ReservationViewset
+
+
+def get_fanout():
+    """Up to how many queries a search runs at once, and for how many rooms"""
+    return (
+        getattr(settings, "RESERVATIONS_ASYNC_FANOUT", 4),
+        getattr(settings, "RESERVATIONS_ASYNC_FANOUT_MIN_ROOMS", 250),
+    )
+
+
+def database(func):
+    """
+    Make a function using the database awaitable. It runs in the thread
+    pool rather than in the one thread sync views share under ASGI, so
+    concurrent requests, and concurrent queries of one request, don't wait
+    for each other. Connections are closed or kept around it like around
+    sync requests, according to CONN_MAX_AGE
+    """
+
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def render(response):
+    """Render a DRF response, a 304 has no body"""
+    rendered = HttpResponse(
+        b""
+        if response.data is None
+        else FastJSONRenderer().render(response.data),
+        status=response.status_code,
+        content_type="application/json",
+    )
+    for header, value in response.items():
+        if header != "Content-Type":
+            rendered[header] = value
+    return rendered
+
+
+def authenticate(request):
+    """
+    Wrap a request for the DRF code reused by the views, authenticate it
+    and check the default permissions like DRF views do
+    """
+    request = Request(
+        request,
+        authenticators=[
+            authentication()
+            for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ],
+    )
+    for permission in api_settings.DEFAULT_PERMISSION_CLASSES:
+        if not permission().has_permission(request, None):
+            if not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            raise exceptions.PermissionDenied()
+    return request
+
+
+def async_api_view(view):
+    """
+    Turn an async function handling GET requests, and returning a DRF
+    response, into an async Django view which answers errors the way DRF
+    views do
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            response = exception_handler(
+                exceptions.MethodNotAllowed(request.method), {}
+            )
+            response["Allow"] = "GET"
+            return render(response)
+        try:
+            return render(await view(request, *args, **kwargs))
+        except Exception as exc:
+            # API exceptions, Http404 and PermissionDenied
+            response = exception_handler(exc, {})
+            if response is None:
+                raise
+            if isinstance(exc, exceptions.NotAuthenticated):
+                response.status_code = status.HTTP_401_UNAUTHORIZED
+                response["WWW-Authenticate"] = "Token"
+            return render(response)
+
+    return wrapper
+
+
+def reservation_view(request, action, **kwargs):
+    """
+    Run an action of the reservations viewset, with the same filtering,
+    pagination and caching as the sync endpoints
+    """
+    request = authenticate(request)
+    view = ReservationViewset(
+        request=request,
+        args=(),
+        kwargs=kwargs,
+        format_kwarg=None,
+        action=action,
+    )
+    return getattr(view, action)(request, **kwargs)
+
+
+@async_api_view
+async def reservation_list(request):
+    return await database(reservation_view)(request, "list")
+
+
+@async_api_view
+async def reservation_detail(request, pk):
+    return await database(reservation_view)(request, "retrieve", pk=pk)
+
+
+def room_groups(room_ids, groups, min_size=1):
+    """
+    Split room ids, or the ids of all rooms, into up to `groups` runs of
+    consecutive ones, of at least `min_size` rooms unless there are fewer
+    """
+    if room_ids is None:
+        room_ids = MeetingRoom.objects.order_by("id").values_list(
+            "id", flat=True
+        )
+    room_ids = sorted(room_ids)
+    size = max(min_size, -(-len(room_ids) // groups), 1)
+    room_ids = iter(room_ids)
+    return list(iter(lambda: list(islice(room_ids, size)), []))
+
+
+def availability_query(request):
+    """The validated parameters and the room groups of a search"""
+    query = AvailabilitySerializer(data=authenticate(request).query_params)
+    query.is_valid(raise_exception=True)
+    params = query.validated_data
+    return params, room_groups(params.get("rooms"), *get_fanout())
+
+
+@async_api_view
+async def room_availability(request):
+    """
+    Free slots of rooms like the sync endpoint. Many rooms are searched in
+    groups concurrently, with one connection each
+    """
+    params, groups = await database(availability_query)(request)
+    found = await asyncio.gather(
+        *(
+            database(find_free_slots)(
+                params["from"],
+                params["to"],
+                timedelta(minutes=params["duration"]),
+                room_ids=room_ids,
+            )
+            for room_ids in groups
+        )
+    )
+    available = [room for rooms in found for room in rooms]
+    return Response(represent_availability(available))
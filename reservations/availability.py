@@ -0,0 +1,43 @@
+from collections import defaultdict
+from .intervals import free_slots, overlap_filter, recurring_filter
+from .models import MeetingRoom, Reservation
+from .recurrence import Series, occurrences
+
+
+def find_free_slots(start, end, min_duration, room_ids=None):
+    """
+    Find the free slots of at least `min_duration` between `start` and
+    `end` in the given rooms, or in all of them. The reservations of all the
+    rooms are fetched with one range query ordered by room and start time,
+    and the gaps between them are found in a single pass over every room.
+    Returns (room id, room title, free slots) for the rooms with at least
+    one free slot
+    """
+    rooms = MeetingRoom.objects.order_by("id")
+    reservations = Reservation.objects.filter(
+        overlap_filter(start, end), recurrence=""
+    )
+    recurring = Reservation.objects.filter(recurring_filter(start, end))
+    if room_ids is not None:
+        rooms = rooms.filter(id__in=room_ids)
+        reservations = reservations.filter(room_id__in=room_ids)
+        recurring = recurring.filter(room_id__in=room_ids)
+
+    busy = defaultdict(list)
+    for room_id, busy_start, busy_end in reservations.order_by(
+        "room_id", "from_date"
+    ).values_list("room_id", "from_date", "to_date"):
+        busy[room_id].append((busy_start, busy_end))
+    recurring_rooms = set()
+    for row in recurring.values_list("room_id", *Series._fields):
+        busy[row[0]].extend(occurrences(Series(*row[1:]), start, end))
+        recurring_rooms.add(row[0])
+    for room_id in recurring_rooms:
+        busy[room_id].sort()
+
+    available = []
+    for room_id, title in rooms.values_list("id", "title"):
+        slots = list(free_slots(busy[room_id], start, end, min_duration))
+        if slots:
+            available.append((room_id, title, slots))
+    return available
@@ -0,0 +1,399 @@
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.db.models import Max
+from rest_framework import serializers, status
+from rest_framework.settings import api_settings
+from .booking import is_overlap_violation, room_lock
+from .conflicts import ERROR, OFF, clashes, commitments, describe, get_mode
+from .intervals import recurring_filter
+from .models import MeetingRoom, Reservation, Invitation
+from .recurrence import Series
+from .serializers import BatchReservationSerializer, ConflictSerializer
+from .signals import reservations_bulk_created
+
+logger = logging.getLogger("django")
+
+User = get_user_model()
+
+OVERLAP_ERROR = "There is an overlap with another reservation"
+
+
+def get_batch_max_size():
+    return getattr(settings, "RESERVATIONS_BATCH_MAX_SIZE", 10000)
+
+
+def does_not_exist(pk):
+    return [f'Invalid pk "{pk}" - object does not exist.']
+
+
+def validate_items(items):
+    """
+    Validate the fields of every item and the existence of the rooms and
+    users they reference, with one query per model for the whole batch.
+    Returns the validated data by item index and the errors by item index
+    """
+    valid, errors = {}, {}
+    # building the fields of a serializer is costly, so one is reused
+    serializer = BatchReservationSerializer()
+    for index, item in enumerate(items):
+        try:
+            valid[index] = serializer.run_validation(item)
+        except serializers.ValidationError as error:
+            errors[index] = serializers.as_serializer_error(error)
+
+    room_ids = {data["room"] for data in valid.values()}
+    user_ids = {data["creator"] for data in valid.values()} | {
+        guest["invitee"]
+        for data in valid.values()
+        for guest in data.get("guests", [])
+    }
+    existing_rooms = set(
+        MeetingRoom.objects.filter(pk__in=room_ids).values_list(
+            "pk", flat=True
+        )
+    )
+    existing_users = set(
+        User.objects.filter(pk__in=user_ids).values_list("pk", flat=True)
+    )
+
+    for index, data in list(valid.items()):
+        item_errors = {}
+        if data["room"] not in existing_rooms:
+            item_errors["room"] = does_not_exist(data["room"])
+        if data["creator"] not in existing_users:
+            item_errors["creator"] = does_not_exist(data["creator"])
+        guest_errors = [
+            {"invitee": does_not_exist(guest["invitee"])}
+            if guest["invitee"] not in existing_users
+            else {}
+            for guest in data.get("guests", [])
+        ]
+        if any(guest_errors):
+            item_errors["guests"] = guest_errors
+        if item_errors:
+            errors[index] = item_errors
+            del valid[index]
+    return valid, errors
+
+
+def sweep(valid):
+    """
+    Pick the items that can be booked: for every room the items and the
+    reservations already in the database overlapping the span of the batch,
+    with the occurrences of recurring ones expanded within it, are walked in
+    start time order, and an item is rejected if it overlaps
+    a reservation or an item accepted before it. Of two overlapping items
+    the one starting first, or the earlier one in the batch, wins.
+    Returns the indexes of the accepted and of the rejected items
+    """
+    by_room = defaultdict(list)
+    for index, data in valid.items():
+        by_room[data["room"]].append((data["from_date"], index))
+
+    starts = [data["from_date"] for data in valid.values()]
+    ends = [data["to_date"] for data in valid.values()]
+    existing = defaultdict(list)
+    if valid:
+        rows = (
+            Reservation.objects.filter(
+                room_id__in=by_room,
+                from_date__lt=max(ends),
+                to_date__gt=min(starts),
+                recurrence="",
+            )
+            .order_by("from_date")
+            .values_list("room_id", "from_date", "to_date")
+        )
+        for room_id, start, end in rows:
+            existing[room_id].append((start, end))
+        series = Reservation.objects.filter(
+            recurring_filter(min(starts), max(ends)), room_id__in=by_room
+        )
+        for reservation in series:
+            existing[reservation.room_id].extend(
+                reservation.occurrences(min(starts), max(ends))
+            )
+            existing[reservation.room_id].sort()
+
+    accepted, rejected = [], []
+    for room_id, candidates in by_room.items():
+        booked = existing[room_id]
+        position = 0
+        busy_until = None
+        for start, index in sorted(candidates):
+            end = valid[index]["to_date"]
+            # reservations of a room are disjoint, so their ends are sorted
+            while position < len(booked) and booked[position][1] <= start:
+                position += 1
+            clashes_with_booked = (
+                position < len(booked) and booked[position][0] < end
+            )
+            clashes_with_batch = busy_until is not None and busy_until > start
+            if clashes_with_booked or clashes_with_batch:
+                rejected.append(index)
+            else:
+                accepted.append(index)
+                busy_until = end
+    return accepted, rejected
+
+
+def attendees(data):
+    """The creator and the guests of an item, except the ones declining"""
+    return {data["creator"]} | {
+        guest["invitee"]
+        for guest in data.get("guests", [])
+        if guest.get("status") != Invitation.NOT_ATTENDING
+    }
+
+
+def check_attendees(valid, accepted):
+    """
+    Look up the other meetings of the people of the accepted items, in any
+    room, with a single query for the whole batch, the way the serializer
+    does for a single reservation. The items are walked in start time
+    order, so an item also conflicts with the items booked before it which
+    share a person. Depending on RESERVATIONS_ATTENDEE_CONFLICTS an item
+    with conflicts is turned down, or booked with them listed, or nothing
+    is looked up. Conflicts with items of the batch name the item by its
+    `index` until it is booked.
+    Returns the indexes of the items still accepted and the conflicts by
+    item index
+    """
+    mode = get_mode()
+    if mode == OFF or not accepted:
+        return accepted, {}
+    people = {index: attendees(valid[index]) for index in accepted}
+    start = min(valid[index]["from_date"] for index in accepted)
+    end = max(valid[index]["to_date"] for index in accepted)
+
+    singles, series = defaultdict(dict), defaultdict(dict)
+    for user_id, reservation_id, title, room_id, *fields in commitments(
+        set().union(*people.values()), start, end
+    ):
+        other = Series(*fields)
+        # a reservation a user created and was invited to is listed once
+        by_user = series if other.recurrence else singles
+        by_user[user_id][reservation_id] = (title, room_id, other)
+    # a single reservation of a user starting longer before a meeting than
+    # their longest one lasts can't reach it
+    for user_id, rows in singles.items():
+        rows = sorted(
+            (other.from_date, reservation_id, title, room_id, other)
+            for reservation_id, (title, room_id, other) in rows.items()
+        )
+        longest = max(other.to_date - other.from_date for *_, other in rows)
+        singles[user_id] = ([row[0] for row in rows], rows, longest)
+
+    conflicts = {}
+    booked = defaultdict(list)
+    for index in sorted(accepted, key=lambda i: (valid[i]["from_date"], i)):
+        data = valid[index]
+        meeting = Series(
+            data["from_date"], data["to_date"], "", 1, None, None, []
+        )
+        found = []
+        for user_id in people[index]:
+            if user_id in singles:
+                starts, rows, longest = singles[user_id]
+                first = bisect_left(starts, meeting.from_date - longest)
+                last = bisect_left(starts, meeting.to_date)
+                candidates = [row[1:] for row in rows[first:last]]
+            else:
+                candidates = []
+            candidates.extend(
+                (reservation_id, title, room_id, other)
+                for reservation_id, (title, room_id, other) in series[
+                    user_id
+                ].items()
+            )
+            for reservation_id, title, room_id, other in candidates:
+                if clashes(meeting, other):
+                    found.append(
+                        describe(
+                            user_id, reservation_id, title, room_id,
+                            meeting, other,
+                        )
+                    )
+            # items booked earlier started earlier, the ones which have
+            # ended can't reach this item nor any later one
+            booked[user_id] = [
+                other for other in booked[user_id]
+                if valid[other]["to_date"] > meeting.from_date
+            ]
+            for other in booked[user_id]:
+                found.append(
+                    {
+                        "user": user_id,
+                        "index": other,
+                        "title": valid[other]["title"],
+                        "room": valid[other]["room"],
+                        "from_date": valid[other]["from_date"],
+                        "to_date": valid[other]["to_date"],
+                    }
+                )
+        if found:
+            found.sort(
+                key=lambda conflict: (conflict["user"], conflict["from_date"])
+            )
+            conflicts[index] = found
+        if not found or mode != ERROR:
+            for user_id in people[index]:
+                booked[user_id].append(index)
+    if mode == ERROR:
+        accepted = [index for index in accepted if index not in conflicts]
+    return accepted, conflicts
+
+
+def conflict_errors(conflicts):
+    """The errors of the items turned down for their conflicts by index"""
+    names = dict(
+        User.objects.filter(
+            pk__in={
+                conflict["user"]
+                for found in conflicts.values()
+                for conflict in found
+            }
+        ).values_list("pk", User.USERNAME_FIELD)
+    )
+    return {
+        index: {
+            api_settings.NON_FIELD_ERRORS_KEY: [
+                f"{names[conflict['user']]} has another meeting at the same "
+                f"time: {conflict['title']}"
+                for conflict in found
+            ]
+        }
+        for index, found in conflicts.items()
+    }
+
+
+def insert(valid, accepted):
+    """
+    Insert the accepted reservations and their invitations with bulk
+    queries and return the reservations by item index
+    """
+    reservations = {
+        index: Reservation(
+            title=valid[index]["title"],
+            from_date=valid[index]["from_date"],
+            to_date=valid[index]["to_date"],
+            room_id=valid[index]["room"],
+            creator_id=valid[index]["creator"],
+        )
+        for index in accepted
+    }
+    returns_ids = connection.features.can_return_rows_from_bulk_insert
+    if not returns_ids:
+        # read under the room locks, the rows with larger ids are the ones
+        # inserted below
+        last_id = Reservation.objects.aggregate(last_id=Max("id"))["last_id"]
+    Reservation.objects.bulk_create(reservations.values(), batch_size=1000)
+
+    if not returns_ids:
+        # the accepted reservations don't overlap each other, so a room and
+        # a start time identify each of the rows inserted. Rows already in
+        # the database, e.g. recurring or empty ones, may share them
+        starts = [valid[index]["from_date"] for index in accepted]
+        rows = Reservation.objects.filter(
+            id__gt=last_id or 0,
+            room_id__in={valid[index]["room"] for index in accepted},
+            from_date__gte=min(starts),
+            from_date__lte=max(starts),
+            recurrence="",
+        ).values_list("pk", "room_id", "from_date")
+        ids = {(room_id, start): pk for pk, room_id, start in rows}
+        for reservation in reservations.values():
+            reservation.pk = ids[reservation.room_id, reservation.from_date]
+
+    Invitation.objects.bulk_create(
+        (
+            Invitation(
+                reservation=reservations[index],
+                invitee_id=guest["invitee"],
+                status=guest.get("status", Invitation.MAYBE),
+            )
+            for index in accepted
+            for guest in valid[index].get("guests", [])
+        ),
+        batch_size=1000,
+    )
+    return reservations
+
+
+def book_reservations(items):
+    """
+    Validate and book a batch of reservations. Items that are invalid,
+    overlap another reservation or, with attendee conflicts turned to
+    errors, clash with their people's other meetings are skipped, the rest
+    are booked together. Returns a result with the status and either the
+    id, with any conflicts, or the errors of every item, in the order of
+    the items
+    """
+    valid, errors = validate_items(items)
+    room_ids = {data["room"] for data in valid.values()}
+
+    reservations = {}
+    conflicts = {}
+    try:
+        with room_lock(*room_ids):
+            accepted, rejected = sweep(valid)
+            accepted, conflicts = check_attendees(valid, accepted)
+            if accepted:
+                reservations = insert(valid, accepted)
+                reservations_bulk_created.send(
+                    sender=Reservation,
+                    reservations=list(reservations.values()),
+                )
+    except IntegrityError as error:
+        if not is_overlap_violation(error):
+            raise
+        # another process booked one of the slots despite the room locks
+        accepted, rejected, conflicts = [], list(valid), {}
+    for index in rejected:
+        errors[index] = {api_settings.NON_FIELD_ERRORS_KEY: [OVERLAP_ERROR]}
+    turned_down = {
+        index: found
+        for index, found in conflicts.items()
+        if index not in reservations
+    }
+    if turned_down:
+        logger.info(
+            f"Attendee conflict validation error for "
+            f"{len(turned_down)} reservations of a batch"
+        )
+        errors.update(conflict_errors(turned_down))
+
+    logger.info(
+        f"Booked {len(reservations)} of {len(items)} reservations in a batch"
+    )
+    results = []
+    for index in range(len(items)):
+        if index in reservations:
+            result = {
+                "index": index,
+                "status": status.HTTP_201_CREATED,
+                "id": reservations[index].pk,
+            }
+            if index in conflicts:
+                for conflict in conflicts[index]:
+                    if "index" in conflict:
+                        conflict["reservation"] = reservations[
+                            conflict.pop("index")
+                        ].pk
+                result["conflicts"] = ConflictSerializer(
+                    conflicts[index], many=True
+                ).data
+            results.append(result)
+        else:
+            results.append(
+                {
+                    "index": index,
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": errors[index],
+                }
+            )
+    return results
@@ -0,0 +1,1811 @@
+import asyncio
+import io
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import cycle
+from urllib.parse import urlencode
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, reset_queries, transaction
+from django.db.backends.signals import connection_created
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework.authentication import TokenAuthentication
+from accounts.authentication import (
+    HashedTokenAuthentication,
+    token_cache_stats,
+)
+from accounts.models import AuthToken
+from meetings import renderers
+from meetings.caches import parse_cache_url
+from meetings.backends.pool import close_pools
+from meetings.renderers import FastJSONParser, FastJSONRenderer
+from .analytics import busy_intervals, cached_report, utilization_report
+from .cache import cache_stats, get_cache, reset_cache_stats
+from .changes import record_changes
+from .conflicts import clashes, find_conflicts
+from .events import hub
+from .intervals import (
+    has_overlapping_reservation,
+    room_index,
+    window_filter,
+)
+from .models import MeetingRoom, Reservation, Invitation
+from .recurrence import NONE, WEEKLY, Series, occurrences
+from .schedule import rebuild_schedules
+from .seeding import RESERVATION_FIELDS, BulkWriter, Seeder, next_id
+from .representations import represent_reservations, reservation_values
+from .serializers import ReservationSerializer
+
+User = get_user_model()
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    """Register a function as a benchmark runnable by `manage.py benchmark`"""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+class BenchmarkOutput:
+    """
+    Passed to benchmarks as `stdout`: writes their tables and collects the
+    measurements they record for the machine-readable results. Every record
+    has a `seconds` value, which results of other runs are compared on
+    """
+
+    def __init__(self, stdout):
+        self.stdout = stdout
+        self.results = {}
+
+    def write(self, message):
+        self.stdout.write(message)
+
+    def record(self, case, seconds, **extra):
+        self.results[case] = {"seconds": seconds, **extra}
+
+
+def measure(func, rounds=50, warmup=1):
+    """
+    Call `func` `warmup` times, then time `rounds` calls, and return the
+    statistics of the durations in seconds, named like pytest-benchmark's
+    """
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    mean = statistics.mean(durations)
+    return {
+        "min": min(durations),
+        "max": max(durations),
+        "mean": mean,
+        "stddev": statistics.stdev(durations) if rounds > 1 else 0.0,
+        "median": statistics.median(durations),
+        "rounds": rounds,
+        "ops": 1 / mean if mean else None,
+    }
+
+
+def timed(func, repeat=200):
+    """Run `func` `repeat` times and return the median duration in seconds"""
+    return measure(func, rounds=repeat, warmup=0)["median"]
+
+
+def create_back_to_back_reservations(room, creator, count, start=None):
+    """
+    Fill the room with `count` consecutive one hour reservations and return
+    the end of the last one. They are written like seeded data, so that
+    histories of millions of reservations take seconds
+    """
+    start = start or datetime(2000, 1, 1, tzinfo=timezone.utc)
+    first = next_id(Reservation)
+    writer = BulkWriter(Reservation, RESERVATION_FIELDS)
+    with transaction.atomic():
+        for number in range(count):
+            writer.add(
+                (
+                    first + number,
+                    f"Meeting {number}",
+                    start + timedelta(hours=number),
+                    start + timedelta(hours=number + 1),
+                    room.id,
+                    creator.id,
+                    NONE,
+                    1,
+                    [],
+                )
+            )
+        writer.close()
+    return start + timedelta(hours=count)
+
+
+@benchmark
+def overlap_validation(stdout, sizes=(1000, 10000, 100000, 1000000)):
+    """
+    Median latency of a room conflict check for a new booking after and in
+    the middle of a room history of growing size, with and without the
+    in-process interval index
+    """
+    creator = User.objects.create(username="benchmark")
+    stdout.write(
+        f"{'reservations':>12} {'db after':>10} {'db middle':>10} "
+        f"{'idx after':>10} {'idx middle':>10}  (microseconds)"
+    )
+    for size in sizes:
+        room = MeetingRoom.objects.create(title=f"Room {size}")
+        history_end = create_back_to_back_reservations(room, creator, size)
+        middle = history_end - timedelta(hours=size // 2, minutes=30)
+        cases = [
+            (history_end, history_end + timedelta(hours=1)),
+            (middle, middle + timedelta(minutes=15)),
+        ]
+
+        results = []
+        for start, end in cases:
+            results.append(
+                timed(lambda: has_overlapping_reservation(room, start, end))
+            )
+        room_index.overlaps(room.id, *cases[0])
+        for start, end in cases:
+            results.append(
+                timed(lambda: room_index.overlaps(room.id, start, end))
+            )
+        room_index.clear()
+
+        stdout.write(
+            f"{size:>12} "
+            + " ".join(f"{result * 1e6:>10.1f}" for result in results)
+        )
+        for name, result in zip(
+            ("db after", "db middle", "index after", "index middle"), results
+        ):
+            stdout.record(f"{name}, {size} reservations", result)
+
+
+@benchmark
+def concurrent_booking(stdout, workers=(1, 8, 32), requests=400, rooms=20):
+    """
+    Throughput of POST /api/reservations/ from concurrent clients booking
+    partially overlapping slots, and the number of double bookings left
+    """
+    creator = User.objects.create(username="benchmark")
+    url = reverse("reservations-list")
+    stdout.write(
+        f"{'workers':>8} {'requests/s':>11} {'created':>8} "
+        f"{'double bookings':>16}"
+    )
+    for worker_count in workers:
+        Reservation.objects.all().delete()
+        room_ids = [
+            MeetingRoom.objects.create(title=f"Room {number}").id
+            for number in range(rooms)
+        ]
+        start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        payloads = [
+            {
+                "title": f"Meeting {number}",
+                "from_date": start + timedelta(minutes=20 * (number // rooms)),
+                "to_date": start
+                + timedelta(minutes=20 * (number // rooms) + 30),
+                "room": room_ids[number % rooms],
+                "creator": creator.id,
+            }
+            for number in range(requests)
+        ]
+        chunks = [
+            payloads[number::worker_count] for number in range(worker_count)
+        ]
+
+        def book(chunk):
+            client = APIClient()
+            client.force_authenticate(user=creator)
+            try:
+                for data in chunk:
+                    client.post(url, data, format="json")
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=book, args=(chunk,)) for chunk in chunks
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        double_bookings = count_double_bookings()
+        stdout.write(
+            f"{worker_count:>8} {requests / elapsed:>11.1f} "
+            f"{Reservation.objects.count():>8} "
+            f"{double_bookings:>16}"
+        )
+        stdout.record(
+            f"{worker_count} workers",
+            elapsed / requests,
+            requests_per_second=requests / elapsed,
+            double_bookings=double_bookings,
+        )
+
+
+def count_double_bookings():
+    double_bookings = 0
+    previous = None
+    for room_id, start, end in Reservation.objects.order_by(
+        "room_id", "from_date"
+    ).values_list("room_id", "from_date", "to_date"):
+        if previous and previous[0] == room_id and previous[2] > start:
+            double_bookings += 1
+        previous = (room_id, start, end)
+    return double_bookings
+
+
+def measure_response(client, url, data=None):
+    """
+    Return the body size, peak traced memory and duration of a GET. Memory
+    is traced in a second request, since tracing slows everything down
+    """
+    started = time.perf_counter()
+    response = client.get(url, data)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    client.get(url, data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return response, len(response.content), peak, elapsed
+
+
+@benchmark
+def list_response_size(stdout, rooms=50, reservations_per_room=200, guests=3):
+    """
+    Body size, peak memory and latency of list endpoints with years of room
+    history, paginated and limited to a time window
+    """
+    creator = User.objects.create(username="benchmark")
+    invitees = [
+        User.objects.create(username=f"guest{number}")
+        for number in range(guests)
+    ]
+    for number in range(rooms):
+        room = MeetingRoom.objects.create(title=f"Room {number}")
+        create_back_to_back_reservations(
+            room, creator, reservations_per_room
+        )
+    Invitation.objects.bulk_create(
+        Invitation(reservation_id=reservation_id, invitee=invitee)
+        for reservation_id in Reservation.objects.values_list(
+            "id", flat=True
+        )
+        for invitee in invitees
+    )
+    history_start = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    window = {
+        "from": history_start.isoformat(),
+        "to": (history_start + timedelta(days=1)).isoformat(),
+    }
+
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    stdout.write(f"{'request':<40} {'bytes':>10} {'peak MB':>8} {'ms':>8}")
+    cases = [
+        ("rooms, first page", reverse("rooms-list"), None),
+        ("rooms, first page, one day window", reverse("rooms-list"), window),
+        ("reservations, first page", reverse("reservations-list"), None),
+        (
+            "reservations, one day window",
+            reverse("reservations-list"),
+            window,
+        ),
+    ]
+    for name, url, data in cases:
+        _, size, peak, elapsed = measure_response(client, url, data)
+        stdout.write(
+            f"{name:<40} {size:>10} {peak / 2 ** 20:>8.1f} "
+            f"{elapsed * 1000:>8.1f}"
+        )
+        stdout.record(name, elapsed, bytes=size, peak_bytes=peak)
+
+    size = peak = elapsed = 0
+    url = f"{reverse('reservations-list')}?page_size=1000"
+    while url:
+        response, page_size, page_peak, page_elapsed = measure_response(
+            client, url
+        )
+        size += page_size
+        peak = max(peak, page_peak)
+        elapsed += page_elapsed
+        url = response.data["next"]
+    stdout.write(
+        f"{'reservations, all pages of 1000':<40} {size:>10} "
+        f"{peak / 2 ** 20:>8.1f} {elapsed * 1000:>8.1f}"
+    )
+    stdout.record(
+        "reservations, all pages of 1000",
+        elapsed,
+        bytes=size,
+        peak_bytes=peak,
+    )
+
+
+def update_invitations_row_by_row(reservation, new_invitation_data):
+    """Reference implementation writing one invitation per query"""
+    new_invitees = {
+        invitation["invitee"].pk: invitation
+        for invitation in new_invitation_data
+    }
+    for invitation in reservation.guests.all():
+        if invitation.invitee_id in new_invitees:
+            new_invitees.pop(invitation.invitee_id)
+            invitation.save()
+        else:
+            invitation.delete()
+    for invitation in new_invitees.values():
+        Invitation.objects.create(reservation=reservation, **invitation)
+
+
+@benchmark
+def invitation_writes(stdout, sizes=(10, 100, 1000)):
+    """
+    Queries and wall-clock time for creating a reservation with N guests
+    and then replacing half of them, row by row versus set-based
+    """
+    creator = User.objects.create(username="benchmark")
+    room = MeetingRoom.objects.create(title="All hands room")
+    stdout.write(
+        f"{'guests':>6} {'approach':<12} {'create q':>9} {'create ms':>10} "
+        f"{'update q':>9} {'update ms':>10}"
+    )
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    for size in sizes:
+        User.objects.bulk_create(
+            User(username=f"guest-{size}-{number}")
+            for number in range(size * 3 // 2)
+        )
+        guests = list(
+            User.objects.filter(username__startswith=f"guest-{size}-")
+        )
+        initial = [{"invitee": guest} for guest in guests[:size]]
+        replaced = [{"invitee": guest} for guest in guests[size // 2:]]
+
+        for approach in ("row by row", "set-based"):
+            Reservation.objects.all().delete()
+            data = {
+                "title": "All hands",
+                "from_date": start,
+                "to_date": start + timedelta(hours=1),
+                "room": room,
+                "creator": creator,
+            }
+            with CaptureQueriesContext(connection) as create_queries:
+                started = time.perf_counter()
+                if approach == "row by row":
+                    reservation = Reservation.objects.create(**data)
+                    for invitation in initial:
+                        Invitation.objects.create(
+                            reservation=reservation, **invitation
+                        )
+                else:
+                    reservation = ReservationSerializer().create(
+                        dict(data, guests=initial)
+                    )
+                create_elapsed = time.perf_counter() - started
+
+            with CaptureQueriesContext(connection) as update_queries:
+                started = time.perf_counter()
+                if approach == "row by row":
+                    update_invitations_row_by_row(reservation, replaced)
+                else:
+                    ReservationSerializer(
+                        instance=reservation
+                    ).update_invitation_data(replaced)
+                update_elapsed = time.perf_counter() - started
+
+            stdout.write(
+                f"{size:>6} {approach:<12} {len(create_queries):>9} "
+                f"{create_elapsed * 1000:>10.1f} {len(update_queries):>9} "
+                f"{update_elapsed * 1000:>10.1f}"
+            )
+            stdout.record(
+                f"create, {approach}, {size} guests",
+                create_elapsed,
+                queries=len(create_queries),
+            )
+            stdout.record(
+                f"update, {approach}, {size} guests",
+                update_elapsed,
+                queries=len(update_queries),
+            )
+
+
+@benchmark
+def batch_booking(stdout, sizes=(100, 1000, 10000), rooms=100, guests=2):
+    """
+    Wall-clock time of booking N reservations with a single batch request
+    compared to one POST per reservation
+    """
+    creator = User.objects.create(username="benchmark")
+    invitees = [
+        User.objects.create(username=f"guest{number}")
+        for number in range(guests)
+    ]
+    room_ids = [
+        MeetingRoom.objects.create(title=f"Room {number}").id
+        for number in range(rooms)
+    ]
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+    def items(size):
+        for number in range(size):
+            from_date = start + timedelta(hours=number // rooms)
+            yield {
+                "title": f"Imported {number}",
+                "from_date": from_date.isoformat(),
+                "to_date": (from_date + timedelta(minutes=45)).isoformat(),
+                "room": room_ids[number % rooms],
+                "creator": creator.id,
+                "guests": [{"invitee": invitee.id} for invitee in invitees],
+            }
+
+    stdout.write(f"{'items':>6} {'approach':<16} {'seconds':>8} {'booked':>7}")
+    for size in sizes:
+        Reservation.objects.all().delete()
+        started = time.perf_counter()
+        client.post(
+            reverse("reservations-batch"), list(items(size)), format="json"
+        )
+        elapsed = time.perf_counter() - started
+        stdout.write(
+            f"{size:>6} {'batch':<16} {elapsed:>8.2f} "
+            f"{Reservation.objects.count():>7}"
+        )
+        stdout.record(f"batch, {size} items", elapsed)
+
+        if size > 1000:
+            continue
+        Reservation.objects.all().delete()
+        started = time.perf_counter()
+        for item in items(size):
+            client.post(reverse("reservations-list"), item, format="json")
+        elapsed = time.perf_counter() - started
+        stdout.write(
+            f"{size:>6} {'one per request':<16} {elapsed:>8.2f} "
+            f"{Reservation.objects.count():>7}"
+        )
+        stdout.record(f"one per request, {size} items", elapsed)
+
+
+@benchmark
+def room_availability(stdout, rooms=(50, 500), days=30):
+    """
+    Latency of finding the rooms free for at least an hour between 9 and 17
+    on a day, with a month of half-booked schedules in every room
+    """
+    creator = User.objects.create(username="benchmark")
+    url = reverse("rooms-availability")
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    first_day = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    stdout.write(f"{'rooms':>6} {'reservations':>13} {'ms':>8} {'free':>5}")
+    for room_count in rooms:
+        Reservation.objects.all().delete()
+        MeetingRoom.objects.all().delete()
+        reservations = []
+        for number in range(room_count):
+            room = MeetingRoom.objects.create(title=f"Room {number}")
+            for day in range(days):
+                for hour in range(9 + number % 2, 17, 2):
+                    from_date = first_day + timedelta(days=day, hours=hour)
+                    reservations.append(
+                        Reservation(
+                            title="Meeting",
+                            from_date=from_date,
+                            to_date=from_date + timedelta(hours=1),
+                            room=room,
+                            creator=creator,
+                        )
+                    )
+        Reservation.objects.bulk_create(reservations, batch_size=5000)
+
+        day = first_day + timedelta(days=days // 2)
+        params = {
+            "from": (day + timedelta(hours=9)).isoformat(),
+            "to": (day + timedelta(hours=17)).isoformat(),
+            "duration": 60,
+        }
+        response = client.get(url, params)
+        elapsed = timed(lambda: client.get(url, params), repeat=20)
+        stdout.write(
+            f"{room_count:>6} {len(reservations):>13} "
+            f"{elapsed * 1000:>8.1f} {len(response.data['results']):>5}"
+        )
+        stdout.record(f"{room_count} rooms", elapsed)
+
+
+@benchmark
+def recurring_reservations(stdout, series_counts=(10, 50), weeks=260):
+    """
+    Weekly meetings stored as recurrence rules compared with the same
+    meetings materialized as one row per occurrence: rows stored, latency
+    of checking a single booking and a new weekly series for conflicts, and
+    of searching a day for free slots
+    """
+    creator = User.objects.create(username="benchmark")
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    url = reverse("rooms-availability")
+    # a Monday
+    first_day = datetime(2030, 1, 7, tzinfo=timezone.utc)
+    stdout.write(
+        f"{'series':>7} {'storage':>13} {'rows':>7} {'single us':>10} "
+        f"{'series ms':>10} {'search ms':>10}"
+    )
+    for series_count in series_counts:
+        Reservation.objects.all().delete()
+        MeetingRoom.objects.all().delete()
+        materialized = MeetingRoom.objects.create(title="Materialized")
+        rules = MeetingRoom.objects.create(title="Rules")
+        starts = [
+            first_day + timedelta(days=number % 5, hours=8 + number // 5)
+            for number in range(series_count)
+        ]
+        rows = [
+            Reservation(
+                title="Standup",
+                from_date=start + timedelta(weeks=week),
+                to_date=start + timedelta(weeks=week, minutes=30),
+                room=materialized,
+                creator=creator,
+            )
+            for start in starts
+            for week in range(weeks)
+        ]
+        Reservation.objects.bulk_create(rows, batch_size=5000)
+        for start in starts:
+            Reservation.objects.create(
+                title="Standup",
+                from_date=start,
+                to_date=start + timedelta(minutes=30),
+                room=rules,
+                creator=creator,
+                recurrence=WEEKLY,
+                recurrence_count=weeks,
+            )
+
+        # a free slot in the middle of the series
+        single_start = first_day + timedelta(
+            weeks=weeks // 2, days=5, hours=10
+        )
+        single_end = single_start + timedelta(hours=1)
+        series = Series(
+            first_day + timedelta(days=5, hours=10),
+            first_day + timedelta(days=5, hours=11),
+            WEEKLY,
+            1,
+            weeks,
+            None,
+            [],
+        )
+        day = first_day + timedelta(weeks=weeks // 2)
+        params = {
+            "from": day.isoformat(),
+            "to": (day + timedelta(days=1)).isoformat(),
+            "duration": 30,
+        }
+
+        storages = [(materialized, "materialized"), (rules, "rules")]
+        for room, storage in storages:
+            single = timed(
+                lambda: has_overlapping_reservation(
+                    room, single_start, single_end
+                )
+            )
+            if room is rules:
+                new_series = timed(
+                    lambda: has_overlapping_reservation(
+                        room, None, None, series=series
+                    ),
+                    repeat=20,
+                )
+            else:
+                # every occurrence of the new series checked on its own
+                new_series = timed(
+                    lambda: any(
+                        has_overlapping_reservation(room, start, end)
+                        for start, end in occurrences(series)
+                    ),
+                    repeat=20,
+                )
+            search = timed(
+                lambda: client.get(url, {**params, "rooms": room.id}),
+                repeat=20,
+            )
+            stdout.write(
+                f"{series_count:>7} {storage:>13} "
+                f"{room.reservations.count():>7} {single * 1e6:>10.1f} "
+                f"{new_series * 1000:>10.2f} {search * 1000:>10.2f}"
+            )
+            for name, result in [
+                ("single check", single),
+                ("series check", new_series),
+                ("search", search),
+            ]:
+                stdout.record(
+                    f"{name}, {storage}, {series_count} series", result
+                )
+
+
+@benchmark
+def user_reservations_cache(stdout, reservations=(100, 1000), guests=5):
+    """
+    Latency of polling a user's reservations with ?user_id= without the
+    cache, from the cache, and with an up to date ETag, and the latency of
+    the first request after one of the reservations changed
+    """
+    cache = get_cache()
+    creator = User.objects.create(username="benchmark")
+    invitees = [
+        User.objects.create(username=f"guest{number}")
+        for number in range(guests)
+    ]
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    url = reverse("reservations-list")
+    stdout.write(
+        f"{'reservations':>12} {'uncached ms':>12} {'cached ms':>10} "
+        f"{'304 ms':>8} {'after write ms':>15}"
+    )
+    for count in reservations:
+        Reservation.objects.all().delete()
+        MeetingRoom.objects.all().delete()
+        room = MeetingRoom.objects.create(title="Room")
+        create_back_to_back_reservations(room, creator, count)
+        Invitation.objects.bulk_create(
+            Invitation(reservation_id=reservation_id, invitee=invitee)
+            for reservation_id in Reservation.objects.values_list(
+                "id", flat=True
+            )
+            for invitee in invitees
+        )
+        params = {"user_id": invitees[0].id, "page_size": 1000}
+        cache.clear()
+        reset_cache_stats()
+
+        uncached = timed(
+            lambda: (cache.clear(), client.get(url, params)), repeat=20
+        )
+        etag = client.get(url, params)["ETag"]
+        cached = timed(lambda: client.get(url, params), repeat=20)
+        not_modified = timed(
+            lambda: client.get(url, params, HTTP_IF_NONE_MATCH=etag),
+            repeat=20,
+        )
+        reservation = Reservation.objects.first()
+
+        def write_and_get():
+            reservation.save()
+            client.get(url, params)
+
+        after_write = timed(write_and_get, repeat=20)
+        stdout.write(
+            f"{count:>12} {uncached * 1000:>12.1f} {cached * 1000:>10.1f} "
+            f"{not_modified * 1000:>8.1f} {after_write * 1000:>15.1f}"
+        )
+        for name, result in [
+            ("uncached", uncached),
+            ("cached", cached),
+            ("not modified", not_modified),
+            ("after write", after_write),
+        ]:
+            stdout.record(f"{name}, {count} reservations", result)
+    stdout.write(f"cache events: {cache_stats()}")
+
+
+@benchmark
+def instrumentation_overhead(stdout, rates=(0, 0.1, 1.0), reservations=100):
+    """
+    Latency of a reservations list page with no, a tenth and all of the
+    requests instrumented
+    """
+    creator = User.objects.create(username="benchmark")
+    room = MeetingRoom.objects.create(title="Room")
+    create_back_to_back_reservations(room, creator, reservations)
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    url = reverse("reservations-list")
+    stdout.write(f"{'sample rate':>11} {'ms':>8}")
+    for rate in rates:
+        with override_settings(INSTRUMENTATION_SAMPLE_RATE=rate):
+            elapsed = timed(lambda: client.get(url), repeat=100)
+        stdout.write(f"{rate:>11} {elapsed * 1000:>8.2f}")
+        stdout.record(f"sample rate {rate}", elapsed)
+
+
+@benchmark
+def api_endpoints(stdout, scale=1.0, rounds=20):
+    """
+    Latency of the main reservation endpoints, called in-process, against a
+    seeded data set of 100 rooms with 200 reservations each, times `scale`
+    """
+    history_start = datetime(2021, 1, 4, tzinfo=timezone.utc)
+    Seeder(start=history_start, random_seed=0).run(
+        rooms=max(1, int(100 * scale)), reservations_per_room=200, users=50
+    )
+    users = list(User.objects.order_by("id"))
+    creator = users[0]
+    room = MeetingRoom.objects.order_by("id").first()
+    reservation = Reservation.objects.order_by("id").first()
+    window = {
+        "from": history_start.isoformat(),
+        "to": (history_start + timedelta(days=1)).isoformat(),
+    }
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    list_url = reverse("reservations-list")
+    detail_url = reverse("reservations-detail", args=[reservation.id])
+    # new reservations go after the seeded history, one hour apart
+    slots = iter(range(10 ** 6))
+    free_start = history_start + timedelta(days=365 * 10)
+
+    def create():
+        start = free_start + timedelta(hours=next(slots))
+        response = client.post(
+            list_url,
+            {
+                "title": "Benchmark",
+                "from_date": start,
+                "to_date": start + timedelta(hours=1),
+                "room": room.id,
+                "creator": creator.id,
+                "guests": [{"invitee": users[1].id}],
+            },
+            format="json",
+        )
+        assert response.status_code == 201, response.data
+
+    # a PATCH without them would delete the guests
+    guests = list(reservation.guests.values("invitee", "status"))
+
+    def update():
+        response = client.patch(
+            detail_url,
+            {"title": f"Meeting {next(slots)}", "guests": guests},
+            format="json",
+        )
+        assert response.status_code == 200, response.data
+
+    def user_list(cached):
+        if not cached and get_cache() is not None:
+            get_cache().clear()
+        client.get(list_url, {"user_id": users[1].id})
+
+    cases = [
+        ("list reservations", lambda: client.get(list_url)),
+        ("list one day", lambda: client.get(list_url, window)),
+        ("list by user", lambda: user_list(cached=False)),
+        ("list by user, cached", lambda: user_list(cached=True)),
+        ("reservation detail", lambda: client.get(detail_url)),
+        ("create reservation", create),
+        ("update reservation", update),
+        ("list rooms", lambda: client.get(reverse("rooms-list"))),
+        (
+            "room availability",
+            lambda: client.get(reverse("rooms-availability"), window),
+        ),
+    ]
+    stdout.write(
+        f"{Reservation.objects.count()} reservations, "
+        f"{Invitation.objects.count()} invitations"
+    )
+    stdout.write(
+        f"{'request':<28} {'median ms':>10} {'mean ms':>10} "
+        f"{'stddev ms':>10} {'ops':>8}"
+    )
+    for name, func in cases:
+        stats = measure(func, rounds=rounds)
+        stdout.write(
+            f"{name:<28} {stats['median'] * 1000:>10.2f} "
+            f"{stats['mean'] * 1000:>10.2f} "
+            f"{stats['stddev'] * 1000:>10.2f} {stats['ops']:>8.1f}"
+        )
+        stdout.record(name, stats["median"], **stats)
+
+
+@benchmark
+def calendar_feeds(stdout, sizes=(1000, 10000, 50000), guests=3):
+    """
+    Latency and peak memory of streaming a room's iCalendar feed, and the
+    latency of polling it with an up to date ETag
+    """
+    creator = User.objects.create(username="benchmark")
+    invitees = [
+        User.objects.create(
+            username=f"guest{number}", email=f"guest{number}@example.com"
+        )
+        for number in range(guests)
+    ]
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    stdout.write(
+        f"{'events':>7} {'MB':>7} {'peak MB':>8} {'ms':>9} {'304 ms':>7}"
+    )
+    for size in sizes:
+        MeetingRoom.objects.all().delete()
+        room = MeetingRoom.objects.create(title="Room")
+        create_back_to_back_reservations(room, creator, size)
+        Invitation.objects.bulk_create(
+            Invitation(reservation_id=reservation_id, invitee=invitee)
+            for reservation_id in room.reservations.values_list(
+                "id", flat=True
+            )
+            for invitee in invitees
+        )
+        url = reverse("rooms-calendar", args=[room.id])
+
+        started = time.perf_counter()
+        response = client.get(url)
+        length = sum(len(chunk) for chunk in response.streaming_content)
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        for _ in client.get(url).streaming_content:
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        etag = response["ETag"]
+        not_modified = timed(
+            lambda: client.get(url, HTTP_IF_NONE_MATCH=etag), repeat=100
+        )
+        stdout.write(
+            f"{size:>7} {length / 2 ** 20:>7.1f} {peak / 2 ** 20:>8.1f} "
+            f"{elapsed * 1000:>9.1f} {not_modified * 1000:>7.2f}"
+        )
+        stdout.record(f"feed, {size} events", elapsed, bytes=length)
+        stdout.record(f"not modified, {size} events", not_modified)
+
+
+@benchmark
+def reservations_export(stdout, reservations=20000, guests=3):
+    """
+    Latency and peak memory of exporting every reservation through the
+    streaming export compared with paging through the list endpoint
+    """
+    creator = User.objects.create(username="benchmark")
+    invitees = [
+        User.objects.create(username=f"guest{number}")
+        for number in range(guests)
+    ]
+    room = MeetingRoom.objects.create(title="Room")
+    create_back_to_back_reservations(room, creator, reservations)
+    Invitation.objects.bulk_create(
+        Invitation(reservation_id=reservation_id, invitee=invitee)
+        for reservation_id in Reservation.objects.values_list(
+            "id", flat=True
+        )
+        for invitee in invitees
+    )
+    client = APIClient()
+    client.force_authenticate(user=creator)
+
+    def consume(response):
+        return sum(len(chunk) for chunk in response.streaming_content)
+
+    def list_pages():
+        size = 0
+        url = f"{reverse('reservations-list')}?page_size=1000"
+        while url:
+            response = client.get(url)
+            size += len(response.content)
+            url = response.data["next"]
+        return size
+
+    url = reverse("reservations-export")
+    cases = [
+        ("list endpoint, pages of 1000", list_pages),
+        ("export, csv", lambda: consume(client.get(url))),
+        (
+            "export, jsonl",
+            lambda: consume(client.get(url, {"output": "jsonl"})),
+        ),
+        (
+            "export, csv, gzip",
+            lambda: consume(client.get(url, {"gzip": "true"})),
+        ),
+    ]
+    stdout.write(f"{'request':<30} {'MB':>7} {'peak MB':>8} {'ms':>9}")
+    for name, func in cases:
+        started = time.perf_counter()
+        size = func()
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stdout.write(
+            f"{name:<30} {size / 2 ** 20:>7.1f} {peak / 2 ** 20:>8.1f} "
+            f"{elapsed * 1000:>9.1f}"
+        )
+        stdout.record(name, elapsed, bytes=size, peak_bytes=peak)
+
+
+@benchmark
+def read_serialization(stdout, reservations=10000, guests=3):
+    """
+    Throughput of building reservations with their guests through
+    ReservationSerializer and through the fast read path, queries included,
+    and the latency of list pages of 1000 with either
+    """
+    creator = User.objects.create(username="benchmark")
+    invitees = [
+        User.objects.create(username=f"guest{number}")
+        for number in range(guests)
+    ]
+    room = MeetingRoom.objects.create(title="Room")
+    create_back_to_back_reservations(room, creator, reservations)
+    Invitation.objects.bulk_create(
+        Invitation(reservation_id=reservation_id, invitee=invitee)
+        for reservation_id in Reservation.objects.values_list(
+            "id", flat=True
+        )
+        for invitee in invitees
+    )
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    url = reverse("reservations-list")
+    queryset = Reservation.objects.order_by("from_date", "id")
+
+    def serialize():
+        return ReservationSerializer(
+            queryset.prefetch_related("guests__reservation"), many=True
+        ).data
+
+    def build():
+        return represent_reservations(list(reservation_values(queryset)))
+
+    def page(fast):
+        with override_settings(RESERVATIONS_FAST_READS=fast):
+            client.get(url, {"page_size": 1000})
+
+    renderer = JSONRenderer()
+    assert renderer.render(serialize()) == renderer.render(build())
+    stdout.write(f"{'path':<30} {'ms':>9} {'reservations/s':>15}")
+    for name, func, count in [
+        (f"serializer, {reservations}", serialize, reservations),
+        (f"fast path, {reservations}", build, reservations),
+        ("serializer, page of 1000", lambda: page(False), 1000),
+        ("fast path, page of 1000", lambda: page(True), 1000),
+    ]:
+        elapsed = timed(func, repeat=5)
+        stdout.write(
+            f"{name:<30} {elapsed * 1000:>9.1f} {count / elapsed:>15.0f}"
+        )
+        stdout.record(name, elapsed, per_second=count / elapsed)
+
+
+@benchmark
+def json_encoding(stdout, sizes=(100, 1000, 10000), guests=3):
+    """
+    Time of encoding lists of reservations as served by the fast read path,
+    with datetimes left to the renderer, and decoding them again, with
+    DRF's JSON renderer and parser and the fast ones
+    """
+    creator = User.objects.create(username="benchmark")
+    invitees = [
+        User.objects.create(username=f"guest{number}")
+        for number in range(guests)
+    ]
+    room = MeetingRoom.objects.create(title="Room")
+    create_back_to_back_reservations(room, creator, max(sizes))
+    Invitation.objects.bulk_create(
+        Invitation(reservation_id=reservation_id, invitee=invitee)
+        for reservation_id in Reservation.objects.values_list(
+            "id", flat=True
+        )
+        for invitee in invitees
+    )
+    reservations = represent_reservations(
+        list(reservation_values(Reservation.objects.order_by("from_date")))
+    )
+    if renderers.orjson is None:
+        stdout.write("orjson is not installed, the fast classes fall back")
+
+    stdout.write(
+        f"{'reservations':>12} {'KB':>8} {'encoder':<8} "
+        f"{'encode ms':>10} {'decode ms':>10}"
+    )
+    for size in sizes:
+        data = {"next": None, "previous": None, "results": reservations[:size]}
+        for name, renderer, parser in [
+            ("stdlib", JSONRenderer(), JSONParser()),
+            ("fast", FastJSONRenderer(), FastJSONParser()),
+        ]:
+            body = renderer.render(data)
+            repeat = max(5, 10000 // size)
+            encode = timed(lambda: renderer.render(data), repeat=repeat)
+            decode = timed(
+                lambda: parser.parse(io.BytesIO(body)), repeat=repeat
+            )
+            stdout.write(
+                f"{size:>12} {len(body) / 1024:>8.0f} {name:<8} "
+                f"{encode * 1000:>10.2f} {decode * 1000:>10.2f}"
+            )
+            stdout.record(f"encode {size}, {name}", encode, bytes=len(body))
+            stdout.record(f"decode {size}, {name}", decode)
+
+
+def wsgi_get(application, path, query, headers):
+    """Call a WSGI application like a server would, return the status"""
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "localhost",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.url_scheme": "http",
+        "wsgi.errors": io.StringIO(),
+    }
+    for name, value in headers.items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    status = []
+    body = application(environ, lambda code, _: status.append(code))
+    try:
+        for _ in body:
+            pass
+    finally:
+        body.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_get(application, path, query, headers):
+    """Call an ASGI application like a server would, return the status"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "query_string": query.encode("ascii"),
+        "headers": [(b"host", b"localhost")]
+        + [
+            (name.lower().encode("ascii"), value.encode("latin-1"))
+            for name, value in headers.items()
+        ],
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 50000),
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def load_test(get, clients, requests):
+    """
+    Send `requests` requests from `clients` concurrent clients, each
+    waiting for its previous response, and return the wall time and the
+    latencies, sorted
+    """
+    latencies = []
+
+    async def client(count):
+        for _ in range(count):
+            started = time.perf_counter()
+            assert await get() == 200
+            latencies.append(time.perf_counter() - started)
+
+    async def run():
+        await asyncio.gather(
+            *(
+                client(len(range(number, requests, clients)))
+                for number in range(clients)
+            )
+        )
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - started, sorted(latencies)
+
+
+@benchmark
+def async_reads(
+    stdout,
+    scale=1.0,
+    clients=(10, 200),
+    latencies=(0, 0.002),
+    requests=200,
+    threads=8,
+):
+    """
+    Load test of the read endpoints: the async ones served through the ASGI
+    application, against the sync ones through the WSGI application with a
+    pool of `threads` worker threads, like a threaded WSGI server process,
+    and through the ASGI application. Each query can be delayed, as a stand
+    in for the round trip to a database server
+    """
+    history_start = datetime(2021, 1, 4, tzinfo=timezone.utc)
+    Seeder(start=history_start, random_seed=0).run(
+        rooms=max(1, int(100 * scale)), reservations_per_room=200, users=50
+    )
+    token = Token.objects.create(user=User.objects.order_by("id").first())
+    headers = {"Authorization": f"Token {token.key}"}
+    reservation_id = Reservation.objects.order_by("id").first().id
+    window = urlencode(
+        {
+            "from": history_start.isoformat(),
+            "to": (history_start + timedelta(days=1)).isoformat(),
+        }
+    )
+    endpoints = [
+        ("list", "reservations/", ""),
+        ("detail", f"reservations/{reservation_id}/", ""),
+        ("availability", "rooms/availability/", window),
+    ]
+
+    delay = {"seconds": 0}
+
+    def network_latency(execute, sql, params, many, context):
+        if delay["seconds"]:
+            time.sleep(delay["seconds"])
+        return execute(sql, params, many, context)
+
+    def add_latency(sender, connection, **kwargs):
+        if network_latency not in connection.execute_wrappers:
+            connection.execute_wrappers.append(network_latency)
+
+    wsgi = WSGIHandler()
+    asgi = ASGIHandler()
+    pool = ThreadPoolExecutor(threads)
+
+    def servers(path, query):
+        def wsgi_sync():
+            return asyncio.get_running_loop().run_in_executor(
+                pool, wsgi_get, wsgi, f"/api/{path}", query, headers
+            )
+
+        return [
+            (f"WSGI, {threads} threads", wsgi_sync),
+            (
+                "ASGI, sync views",
+                lambda: asgi_get(asgi, f"/api/{path}", query, headers),
+            ),
+            (
+                "ASGI, async views",
+                lambda: asgi_get(asgi, f"/api/async/{path}", query, headers),
+            ),
+        ]
+
+    stdout.write(
+        f"{'endpoint':<13} {'server':<18} {'clients':>7} {'delay ms':>8} "
+        f"{'requests/s':>10} {'p50 ms':>8} {'p95 ms':>8}"
+    )
+    connection_created.connect(add_latency)
+    try:
+        for endpoint, path, query in endpoints:
+            for server, get in servers(path, query):
+                for seconds in latencies:
+                    delay["seconds"] = seconds
+                    for count in clients:
+                        elapsed, times = load_test(get, count, requests)
+                        p50 = times[len(times) // 2]
+                        p95 = times[int(len(times) * 0.95)]
+                        stdout.write(
+                            f"{endpoint:<13} {server:<18} {count:>7} "
+                            f"{seconds * 1000:>8.0f} "
+                            f"{requests / elapsed:>10.1f} "
+                            f"{p50 * 1000:>8.1f} {p95 * 1000:>8.1f}"
+                        )
+                        stdout.record(
+                            f"{endpoint}, {server}, {count} clients, "
+                            f"{seconds * 1000:.0f} ms delay",
+                            elapsed / requests,
+                            requests_per_second=requests / elapsed,
+                            p50=p50,
+                            p95=p95,
+                        )
+    finally:
+        delay["seconds"] = 0
+        connection_created.disconnect(add_latency)
+        pool.shutdown()
+
+
+@benchmark
+def room_events(stdout, displays=(100, 1000, 5000), reservations=200):
+    """
+    Cost of keeping room displays current: polling the room every 5
+    seconds, against the latency from saving a change to all of them having
+    it pushed through the event hub
+    """
+    creator = User.objects.create(username="benchmark")
+    room = MeetingRoom.objects.create(title="Room")
+    create_back_to_back_reservations(room, creator, reservations)
+    reservation = room.reservations.first()
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    url = reverse("rooms-detail", args=[room.id])
+    poll = timed(lambda: client.get(url), repeat=20)
+    titles = iter(range(10 ** 6))
+
+    def update():
+        reservation.title = f"Meeting {next(titles)}"
+        reservation.save()
+        connection.close()
+
+    async def push(count, rounds=10):
+        subscriptions = [hub.subscribe(room.id) for _ in range(count)]
+        loop = asyncio.get_running_loop()
+        latencies = []
+        try:
+            for _ in range(rounds):
+                started = time.perf_counter()
+                await loop.run_in_executor(None, update)
+                for subscription in subscriptions:
+                    await subscription.queue.get()
+                latencies.append(time.perf_counter() - started)
+        finally:
+            for subscription in subscriptions:
+                hub.unsubscribe(subscription)
+        return statistics.median(latencies)
+
+    stdout.write(
+        f"{'displays':>8} {'polls/s':>8} {'poll CPU s/s':>13} {'push ms':>8}"
+    )
+    for count in displays:
+        latency = asyncio.run(push(count))
+        stdout.write(
+            f"{count:>8} {count / 5:>8.0f} {count / 5 * poll:>13.2f} "
+            f"{latency * 1000:>8.2f}"
+        )
+        stdout.record(
+            f"push to {count} displays",
+            latency,
+            polling_seconds_per_second=count / 5 * poll,
+        )
+
+
+@benchmark
+def incremental_sync(
+    stdout, sizes=(1000, 10000, 50000), changes=(0, 10, 100), guests=3
+):
+    """
+    Cost of a client catching up: a full sync of every reservation, in
+    pages of 1000, against syncing the changes since its last token, and
+    the cost recording a change adds to every write
+    """
+    creator = User.objects.create(username="benchmark")
+    invitees = [
+        User.objects.create(username=f"guest{number}")
+        for number in range(guests)
+    ]
+    room = MeetingRoom.objects.create(title="Room")
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    url = reverse("reservations-sync")
+
+    def sync(token=None):
+        """Follow the tokens until up to date, return the last one"""
+        while True:
+            params = {"page_size": 1000}
+            if token is not None:
+                params["since"] = token
+            data = client.get(url, params).data
+            token = data["token"]
+            if not data["more"]:
+                return token
+
+    stdout.write(f"{'reservations':>12} {'sync':<16} {'ms':>9}")
+    created = 0
+    for size in sizes:
+        create_back_to_back_reservations(
+            room,
+            creator,
+            size - created,
+            datetime(2000, 1, 1, tzinfo=timezone.utc)
+            + timedelta(hours=created),
+        )
+        created = size
+        Invitation.objects.bulk_create(
+            Invitation(reservation_id=reservation_id, invitee=invitee)
+            for reservation_id in Reservation.objects.filter(
+                guests__isnull=True
+            ).values_list("id", flat=True)
+            for invitee in invitees
+        )
+        elapsed = timed(sync, repeat=3)
+        stdout.write(f"{size:>12} {'full':<16} {elapsed * 1000:>9.1f}")
+        stdout.record(f"full sync of {size}", elapsed)
+        for count in changes:
+            token = sync()
+            for reservation in Reservation.objects.order_by("?")[:count]:
+                reservation.title += "."
+                reservation.save()
+            elapsed = timed(lambda: sync(token), repeat=10)
+            name = f"{count} changes"
+            stdout.write(f"{size:>12} {name:<16} {elapsed * 1000:>9.1f}")
+            stdout.record(f"sync of {count} changes of {size}", elapsed)
+
+    reservation_id = Reservation.objects.values_list("id", flat=True)[0]
+    elapsed = timed(lambda: record_changes([reservation_id]))
+    stdout.write(f"recording a change adds {elapsed * 1000:.3f} ms per write")
+    stdout.record("recording a change", elapsed)
+
+
+@benchmark
+def database_connections(
+    stdout, requests=400, threads=8, connect_latency=0.003, pool_size=4
+):
+    """
+    Latency of a small read when every request connects to the database,
+    when threads keep their connection and when they share a pool of them,
+    served by a fixed set of threads like gunicorn's, and by a new thread
+    per request like runserver's. Against SQLite connecting is nearly free,
+    so it is delayed by `connect_latency` as a stand in for PostgreSQL's
+    connection setup
+    """
+    creator = User.objects.create(username="benchmark")
+    room = MeetingRoom.objects.create(title="Room")
+    create_back_to_back_reservations(room, creator, 10)
+    token = Token.objects.create(user=creator)
+    headers = {"Authorization": f"Token {token.key}"}
+    path = f"/api/reservations/{room.reservations.first().id}/"
+    if connection.vendor != "sqlite":
+        connect_latency = 0
+    connects = Counter()
+
+    def slow_connect(sender, connection, **kwargs):
+        if not connection.connection_reused:
+            connects["new"] += 1
+            time.sleep(connect_latency)
+
+    application = WSGIHandler()
+
+    def get():
+        started = time.perf_counter()
+        assert wsgi_get(application, path, "", headers) == 200
+        return time.perf_counter() - started
+
+    def fixed_threads():
+        with ThreadPoolExecutor(threads) as pool:
+            return list(pool.map(lambda _: get(), range(requests)))
+
+    def thread_per_request():
+        latencies = []
+        for start in range(0, requests, threads):
+            workers = [
+                threading.Thread(target=lambda: latencies.append(get()))
+                for _ in range(min(threads, requests - start))
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        return latencies
+
+    settings_dict = connection.settings_dict
+    saved = {
+        name: settings_dict.get(name)
+        for name in ("CONN_MAX_AGE", "POOL_SIZE")
+    }
+    stdout.write(
+        f"connecting takes {connect_latency * 1000:.0f} ms more "
+        f"{'(simulated)' if connect_latency else ''}"
+    )
+    stdout.write(
+        f"{'server':<22} {'connections':<20} {'requests/s':>10} "
+        f"{'p50 ms':>7} {'p95 ms':>7} {'connects':>8}"
+    )
+    connection_created.connect(slow_connect)
+    try:
+        for server, run in [
+            (f"{threads} threads", fixed_threads),
+            ("thread per request", thread_per_request),
+        ]:
+            for name, max_age, size in [
+                ("new per request", 0, 0),
+                ("kept by threads", 60, 0),
+                (f"pool of {pool_size}", 0, pool_size),
+            ]:
+                settings_dict.update(CONN_MAX_AGE=max_age, POOL_SIZE=size)
+                connects.clear()
+                started = time.perf_counter()
+                latencies = sorted(run())
+                elapsed = time.perf_counter() - started
+                p50 = latencies[len(latencies) // 2]
+                p95 = latencies[int(len(latencies) * 0.95)]
+                stdout.write(
+                    f"{server:<22} {name:<20} {requests / elapsed:>10.1f} "
+                    f"{p50 * 1000:>7.2f} {p95 * 1000:>7.2f} "
+                    f"{connects['new']:>8}"
+                )
+                stdout.record(
+                    f"{server}, {name}",
+                    p50,
+                    requests_per_second=requests / elapsed,
+                    p95=p95,
+                    connects=connects["new"],
+                )
+                close_pools()
+    finally:
+        connection_created.disconnect(slow_connect)
+        settings_dict.update(saved)
+        close_pools()
+
+
+@benchmark
+def token_authentication(stdout, reservations=10):
+    """
+    Queries and latency of token authenticated reads when the token and its
+    user are looked up on every request, and when they are cached
+    """
+    creator = User.objects.create(username="benchmark")
+    room = MeetingRoom.objects.create(title="Room")
+    create_back_to_back_reservations(room, creator, reservations)
+    _, key = AuthToken.objects.issue(creator)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+    stdout.write(f"{'endpoint':<20} {'tokens':<10} {'queries':>7} {'ms':>8}")
+    for url in (reverse("reservations-list"), reverse("rooms-list")):
+        for name, size in [("looked up", 0), ("cached", 10000)]:
+            with override_settings(ACCOUNTS_TOKEN_CACHE_SIZE=size):
+                client.get(url)
+                # requests start by resetting the queries log
+                reset_queries()
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(url)
+                elapsed = timed(lambda: client.get(url), repeat=200)
+            stdout.write(
+                f"{url:<20} {name:<10} {len(queries):>7} "
+                f"{elapsed * 1000:>8.2f}"
+            )
+            stdout.record(f"{url}, {name}", elapsed, queries=len(queries))
+    stdout.write(f"token cache events: {token_cache_stats()}")
+
+
+@benchmark
+def token_verification(stdout, threads=(1, 8), requests=2000, users=8):
+    """
+    Time spent authenticating a request, by threads verifying tokens at the
+    same time: plaintext tokens looked up by key, hashed tokens looked up by
+    prefix and compared with their digest, and hashed tokens verified once
+    then cached
+    """
+    creators = [
+        User.objects.create(username=f"benchmark{number}")
+        for number in range(users)
+    ]
+    plaintext = [Token.objects.create(user=user).key for user in creators]
+    hashed = [AuthToken.objects.issue(user)[1] for user in creators]
+    stdout.write(
+        f"{'tokens':<16} {'threads':>7} {'verified/s':>10} "
+        f"{'p50 us':>8} {'p95 us':>8}"
+    )
+    for name, authentication, keys, size in [
+        ("plaintext", TokenAuthentication(), plaintext, 0),
+        ("hashed", HashedTokenAuthentication(), hashed, 0),
+        ("hashed, cached", HashedTokenAuthentication(), hashed, 10000),
+    ]:
+        for count in threads:
+
+            def verify(worker):
+                latencies = []
+                try:
+                    for number in range(worker, requests, count):
+                        key = keys[number % len(keys)]
+                        started = time.perf_counter()
+                        authentication.authenticate_credentials(key)
+                        latencies.append(time.perf_counter() - started)
+                finally:
+                    # the connections of the worker threads
+                    if worker:
+                        connection.close()
+                return latencies
+
+            with override_settings(ACCOUNTS_TOKEN_CACHE_SIZE=size):
+                verify(0)
+                started = time.perf_counter()
+                with ThreadPoolExecutor(count) as pool:
+                    latencies = sorted(
+                        latency
+                        for worker in pool.map(verify, range(1, count + 1))
+                        for latency in worker
+                    )
+                elapsed = time.perf_counter() - started
+            p50 = latencies[len(latencies) // 2]
+            p95 = latencies[int(len(latencies) * 0.95)]
+            stdout.write(
+                f"{name:<16} {count:>7} {len(latencies) / elapsed:>10.0f} "
+                f"{p50 * 1e6:>8.1f} {p95 * 1e6:>8.1f}"
+            )
+            stdout.record(
+                f"{name}, {count} threads",
+                p50,
+                verified_per_second=len(latencies) / elapsed,
+                p95=p95,
+            )
+
+
+@benchmark
+def room_schedules(stdout, rooms=1000, days=28, per_day=4):
+    """
+    Latency of a week of every room's reservations from the rooms list
+    limited to the week, and from the stored schedules, and the cost of
+    keeping the schedules up to date on writes
+    """
+    creator = User.objects.create(username="benchmark")
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    first_day = datetime(2030, 1, 7, tzinfo=timezone.utc)
+    room_ids = []
+    reservations = []
+    for number in range(rooms):
+        room = MeetingRoom.objects.create(title=f"Room {number}")
+        room_ids.append(room.id)
+        for day in range(days):
+            for hour in range(9, 9 + 2 * per_day, 2):
+                from_date = first_day + timedelta(days=day, hours=hour)
+                reservations.append(
+                    Reservation(
+                        title="Meeting",
+                        from_date=from_date,
+                        to_date=from_date + timedelta(hours=1),
+                        room=room,
+                        creator=creator,
+                    )
+                )
+    Reservation.objects.bulk_create(reservations, batch_size=5000)
+    started = time.perf_counter()
+    rebuild_schedules()
+    stdout.write(
+        f"{len(reservations)} reservations in {rooms} rooms, schedules "
+        f"built in {time.perf_counter() - started:.1f} s"
+    )
+    stdout.record("rebuild", time.perf_counter() - started)
+
+    week = first_day + timedelta(days=days // 2)
+    stdout.write(f"{'week of every room':<22} {'queries':>7} {'ms':>8}")
+    for name, url, params in [
+        (
+            "rooms list",
+            reverse("rooms-list"),
+            {
+                "from": week.isoformat(),
+                "to": (week + timedelta(days=7)).isoformat(),
+                "page_size": 1000,
+            },
+        ),
+        (
+            "schedule",
+            reverse("rooms-schedule"),
+            {"from": week.date().isoformat(), "days": 7},
+        ),
+    ]:
+        # requests start by resetting the queries log
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url, params)
+        elapsed = timed(lambda: client.get(url, params), repeat=10)
+        stdout.write(f"{name:<22} {len(queries):>7} {elapsed * 1000:>8.1f}")
+        stdout.record(name, elapsed, queries=len(queries))
+
+    reservation = Reservation.objects.filter(room_id=room_ids[0]).first()
+    # back and forth between its slot and the free hour after the same slot
+    # of the next day, the days are full otherwise
+    steps = cycle([timedelta(days=1, hours=1), -timedelta(days=1, hours=1)])
+    stdout.write(f"{'moving a reservation':<22} {'queries':>7} {'ms':>8}")
+    for name, enabled in [("without schedules", False), ("with", True)]:
+        with override_settings(RESERVATIONS_SCHEDULES=enabled):
+
+            def move():
+                step = next(steps)
+                reservation.from_date += step
+                reservation.to_date += step
+                reservation.save()
+
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                move()
+            elapsed = timed(move, repeat=50)
+        stdout.write(f"{name:<22} {len(queries):>7} {elapsed * 1000:>8.2f}")
+        stdout.record(f"move, {name}", elapsed, queries=len(queries))
+
+
+@benchmark
+def utilization_analytics(stdout, rooms=(100, 1000), days=365, per_day=3):
+    """
+    Time to compute a year's utilization report of every room, the part of
+    it spent fetching the reservations, and to serve it from the cache
+    """
+    creator = User.objects.create(username="benchmark")
+    first_day = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    last_day = (first_day + timedelta(days=days - 1)).date()
+    stdout.write(
+        f"{'rooms':>6} {'reservations':>13} {'fetch s':>8} {'report s':>9} "
+        f"{'cached ms':>10}"
+    )
+    created = 0
+    for room_count in rooms:
+        # rooms are added to the ones of the previous size, deleting the
+        # reservations would take longer than booking them
+        reservations = []
+        for number in range(created, room_count):
+            room = MeetingRoom.objects.create(title=f"Room {number}")
+            first_hour = 9 + number % 3
+            for day in range(days):
+                for hour in range(first_hour, first_hour + 3 * per_day, 3):
+                    from_date = first_day + timedelta(days=day, hours=hour)
+                    reservations.append(
+                        Reservation(
+                            title="Meeting",
+                            from_date=from_date,
+                            to_date=from_date + timedelta(hours=2),
+                            room=room,
+                            creator=creator,
+                        )
+                    )
+            if len(reservations) >= 50000:
+                Reservation.objects.bulk_create(
+                    reservations, batch_size=5000
+                )
+                reservations = []
+        Reservation.objects.bulk_create(reservations, batch_size=5000)
+        created = room_count
+        count = Reservation.objects.count()
+
+        window_end = first_day + timedelta(days=days)
+        fetch = timed(
+            lambda: busy_intervals(first_day, window_end), repeat=3
+        )
+        report = timed(
+            lambda: utilization_report(first_day.date(), last_day), repeat=3
+        )
+        with override_settings(
+            CACHES={
+                **settings.CACHES,
+                "analytics": parse_cache_url("locmem://analytics"),
+            }
+        ):
+            cached_report(first_day.date(), last_day)
+            cached = timed(
+                lambda: cached_report(first_day.date(), last_day), repeat=20
+            )
+        stdout.write(
+            f"{room_count:>6} {count:>13} {fetch:>8.2f} {report:>9.2f} "
+            f"{cached * 1000:>10.2f}"
+        )
+        stdout.record(
+            f"{room_count} rooms", report, fetch=fetch, cached=cached
+        )
+
+
+def find_conflicts_person_by_person(user_ids, series):
+    """
+    The other meetings of every user at the time of a single reservation
+    with a query for the ones they created and one for their invitations
+    """
+    conflicts = []
+    window = window_filter(series.from_date, series.to_date)
+    for user_id in user_ids:
+        reservations = list(
+            Reservation.objects.filter(window, creator_id=user_id)
+        ) + [
+            invitation.reservation
+            for invitation in Invitation.objects.filter(
+                window_filter(
+                    series.from_date, series.to_date, prefix="reservation__"
+                ),
+                invitee_id=user_id,
+            )
+            .exclude(status=Invitation.NOT_ATTENDING)
+            .select_related("reservation")
+        ]
+        conflicts.extend(
+            (user_id, reservation.id)
+            for reservation in reservations
+            if clashes(series, reservation)
+        )
+    return conflicts
+
+
+@benchmark
+def attendee_conflicts(stdout, guests=(10, 100, 500), history=200):
+    """
+    Queries and latency of looking up the other meetings of the guests of a
+    reservation person by person and with the single query of the
+    serializer, every guest having been invited to `history` meetings
+    """
+    organizer = User.objects.create(username="benchmark")
+    room = MeetingRoom.objects.create(title="Room")
+    start = datetime(2030, 1, 1, 9, tzinfo=timezone.utc)
+    stdout.write(
+        f"{'guests':>6} {'invitations':>12} {'approach':<16} {'queries':>7} "
+        f"{'ms':>8}"
+    )
+    User.objects.bulk_create(
+        User(username=f"guest-{number}") for number in range(max(guests))
+    )
+    users = list(
+        User.objects.filter(username__startswith="guest-")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    Reservation.objects.bulk_create(
+        Reservation(
+            title=f"Meeting {number}",
+            from_date=start + timedelta(days=number),
+            to_date=start + timedelta(days=number, hours=1),
+            room=room,
+            creator=organizer,
+        )
+        for number in range(history)
+    )
+    meetings = list(Reservation.objects.order_by("id"))
+    invited = 0
+    # a meeting in the middle of the history, clashing with one of them
+    series = Series(
+        start + timedelta(days=history // 2, minutes=30),
+        start + timedelta(days=history // 2, hours=2),
+        "",
+        1,
+        None,
+        None,
+        [],
+    )
+    for size in guests:
+        Invitation.objects.bulk_create(
+            (
+                Invitation(
+                    reservation=meeting,
+                    invitee_id=user_id,
+                    status=Invitation.ATTENDING,
+                )
+                for meeting in meetings
+                for user_id in users[invited:size]
+            ),
+            batch_size=5000,
+        )
+        invited = size
+        user_ids = [organizer.id, *users[:size]]
+        for name, check in [
+            ("person by person", find_conflicts_person_by_person),
+            ("single query", find_conflicts),
+        ]:
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                found = check(user_ids, series)
+            assert len(found) == size + 1, found
+            elapsed = timed(lambda: check(user_ids, series), repeat=10)
+            stdout.write(
+                f"{size:>6} {size * history:>12} {name:<16} "
+                f"{len(queries):>7} {elapsed * 1000:>8.2f}"
+            )
+            stdout.record(
+                f"{name}, {size} guests", elapsed, queries=len(queries)
+            )
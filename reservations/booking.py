@@ -0,0 +1,42 @@
+import threading
+from contextlib import ExitStack, contextmanager
+from django.db import connection, transaction
+from .models import MeetingRoom
+
+# name of the PostgreSQL exclusion constraint created by migration 0003
+NO_OVERLAP_CONSTRAINT = "reservation_room_no_overlap"
+
+# SQLite allows a single writer at a time anyway, so without row locks all
+# bookings of the process are serialized by one lock
+_booking_lock = threading.RLock()
+
+
+@contextmanager
+def room_lock(*room_ids):
+    """
+    Serialize bookings of the given rooms until the surrounding transaction
+    commits, so that the overlap check and the write cannot interleave with
+    another booking of the same room.
+
+    Rows of the rooms are locked with SELECT ... FOR UPDATE where the
+    database supports it. SQLite does not, so bookings are serialized by a
+    lock of the current process instead.
+    """
+    room_ids = sorted(set(room_ids))
+    with ExitStack() as stack:
+        if not connection.features.has_select_for_update:
+            stack.enter_context(_booking_lock)
+        stack.enter_context(transaction.atomic())
+        if connection.features.has_select_for_update:
+            list(
+                MeetingRoom.objects.select_for_update()
+                .filter(pk__in=room_ids)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+        yield
+
+
+def is_overlap_violation(error):
+    """Tell whether an IntegrityError was raised by the exclusion constraint"""
+    return NO_OVERLAP_CONSTRAINT in str(error)
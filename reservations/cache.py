@@ -0,0 +1,225 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from uuid import uuid4
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import Reservation, Invitation
+
+logger = logging.getLogger("django")
+
+CACHE_ALIAS = "reservations"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+_batch = threading.local()
+
+
+def get_cache():
+    """
+    The cache of user reservation lists and of the versions of users' and
+    rooms' reservations, or None if none is configured
+    """
+    if CACHE_ALIAS not in settings.CACHES:
+        return None
+    return caches[CACHE_ALIAS]
+
+
+def get_timeout():
+    return getattr(settings, "RESERVATIONS_CACHE_TIMEOUT", 300)
+
+
+def count(event, amount=1):
+    with _stats_lock:
+        _stats[event] += amount
+
+
+def cache_stats():
+    """Hits, misses, 304 responses and invalidations in this process"""
+    with _stats_lock:
+        return {
+            event: _stats[event]
+            for event in ("hits", "misses", "not_modified", "invalidations")
+        }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+USER = "user"
+ROOM = "room"
+
+
+def version_key(object_id, scope=USER):
+    return f"{scope}:{object_id}:version"
+
+
+def new_version():
+    """A unique version token which also tells when it was issued"""
+    return f"{time.time_ns() // 1000:x}.{uuid4().hex[:16]}"
+
+
+def version_time(version):
+    """
+    When a version was issued, i.e. a time after which the data it stands
+    for didn't change
+    """
+    issued, _, _ = version.partition(".")
+    try:
+        microseconds = int(issued, 16)
+    except ValueError:
+        return None
+    return datetime.fromtimestamp(microseconds / 1e6, timezone.utc)
+
+
+def get_version(cache, object_id, scope=USER):
+    """
+    The token of the current version of a user's or a room's reservations.
+    Invalidating replaces it, which orphans every list cached under the old
+    one
+    """
+    key = version_key(object_id, scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(user_ids, room_ids=()):
+    cache = get_cache()
+    if cache is None or not (user_ids or room_ids):
+        return
+    logger.info(
+        f"Invalidating cached reservations of {len(user_ids)} users "
+        f"and {len(room_ids)} rooms"
+    )
+    cache.set_many(
+        {
+            **{version_key(user_id): new_version() for user_id in user_ids},
+            **{
+                version_key(room_id, ROOM): new_version()
+                for room_id in room_ids
+            },
+        },
+        None,
+    )
+    count("invalidations", len(user_ids) + len(room_ids))
+
+
+def related_ids(reservation_ids):
+    """
+    The creators and the guests of the reservations, and their rooms, in
+    one query
+    """
+    creators = Reservation.objects.filter(pk__in=reservation_ids).values_list(
+        "creator_id", "room_id"
+    )
+    guests = Invitation.objects.filter(
+        reservation_id__in=reservation_ids
+    ).values_list("invitee_id", "reservation__room_id")
+    user_ids, room_ids = set(), set()
+    for user_id, room_id in creators.union(guests):
+        user_ids.add(user_id)
+        room_ids.add(room_id)
+    return user_ids, room_ids
+
+
+def invalidate(user_ids=(), reservation_ids=(), room_ids=()):
+    """
+    Drop the cached reservations of the users and the rooms, and of
+    everyone and every room related to the reservations. They are dropped
+    right away and again after the transaction commits, since a list cached
+    in between could have been read before the change was visible
+    """
+    if get_cache() is None:
+        return
+    batch = getattr(_batch, "pending", None)
+    if batch is not None:
+        batch[0].update(user_ids)
+        batch[1].update(reservation_ids)
+        batch[2].update(room_ids)
+        return
+    user_ids, room_ids = set(user_ids), set(room_ids)
+    if reservation_ids:
+        related_users, related_rooms = related_ids(reservation_ids)
+        user_ids |= related_users
+        room_ids |= related_rooms
+    bump_versions(user_ids, room_ids)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: bump_versions(user_ids, room_ids))
+
+
+@contextmanager
+def batched_invalidation():
+    """
+    Collect the invalidations made by the signals of many writes, e.g. of a
+    cascading delete, and apply them together at the end of the block, so
+    the related users are looked up with a single query
+    """
+    if getattr(_batch, "pending", None) is not None:
+        yield
+        return
+    _batch.pending = (set(), set(), set())
+    try:
+        yield
+    finally:
+        user_ids, reservation_ids, room_ids = _batch.pending
+        _batch.pending = None
+        invalidate(user_ids, reservation_ids, room_ids)
+
+
+def get_cache_key(request, user_id, version):
+    """
+    Cache key and ETag of a list request: the user's version and a digest of
+    everything else the response depends on, the query string and the host
+    links are built with
+    """
+    query = sorted(request.query_params.lists())
+    digest = hashlib.sha1(
+        f"{request.get_host()}?{query}".encode("utf-8")
+    ).hexdigest()
+    return f"user:{user_id}:{version}:{digest}", f'"{version}-{digest}"'
+
+
+def cached_user_list(request, user_id, get_response):
+    """
+    Serve a list of a user's reservations from the cache, or a 304 if the
+    client already has the current version. `get_response` builds the
+    response on a miss
+    """
+    cache = get_cache()
+    if cache is None or not user_id.isdigit():
+        return get_response()
+
+    key, etag = get_cache_key(
+        request, user_id, get_version(cache, int(user_id))
+    )
+    if etag in request.headers.get("If-None-Match", ""):
+        count("not_modified")
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        data = cache.get(key)
+        if data is not None:
+            count("hits")
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+        else:
+            count("misses")
+            response = get_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, get_timeout())
+            response["X-Cache"] = "MISS"
+    response["ETag"] = etag
+    return response
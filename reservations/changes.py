@@ -0,0 +1,106 @@
+import threading
+from contextlib import contextmanager
+from django.db import connection
+from .models import (
+    Invitation,
+    ParticipantChange,
+    Reservation,
+    ReservationChange,
+)
+
+_batch = threading.local()
+
+
+def next_sequence():
+    """
+    SQL computing the sequence of the changes of the current write. On
+    PostgreSQL it is the id of the writing transaction, elsewhere one more
+    than the latest sequence, which is safe since SQLite has a single writer
+    """
+    if connection.vendor == "postgresql":
+        return "txid_current()"
+    table = connection.ops.quote_name(ReservationChange._meta.db_table)
+    return f"(SELECT COALESCE(MAX(sequence), 0) + 1 FROM {table})"
+
+
+def participants(reservation_ids):
+    """
+    The (user id, reservation id) of the creators and the guests of the
+    reservations, in one query
+    """
+    creators = Reservation.objects.filter(pk__in=reservation_ids).values_list(
+        "creator_id", "id"
+    )
+    guests = Invitation.objects.filter(
+        reservation_id__in=reservation_ids
+    ).values_list("invitee_id", "reservation_id")
+    return set(creators.union(guests))
+
+
+def upsert(cursor, model, columns, rows, sequence):
+    table = connection.ops.quote_name(model._meta.db_table)
+    placeholders = ", ".join(["%s"] * len(columns) + [sequence])
+    for start in range(0, len(rows), 500):
+        chunk = rows[start:start + 500]
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}, sequence) "
+            f"VALUES {', '.join([f'({placeholders})'] * len(chunk))} "
+            f"ON CONFLICT ({', '.join(columns)}) "
+            f"DO UPDATE SET sequence = excluded.sequence",
+            [value for row in chunk for value in row],
+        )
+
+
+def record_changes(reservation_ids, former_participants=()):
+    """
+    Move the reservations to the end of the sequence of changes, in the
+    transaction writing them, for everyone and for each of their current
+    participants and of the `former_participants`, (user id, reservation
+    id) pairs of the people the writes took out of them. Changes made in a
+    batched_changes() block are recorded together at its end
+    """
+    pending = getattr(_batch, "pending", None)
+    if pending is not None:
+        pending[0].update(reservation_ids)
+        pending[1].update(former_participants)
+        return
+    reservation_ids = sorted(set(reservation_ids))
+    if not reservation_ids:
+        return
+    pairs = sorted(set(former_participants) | participants(reservation_ids))
+    sequence = next_sequence()
+    with connection.cursor() as cursor:
+        # first, since on SQLite the sequence is computed from the changes
+        # of the reservations
+        upsert(
+            cursor,
+            ParticipantChange,
+            ("user_id", "reservation_id"),
+            pairs,
+            sequence,
+        )
+        upsert(
+            cursor,
+            ReservationChange,
+            ("reservation_id",),
+            [(reservation_id,) for reservation_id in reservation_ids],
+            sequence,
+        )
+
+
+@contextmanager
+def batched_changes():
+    """
+    Record the changes made by the signals of many writes, e.g. of a
+    cascading delete, with a single query at the end of the block. Nothing
+    is recorded if the block fails, its transaction is rolled back
+    """
+    if getattr(_batch, "pending", None) is not None:
+        yield
+        return
+    pending = _batch.pending = (set(), set())
+    try:
+        yield
+    finally:
+        _batch.pending = None
+    record_changes(*pending)
@@ -0,0 +1,123 @@
+from django.conf import settings
+from .intervals import recurring_filter, single_filter, window_filter
+from .models import Invitation, Reservation
+from .recurrence import (
+    Series,
+    occurrences,
+    overlaps,
+    series_end,
+    series_overlap,
+)
+
+OFF = "off"
+WARN = "warn"
+ERROR = "error"
+
+# the columns of a reservation needed to tell whether it clashes
+COLUMNS = ("id", "title", "room_id", *Series._fields)
+
+
+def get_mode():
+    return getattr(settings, "RESERVATIONS_ATTENDEE_CONFLICTS", WARN)
+
+
+def commitments(user_ids, start, end=None, exclude=None):
+    """
+    The (user id, *COLUMNS) rows of the reservations the users created, or
+    were invited to and haven't declined, overlapping [start, end), where
+    `end` may be open, recurring ones whose series spans it included.
+
+    They all come with a single UNION ALL query, whatever the number of
+    users. Single and recurring reservations the users created are
+    separate parts of it, so that the former are a range of the
+    (creator, to_date, from_date) index, and invitations are read from the
+    (invitee, status, reservation) one
+    """
+    reservations = Reservation.objects.filter(creator_id__in=user_ids)
+    invitations = Invitation.objects.filter(
+        window_filter(start, end, prefix="reservation__"),
+        invitee_id__in=user_ids,
+    ).exclude(status=Invitation.NOT_ATTENDING)
+    if exclude is not None:
+        reservations = reservations.exclude(id=exclude)
+        invitations = invitations.exclude(reservation_id=exclude)
+    return (
+        reservations.filter(single_filter(start, end))
+        .values_list("creator_id", *COLUMNS)
+        .union(
+            reservations.filter(recurring_filter(start, end)).values_list(
+                "creator_id", *COLUMNS
+            ),
+            invitations.values_list(
+                "invitee_id",
+                *(f"reservation__{column}" for column in COLUMNS),
+            ),
+            all=True,
+        )
+    )
+
+
+def clashes(series, other):
+    """Tell whether any occurrences of two series overlap"""
+    if series.recurrence and other.recurrence:
+        return series_overlap(series, other)
+    if other.recurrence:
+        series, other = other, series
+    # at most `series` recurs now
+    if series.recurrence:
+        return overlaps(series, other.from_date, other.to_date)
+    return (
+        series.from_date < other.to_date and other.from_date < series.to_date
+    )
+
+
+def describe(user_id, reservation_id, title, room_id, series, other):
+    """The conflict of a user's meeting `series` with the reservation `other`"""
+    from_date, to_date = other.from_date, other.to_date
+    if other.recurrence and not series.recurrence:
+        # the occurrence the meeting clashes with
+        from_date, to_date = next(
+            occurrences(other, series.from_date, series.to_date)
+        )
+    return {
+        "user": user_id,
+        "reservation": reservation_id,
+        "title": title,
+        "room": room_id,
+        "from_date": from_date,
+        "to_date": to_date,
+    }
+
+
+def find_conflicts(user_ids, series, exclude=None):
+    """
+    The reservations, other than the one with id `exclude`, which the
+    users are committed to while any occurrence of `series` takes place,
+    as dicts naming the user and the reservation, ordered by user and start
+    time. A user's reservation is listed once, even if they both created it
+    and were invited to it
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return []
+    end = series_end(series) if series.recurrence else series.to_date
+    seen = set()
+    conflicts = []
+    for user_id, reservation_id, title, room_id, *fields in commitments(
+        user_ids, series.from_date, end, exclude
+    ):
+        other = Series(*fields)
+        if (user_id, reservation_id) in seen or not clashes(series, other):
+            continue
+        seen.add((user_id, reservation_id))
+        conflicts.append(
+            describe(user_id, reservation_id, title, room_id, series, other)
+        )
+    conflicts.sort(
+        key=lambda conflict: (
+            conflict["user"],
+            conflict["from_date"],
+            conflict["reservation"],
+        )
+    )
+    return conflicts
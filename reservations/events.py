@@ -0,0 +1,318 @@
+import asyncio
+import json
+import logging
+import queue
+import select
+import threading
+from collections import defaultdict, namedtuple
+from itertools import count
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+from meetings.renderers import FastJSONRenderer
+from .models import Reservation
+from .representations import represent_reservations, reservation_values
+
+logger = logging.getLogger("django")
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+# tells a subscriber which fell behind to start over
+RESET = b"event: reset\ndata: {}\n\n"
+
+# a reservation which was written, `room_ids` are the rooms it was in
+Change = namedtuple("Change", ["reservation_id", "created", "room_ids"])
+
+# the PostgreSQL channel changes are sent to the hubs of every process on
+CHANNEL = "reservation_events"
+
+
+def get_queue_size():
+    return getattr(settings, "RESERVATIONS_EVENTS_QUEUE_SIZE", 100)
+
+
+def notifications_enabled():
+    """
+    Whether changes are sent to the hubs of every process with PostgreSQL's
+    NOTIFY, rather than only to the hub of the process writing them
+    """
+    return (
+        getattr(settings, "RESERVATIONS_EVENTS_NOTIFY", False)
+        and connection.vendor == "postgresql"
+    )
+
+
+def encode_change(change):
+    return json.dumps(
+        [change.reservation_id, change.created, sorted(change.room_ids)]
+    )
+
+
+def decode_change(payload):
+    reservation_id, created, room_ids = json.loads(payload)
+    return Change(reservation_id, created, frozenset(room_ids))
+
+
+def notify(changes):
+    """
+    Send changes to the hubs of every process. PostgreSQL delivers them
+    when the current transaction commits, and drops them if it rolls back
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) payload",
+            [CHANNEL, [encode_change(change) for change in changes]],
+        )
+
+
+def listen(receive, listening, stopped, timeout=5):
+    """
+    Call `receive` with the payload of every change notified, setting
+    `listening` once they are, until `stopped` is set. The connection is of
+    its own, outside of the pool, and is checked whenever nothing was
+    received for `timeout` seconds, since a dropped one would go unnoticed
+    """
+    database = connections["default"]
+    listener = database.Database.connect(**database.get_connection_params())
+    try:
+        listener.autocommit = True
+        with listener.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+            listening.set()
+            while not stopped.is_set():
+                if not select.select([listener], [], [], timeout)[0]:
+                    cursor.execute("SELECT 1")
+                listener.poll()
+                while listener.notifies:
+                    receive(listener.notifies.pop(0).payload)
+    finally:
+        listener.close()
+
+
+def encode_event(event_id, event, data):
+    """A server-sent event, data is JSON on a single line"""
+    return (
+        f"id: {event_id}\nevent: {event}\ndata: ".encode("utf-8")
+        + FastJSONRenderer().render(data)
+        + b"\n\n"
+    )
+
+
+class Subscription:
+    """
+    The events of a room for one client, queued on its event loop. The
+    queue is bounded, a client which doesn't keep up gets a reset instead
+    of holding more and more events
+    """
+
+    def __init__(self, room_id, size):
+        self.room_id = room_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(size)
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+
+class Hub:
+    """
+    In-process fan-out of reservation events to the subscribers of each
+    room. Writes only record which reservations changed, in rooms someone
+    subscribed to. A publisher thread coalesces the changes, builds each
+    changed reservation once, with a query for a whole batch of them, and
+    hands the same encoded event to every subscriber of the room.
+
+    With notifications_enabled(), writes send their changes to the hubs of
+    every process instead, and a listener thread of each hub with
+    subscribers records the ones of the rooms it streams
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rooms = defaultdict(set)
+        self.changes = queue.Queue()
+        self.event_ids = count(1)
+        self.publisher = None
+        self.listener = None
+        self.listening = threading.Event()
+        self.stopped = threading.Event()
+
+    def subscribe(self, room_id):
+        subscription = Subscription(room_id, get_queue_size())
+        with self.lock:
+            self.rooms[room_id].add(subscription)
+        if notifications_enabled():
+            self.start_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.rooms.get(subscription.room_id, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self.rooms.pop(subscription.room_id, None)
+
+    def subscriber_count(self):
+        with self.lock:
+            return sum(len(subscribers) for subscribers in self.rooms.values())
+
+    def active(self):
+        return bool(self.rooms)
+
+    def watched(self, room_ids):
+        return any(room_id in self.rooms for room_id in room_ids)
+
+    def record(self, change):
+        """Queue a change for the publisher, starting it if needed"""
+        self.changes.put(change)
+        if self.publisher is None:
+            with self.lock:
+                if self.publisher is None:
+                    self.publisher = threading.Thread(
+                        target=self.run, name="reservation-events", daemon=True
+                    )
+                    self.publisher.start()
+
+    def receive(self, payload):
+        """Record a change notified by any process, if this one streams it"""
+        change = decode_change(payload)
+        # the room of a guest list is looked up by the publisher
+        if self.watched(change.room_ids) if change.room_ids else self.active():
+            self.record(change)
+
+    def start_listener(self):
+        if self.listener is None:
+            with self.lock:
+                if self.listener is None:
+                    self.stopped.clear()
+                    self.listener = threading.Thread(
+                        target=self.listen,
+                        name="reservation-notifications",
+                        daemon=True,
+                    )
+                    self.listener.start()
+
+    def stop_listener(self):
+        """Stop listening to notifications, e.g. before the database goes"""
+        listener = self.listener
+        if listener is not None:
+            self.stopped.set()
+            listener.join()
+            self.listener = None
+
+    def wait_until_listening(self, timeout=10):
+        """
+        Block until notifications are received, so that none of the changes
+        committed after a snapshot is read are missed. Only needed before
+        the first snapshot of a process
+        """
+        if self.listener is not None:
+            self.listening.wait(timeout)
+
+    def listen(self):
+        while not self.stopped.is_set():
+            try:
+                listen(self.receive, self.listening, self.stopped)
+            except Exception:
+                logger.exception("Lost the connection to reservation events")
+                self.stopped.wait(1)
+            finally:
+                if self.listening.is_set():
+                    self.listening.clear()
+                    # changes notified in between would be lost
+                    self.reset()
+
+    def reset(self):
+        """Make every subscriber start over with a new snapshot"""
+        with self.lock:
+            subscribers = [
+                subscription
+                for subscriptions in self.rooms.values()
+                for subscription in subscriptions
+            ]
+        self.deliver(subscribers, RESET)
+
+    def run(self):
+        while True:
+            changes = [self.changes.get()]
+            while len(changes) < 1000:
+                try:
+                    changes.append(self.changes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.publish_changes(changes)
+            except Exception:
+                logger.exception("Failed to publish reservation events")
+            finally:
+                close_old_connections()
+
+    def publish_changes(self, changes):
+        """
+        Publish the current state of changed reservations to the rooms
+        they are in, and their removal from rooms they left or were
+        deleted from
+        """
+        merged = {}
+        for change in changes:
+            previous = merged.get(change.reservation_id)
+            if previous is not None:
+                change = Change(
+                    change.reservation_id,
+                    previous.created or change.created,
+                    previous.room_ids | change.room_ids,
+                )
+            merged[change.reservation_id] = change
+        reservations = {
+            reservation["id"]: reservation
+            for reservation in represent_reservations(
+                list(
+                    reservation_values(
+                        Reservation.objects.filter(id__in=list(merged))
+                    )
+                )
+            )
+        }
+        for reservation_id, change in merged.items():
+            reservation = reservations.get(reservation_id)
+            room_id = reservation["room"] if reservation else None
+            for left in change.room_ids - {room_id}:
+                self.publish(left, DELETED, {"id": reservation_id})
+            if reservation is not None:
+                event = CREATED if change.created else UPDATED
+                self.publish(room_id, event, reservation)
+
+    def publish(self, room_id, event, data):
+        """Deliver an event to the subscribers of a room, from any thread"""
+        with self.lock:
+            subscribers = list(self.rooms.get(room_id, ()))
+        if subscribers:
+            self.deliver(
+                subscribers, encode_event(next(self.event_ids), event, data)
+            )
+
+    def deliver(self, subscribers, message):
+        """Hand a message to subscribers on their event loops"""
+        loops = defaultdict(list)
+        for subscription in subscribers:
+            loops[subscription.loop].append(subscription)
+        for loop, subscriptions in loops.items():
+            try:
+                loop.call_soon_threadsafe(deliver, subscriptions, message)
+            except RuntimeError:
+                # the loop is closed, its streams are gone
+                for subscription in subscriptions:
+                    self.unsubscribe(subscription)
+
+
+def deliver(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+hub = Hub()
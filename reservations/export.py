@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from .intervals import window_filter
+from .models import Reservation, Invitation
+
+CSV = "csv"
+JSON_LINES = "jsonl"
+FORMATS = (
+    (CSV, _("Comma separated values, one reservation per row")),
+    (JSON_LINES, _("JSON Lines, one reservation per line")),
+)
+CONTENT_TYPES = {CSV: "text/csv", JSON_LINES: "application/x-ndjson"}
+
+FIELDS = (
+    "id",
+    "title",
+    "from_date",
+    "to_date",
+    "room",
+    "creator",
+    "recurrence",
+    "recurrence_interval",
+    "recurrence_count",
+    "recurrence_until",
+    "recurrence_exceptions",
+    "recurrence_end",
+)
+DATETIME_FIELDS = (
+    "from_date",
+    "to_date",
+    "recurrence_until",
+    "recurrence_end",
+)
+
+
+def chunks_with_guests(rows, guest_fields, chunk_size=1000):
+    """
+    Group rows starting with a reservation id into chunks, and yield each
+    with the `guest_fields` of their invitations, fetched in one query per
+    chunk, by reservation id
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        guests = {}
+        for reservation_id, *guest in (
+            Invitation.objects.filter(
+                reservation_id__in=[row[0] for row in chunk]
+            )
+            .order_by("id")
+            .values_list("reservation_id", *guest_fields)
+        ):
+            guests.setdefault(reservation_id, []).append(guest)
+        yield chunk, guests
+
+
+def exported_reservations(start=None, end=None, room_ids=None):
+    """
+    Reservations overlapping the optional `start` - `end` window, of the
+    given rooms if any
+    """
+    reservations = Reservation.objects.filter(window_filter(start, end))
+    if room_ids is not None:
+        reservations = reservations.filter(room_id__in=room_ids)
+    return reservations
+
+
+def format_datetime(value):
+    """The representation of datetimes in the API"""
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def records(reservations, chunk_size=1000):
+    """
+    Lazily build the reservations of a queryset as dicts shaped like their
+    API representation, straight from database rows rather than through
+    serializers. Reservations are read with a server-side cursor where the
+    database has them, so memory doesn't grow with the export
+    """
+    rows = (
+        reservations.order_by("from_date", "id")
+        .values_list(*FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    for chunk, guests in chunks_with_guests(
+        rows, ("invitee_id", "status"), chunk_size
+    ):
+        for row in chunk:
+            record = dict(zip(FIELDS, row))
+            for field in DATETIME_FIELDS:
+                record[field] = format_datetime(record[field])
+            record["guests"] = [
+                {"invitee": invitee, "status": status}
+                for invitee, status in guests.get(row[0], [])
+            ]
+            yield record
+
+
+def csv_row(record):
+    # nested values are JSON, so the columns can be parsed back
+    return [
+        json.dumps(value) if isinstance(value, list) else value
+        for value in record.values()
+    ]
+
+
+def encode(records, output, batch_size=1000):
+    """
+    Encode records as CSV with a header row or as JSON Lines, yielding the
+    UTF-8 bytes of `batch_size` of them at a time
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if output == CSV:
+        writer.writerow(FIELDS + ("guests",))
+    for batch in iter(lambda: list(islice(records, batch_size)), []):
+        if output == CSV:
+            writer.writerows(csv_row(record) for record in batch)
+        else:
+            for record in batch:
+                buffer.write(json.dumps(record, separators=(",", ":")))
+                buffer.write("\n")
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if output == CSV and buffer.tell():
+        # a header without any rows
+        yield buffer.getvalue().encode("utf-8")
+
+
+def compress(chunks):
+    """Gzip a stream of bytes on the fly"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export(reservations, output=CSV, gzip=False, chunk_size=1000):
+    """Lazily export the reservations of a queryset as bytes"""
+    chunks = encode(records(reservations, chunk_size), output, chunk_size)
+    return compress(chunks) if gzip else chunks
@@ -0,0 +1,221 @@
+from datetime import datetime, time, timedelta
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import BaseRenderer
+from .cache import get_cache, get_version, version_time
+from .export import chunks_with_guests
+from .models import Invitation
+from .recurrence import (
+    DAILY,
+    MONTHLY,
+    WEEKLY,
+    Series,
+    excluded_dates,
+    occurrences,
+)
+
+PRODID = "-//meetings//reservations//EN"
+FREQUENCIES = {DAILY: "DAILY", WEEKLY: "WEEKLY", MONTHLY: "MONTHLY"}
+PARTICIPATION = {
+    Invitation.ATTENDING: "ACCEPTED",
+    Invitation.NOT_ATTENDING: "DECLINED",
+    Invitation.MAYBE: "TENTATIVE",
+}
+FIELDS = (
+    "id",
+    "title",
+    "room__title",
+    "creator__username",
+    "creator__email",
+) + Series._fields
+
+
+class ICalendarRenderer(BaseRenderer):
+    """
+    Lets clients asking for text/calendar through content negotiation.
+    Feeds are streamed by the views, this only renders errors
+    """
+
+    media_type = "text/calendar"
+    format = "ics"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, dict):
+            data = " ".join(str(value) for value in data.values())
+        return str(data).encode(self.charset)
+
+
+def escape(text):
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line):
+    """
+    Split a content line into lines of at most 75 octets, without cutting
+    UTF-8 sequences, as RFC 5545 requires
+    """
+    encoded = line.encode("utf-8")
+    parts = []
+    limit = 75
+    while len(encoded) > limit:
+        cut = limit
+        # continuation bytes look like 0b10xxxxxx
+        while encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut])
+        encoded = encoded[cut:]
+        # continuation lines start with a space
+        limit = 74
+    parts.append(encoded)
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def format_datetime(value):
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def recurrence_rule(series):
+    """The RRULE of a series, expanding to the same occurrences"""
+    rule = [
+        f"FREQ={FREQUENCIES[series.recurrence]}",
+        f"INTERVAL={series.recurrence_interval}",
+    ]
+    day = series.from_date.astimezone(timezone.utc).day
+    if series.recurrence == MONTHLY and day > 28:
+        # the series keeps to the last day of shorter months, which a plain
+        # monthly rule would skip
+        rule.append(f"BYMONTHDAY={day},-1;BYSETPOS=1")
+    if series.recurrence_count is not None:
+        rule.append(f"COUNT={series.recurrence_count}")
+    if series.recurrence_until is not None:
+        rule.append(f"UNTIL={format_datetime(series.recurrence_until)}")
+    return ";".join(rule)
+
+
+def cancelled_starts(series):
+    """Starts of the cancelled occurrences, which are stored by date"""
+    everything = series._replace(recurrence_exceptions=[])
+    for value in sorted(excluded_dates(series)):
+        day = timezone.make_aware(datetime.combine(value, time()))
+        for start, _ in occurrences(
+            everything, day, day + timedelta(days=1)
+        ):
+            yield start
+
+
+def person(name, email):
+    return f"CN={escape(name)}:mailto:{email}"
+
+
+def event_lines(row, guests, host, stamp):
+    reservation_id, title, room_title, creator_name, creator_email = row[:5]
+    series = Series(*row[5:])
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:reservation-{reservation_id}@{host}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{format_datetime(series.from_date)}",
+        f"DTEND:{format_datetime(series.to_date)}",
+        f"SUMMARY:{escape(title)}",
+        f"LOCATION:{escape(room_title)}",
+    ]
+    if series.recurrence:
+        lines.append(f"RRULE:{recurrence_rule(series)}")
+        for start in cancelled_starts(series):
+            lines.append(f"EXDATE:{format_datetime(start)}")
+    if creator_email:
+        lines.append(f"ORGANIZER;{person(creator_name, creator_email)}")
+    for name, email, status in guests:
+        # calendar addresses are email addresses
+        if email:
+            lines.append(
+                f"ATTENDEE;PARTSTAT={PARTICIPATION[status]};"
+                f"{person(name, email)}"
+            )
+    lines.append("END:VEVENT")
+    return lines
+
+
+def calendar(reservations, name, host, chunk_size=1000):
+    """
+    Lazily render the reservations of a queryset as an iCalendar feed,
+    encoded and ready to stream. Reservations are read with a server-side
+    cursor where the database has them, and the guests of each chunk of
+    them with one query, so memory doesn't grow with the feed
+    """
+    stamp = format_datetime(timezone.now())
+    yield b"".join(
+        fold(line)
+        for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:{PRODID}",
+            "CALSCALE:GREGORIAN",
+            f"X-WR-CALNAME:{escape(name)}",
+        )
+    )
+    rows = (
+        reservations.order_by("from_date", "id")
+        .values_list(*FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    for chunk, guests in chunks_with_guests(
+        rows, ("invitee__username", "invitee__email", "status"), chunk_size
+    ):
+        yield b"".join(
+            fold(line)
+            for row in chunk
+            for line in event_lines(
+                row, guests.get(row[0], []), host, stamp
+            )
+        )
+    yield fold("END:VCALENDAR")
+
+
+def calendar_response(request, reservations, name, object_id, scope):
+    """
+    Stream the feed of a user's or a room's reservations, or answer 304 Not
+    Modified if the client's copy is still current. The feed's validators
+    come from the version of the reservations kept in the cache, so a
+    client polling an unchanged feed costs a cache lookup
+    """
+    headers = HttpResponse()
+    cache = get_cache()
+    if cache is not None:
+        version = get_version(cache, object_id, scope)
+        # the feed is equivalent, not identical, since its stamps change
+        headers["ETag"] = f'W/"ics-{version}"'
+        issued = version_time(version)
+        last_modified = int(issued.timestamp()) if issued else None
+        if last_modified is not None:
+            headers["Last-Modified"] = http_date(last_modified)
+        not_modified = get_conditional_response(
+            request,
+            etag=headers["ETag"],
+            last_modified=last_modified,
+            response=headers,
+        )
+        if not_modified is not headers:
+            return not_modified
+
+    response = StreamingHttpResponse(
+        calendar(reservations, name, request.get_host()),
+        content_type="text/calendar; charset=utf-8",
+    )
+    response["Content-Disposition"] = (
+        f'inline; filename="{scope}-{object_id}.ics"'
+    )
+    for header, value in headers.items():
+        if header != "Content-Type":
+            response[header] = value
+    return response
@@ -0,0 +1,264 @@
+import threading
+from bisect import bisect_left, insort
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import Reservation
+from .recurrence import NONE, Series, overlaps, series_end, series_overlap
+
+
+def overlap_filter(start, end, prefix=""):
+    """
+    Canonical half-open interval overlap predicate: an existing reservation
+    clashes with [start, end) when it starts before `end` and ends after
+    `start`. This also covers containment in both directions and is served
+    by the (room, from_date, to_date) and (room, to_date, from_date) indexes
+    """
+    return Q(
+        **{f"{prefix}from_date__lt": end, f"{prefix}to_date__gt": start}
+    )
+
+
+def recurring_filter(start=None, end=None, prefix=""):
+    """
+    Recurring reservations whose series spans at least a part of a window
+    which may be open on either side. Whether one of their occurrences
+    actually falls into the window is up to the caller to check
+    """
+    condition = Q(**{f"{prefix}recurrence__gt": NONE})
+    if start is not None:
+        condition &= Q(**{f"{prefix}recurrence_end__isnull": True}) | Q(
+            **{f"{prefix}recurrence_end__gt": start}
+        )
+    if end is not None:
+        condition &= Q(**{f"{prefix}from_date__lt": end})
+    return condition
+
+
+def single_filter(start=None, end=None, prefix=""):
+    """
+    Single reservations overlapping a window which may be open on either
+    side
+    """
+    condition = Q(**{f"{prefix}recurrence": NONE})
+    if start is not None:
+        condition &= Q(**{f"{prefix}to_date__gt": start})
+    if end is not None:
+        condition &= Q(**{f"{prefix}from_date__lt": end})
+    return condition
+
+
+def recurring_series(queryset):
+    """
+    Fetch the recurrence rules of the recurring reservations in a queryset
+    as (id, Series) pairs, which are much cheaper to build than models
+    """
+    for row in queryset.values_list("id", *Series._fields):
+        yield row[0], Series(*row[1:])
+
+
+def window_filter(start=None, end=None, prefix=""):
+    """
+    Overlap predicate for a window which may be open on either side,
+    matching single reservations overlapping it and recurring ones whose
+    series spans it
+    """
+    if start is None and end is None:
+        return Q()
+    return single_filter(start, end, prefix) | recurring_filter(
+        start, end, prefix
+    )
+
+
+def overlapping(queryset, start, end):
+    return queryset.filter(overlap_filter(start, end))
+
+
+def free_slots(busy, start, end, min_duration=timedelta(0)):
+    """
+    Yield the gaps of at least `min_duration` between the busy intervals
+    within [start, end). `busy` must be sorted by start time and may
+    contain overlapping intervals, which are merged on the way
+    """
+    free_from = start
+    for busy_start, busy_end in busy:
+        if busy_start >= end:
+            break
+        if busy_start > free_from and busy_start - free_from >= min_duration:
+            yield free_from, busy_start
+        free_from = max(free_from, busy_end)
+    if end > free_from and end - free_from >= min_duration:
+        yield free_from, end
+
+
+def _aware(value):
+    if settings.USE_TZ and timezone.is_naive(value):
+        return timezone.make_aware(value, timezone.utc)
+    return value
+
+
+class RoomIntervalIndex:
+    """
+    Process-local index of every room's single reservations kept as a list
+    of (from_date, id, to_date) tuples sorted by start time, next to the
+    room's recurring reservations, which are few and expanded on demand.
+
+    Reservations of a room never overlap each other, so the only candidate
+    for a clash with [start, end) is the latest reservation starting before
+    `end`, which makes a lookup a single bisection. Rooms are loaded lazily
+    on first use and kept in sync by the model signals.
+    """
+
+    def __init__(self):
+        self._rooms = {}
+        self._series = {}
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def _room(self, room_id):
+        intervals = self._rooms.get(room_id)
+        if intervals is None:
+            reservations = Reservation.objects.filter(room_id=room_id)
+            intervals = list(
+                reservations.filter(recurrence=NONE)
+                .order_by("from_date", "id")
+                .values_list("from_date", "id", "to_date")
+            )
+            series = dict(
+                recurring_series(reservations.filter(recurring_filter()))
+            )
+            self._rooms[room_id] = intervals
+            self._series[room_id] = series
+            for start, reservation_id, end in intervals:
+                self._entries[reservation_id] = (room_id, start, end)
+            for reservation_id in series:
+                self._entries[reservation_id] = (room_id, None, None)
+        return intervals
+
+    def overlaps(self, room_id, start, end, exclude=None):
+        start, end = _aware(start), _aware(end)
+        with self._lock:
+            intervals = self._room(room_id)
+            for reservation_id, series in self._series[room_id].items():
+                if reservation_id != exclude and overlaps(series, start, end):
+                    return True
+            position = bisect_left(intervals, (end,))
+            while position > 0:
+                position -= 1
+                _, reservation_id, other_end = intervals[position]
+                if reservation_id != exclude:
+                    return other_end > start
+        return False
+
+    def add(self, reservation):
+        with self._lock:
+            self.discard(reservation.id)
+            if reservation.room_id not in self._rooms:
+                return
+            if reservation.recurrence:
+                self._series[reservation.room_id][reservation.id] = Series(
+                    *(getattr(reservation, field) for field in Series._fields)
+                )
+                self._entries[reservation.id] = (
+                    reservation.room_id,
+                    None,
+                    None,
+                )
+                return
+            start = _aware(reservation.from_date)
+            end = _aware(reservation.to_date)
+            insort(
+                self._rooms[reservation.room_id],
+                (start, reservation.id, end),
+            )
+            self._entries[reservation.id] = (reservation.room_id, start, end)
+
+    def discard(self, reservation_id):
+        with self._lock:
+            entry = self._entries.pop(reservation_id, None)
+            if entry is None:
+                return
+            room_id, start, _ = entry
+            if start is None:
+                del self._series[room_id][reservation_id]
+                return
+            intervals = self._rooms[room_id]
+            position = bisect_left(intervals, (start, reservation_id))
+            if (
+                position < len(intervals)
+                and intervals[position][1] == reservation_id
+            ):
+                del intervals[position]
+
+    def clear(self):
+        with self._lock:
+            self._rooms.clear()
+            self._series.clear()
+            self._entries.clear()
+
+
+room_index = RoomIntervalIndex()
+
+
+def interval_index_enabled():
+    return getattr(settings, "RESERVATIONS_INTERVAL_INDEX", False)
+
+
+def has_overlapping_reservation(room, start, end, exclude=None, series=None):
+    """
+    Check whether the room is already booked at any point of [start, end),
+    ignoring the reservation with id `exclude`. If `series` recurs, every
+    one of its occurrences is checked instead
+    """
+    if series is not None and series.recurrence:
+        return has_overlapping_series(room, series, exclude)
+
+    if interval_index_enabled():
+        return room_index.overlaps(room.id, start, end, exclude=exclude)
+
+    if start < end:
+        predicate = overlap_filter(start, end)
+    else:
+        # an empty or inverted interval overlaps nothing, only an identical
+        # booking is considered a clash
+        predicate = Q(from_date=start, to_date=end)
+    reservations = Reservation.objects.filter(room=room)
+    if exclude is not None:
+        reservations = reservations.exclude(id=exclude)
+    if reservations.filter(predicate, recurrence=NONE).exists():
+        return True
+    if start >= end:
+        return False
+    return any(
+        overlaps(other, start, end)
+        for _, other in recurring_series(
+            reservations.filter(recurring_filter(start, end))
+        )
+    )
+
+
+def has_overlapping_series(room, series, exclude=None):
+    """
+    Check whether any occurrence of a recurring series clashes with the
+    reservations of the room without expanding the whole series: every
+    single reservation within the span of the series is looked up in it
+    directly and other recurring reservations are compared rule by rule
+    """
+    start, end = series.from_date, series_end(series)
+    reservations = Reservation.objects.filter(room=room)
+    if exclude is not None:
+        reservations = reservations.exclude(id=exclude)
+
+    singles = reservations.filter(single_filter(start, end)).values_list(
+        "from_date", "to_date"
+    )
+    for other_start, other_end in singles.iterator():
+        if overlaps(series, other_start, other_end):
+            return True
+    return any(
+        series_overlap(series, other)
+        for _, other in recurring_series(
+            reservations.filter(recurring_filter(start, end))
+        )
+    )
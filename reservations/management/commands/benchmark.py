@@ -0,0 +1,164 @@
+import inspect
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+from reservations.benchmarks import BENCHMARKS, BenchmarkOutput
+
+
+def get_commit():
+    """The checked out commit, to tell the results of runs apart"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the registered benchmarks against a throwaway test database "
+        "of the configured database backend"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "names",
+            nargs="*",
+            help="Benchmarks to run, all of them if omitted",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Reuse the test database between runs",
+        )
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Size of the seeded data sets of benchmarks which seed one",
+        )
+        parser.add_argument(
+            "--json",
+            metavar="PATH",
+            help="Write the results with the commit and environment to PATH",
+        )
+        parser.add_argument(
+            "--compare",
+            metavar="PATH",
+            help="Compare the results with the ones saved by --json at PATH",
+        )
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            metavar="RATIO",
+            help=(
+                "Fail if any case compared with --compare got slower than "
+                "RATIO times the baseline"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        names = options["names"] or list(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(
+                f"Unknown benchmarks: {', '.join(sorted(unknown))}. "
+                f"Available: {', '.join(BENCHMARKS)}"
+            )
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as baseline_file:
+                baseline = json.load(baseline_file)["results"]
+
+        old_name = connection.settings_dict["NAME"]
+        if (
+            connection.vendor == "sqlite"
+            and not connection.settings_dict["TEST"]["NAME"]
+        ):
+            # threads can't share an in-memory database without table locks
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                tempfile.gettempdir(), "meetings_benchmark.sqlite3"
+            )
+        setup_test_environment()
+        connection.creation.create_test_db(
+            verbosity=0, keepdb=options["keepdb"]
+        )
+        # request logging would dominate the measurements
+        logging.disable(logging.WARNING)
+        results = {}
+        try:
+            for name in names:
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                call_command("flush", interactive=False, verbosity=0)
+                func = BENCHMARKS[name]
+                kwargs = {}
+                if "scale" in inspect.signature(func).parameters:
+                    kwargs["scale"] = options["scale"]
+                output = BenchmarkOutput(self.stdout)
+                func(output, **kwargs)
+                results[name] = output.results
+            vendor = connection.vendor
+        finally:
+            logging.disable(logging.NOTSET)
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+            teardown_test_environment()
+
+        if options["json"]:
+            with open(options["json"], "w") as results_file:
+                json.dump(
+                    {
+                        "commit": get_commit(),
+                        "vendor": vendor,
+                        "python": platform.python_version(),
+                        "django": django.get_version(),
+                        "scale": options["scale"],
+                        "results": results,
+                    },
+                    results_file,
+                    indent=2,
+                )
+        if baseline is not None:
+            self.compare(results, baseline, options["max_regression"])
+
+    def compare(self, results, baseline, max_regression):
+        """Print how every case changed and enforce `max_regression`"""
+        self.stdout.write(self.style.MIGRATE_HEADING("comparison"))
+        self.stdout.write(
+            f"{'case':<60} {'baseline ms':>12} {'ms':>10} {'ratio':>7}"
+        )
+        regressions = []
+        for name, cases in results.items():
+            for case, result in cases.items():
+                before = baseline.get(name, {}).get(case)
+                if not before or not before["seconds"]:
+                    continue
+                ratio = result["seconds"] / before["seconds"]
+                label = f"{name}: {case}"
+                self.stdout.write(
+                    f"{label:<60} {before['seconds'] * 1000:>12.2f} "
+                    f"{result['seconds'] * 1000:>10.2f} {ratio:>7.2f}"
+                )
+                if max_regression is not None and ratio > max_regression:
+                    regressions.append(f"{label} ({ratio:.2f}x)")
+        if regressions:
+            raise CommandError(
+                f"Slower than {max_regression}x the baseline: "
+                f"{', '.join(regressions)}"
+            )
@@ -0,0 +1,63 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from reservations.export import export, exported_reservations
+from reservations.serializers import ExportSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream reservations with their guests as CSV or JSON Lines to a "
+        "file or to the standard output"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", default="csv", help="csv (the default) or jsonl"
+        )
+        parser.add_argument(
+            "--from",
+            dest="from",
+            help="Only export reservations ending after this time",
+        )
+        parser.add_argument(
+            "--to", help="Only export reservations starting before this time"
+        )
+        parser.add_argument("--rooms", help="Comma separated room ids")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument(
+            "--file", help="Write to this file instead of the output"
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # the same parameters as the export endpoint
+        query = ExportSerializer(
+            data={
+                name: options[name]
+                for name in ("output", "from", "to", "rooms", "gzip")
+                if options[name] is not None
+            }
+        )
+        if not query.is_valid():
+            raise CommandError(
+                "; ".join(
+                    f"{field}: {' '.join(map(str, errors))}"
+                    for field, errors in query.errors.items()
+                )
+            )
+        params = query.validated_data
+        reservations = exported_reservations(
+            params.get("from"), params.get("to"), params.get("rooms")
+        )
+        chunks = export(
+            reservations,
+            params["output"],
+            params["gzip"],
+            options["chunk_size"],
+        )
+        if options["file"]:
+            with open(options["file"], "wb") as exported:
+                exported.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
+            sys.stdout.flush()
@@ -0,0 +1,100 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from reservations.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with generated users, meeting rooms, "
+        "non-overlapping reservations and invitations"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=100)
+        parser.add_argument(
+            "--reservations-per-room", type=int, default=1000
+        )
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--guests",
+            type=float,
+            default=3,
+            help="Mean number of guests of a meeting",
+        )
+        parser.add_argument("--max-guests", type=int, default=50)
+        parser.add_argument(
+            "--creator-skew",
+            type=float,
+            default=1.0,
+            help=(
+                "Exponent of the Zipf-like distribution of creators and "
+                "guests, 0 picks every user equally often"
+            ),
+        )
+        parser.add_argument(
+            "--standing",
+            type=int,
+            default=3,
+            help="Weekly meetings per room, booked every week",
+        )
+        parser.add_argument(
+            "--occupancy",
+            type=float,
+            default=0.6,
+            help="Share of the free half hours taken by ad hoc meetings",
+        )
+        parser.add_argument(
+            "--start",
+            help="Date of the first reservations, e.g. 2021-01-04",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Seed of the random generator, to repeat a data set",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Insert with bulk queries instead of COPY on PostgreSQL",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options["occupancy"] <= 1:
+            raise CommandError("--occupancy must be between 0 and 1")
+        if options["users"] < 1:
+            raise CommandError("At least one user is needed")
+        start = None
+        if options["start"]:
+            try:
+                start = datetime.strptime(options["start"], "%Y-%m-%d")
+            except ValueError:
+                raise CommandError("--start must be a date like 2021-01-04")
+            start = timezone.make_aware(start, timezone.utc)
+
+        seeder = Seeder(
+            guests=options["guests"],
+            max_guests=options["max_guests"],
+            creator_skew=options["creator_skew"],
+            standing=options["standing"],
+            occupancy=options["occupancy"],
+            start=start,
+            random_seed=options["seed"],
+            batch_size=options["batch_size"],
+            use_copy=not options["no_copy"],
+        )
+        started = time.perf_counter()
+        counts = seeder.run(
+            options["rooms"],
+            options["reservations_per_room"],
+            options["users"],
+            log=self.stdout.write if options["verbosity"] > 1 else None,
+        )
+        elapsed = time.perf_counter() - started
+        for model, count in counts.items():
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Seeded in {elapsed:.1f} s")
+        )
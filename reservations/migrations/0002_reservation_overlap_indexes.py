@@ -0,0 +1,21 @@
+# Generated by Django 3.1.6 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['room', 'from_date', 'to_date'], name='reservation_room_from_to'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['room', 'to_date', 'from_date'], name='reservation_room_to_from'),
+        ),
+    ]
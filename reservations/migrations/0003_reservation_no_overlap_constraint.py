@@ -0,0 +1,79 @@
+from django.core.management.base import CommandError
+from django.db import migrations
+
+CONSTRAINT = "reservation_room_no_overlap"
+
+# overlapping reservations of a room, reported when more are found
+MAX_REPORTED = 20
+
+
+def find_overlaps(cursor):
+    """
+    The (room id, reservation id, reservation id) of the reservations which
+    overlap another one of the same room, which the checks before the
+    constraint missed, e.g. when one contains the other. Reservations
+    ending before they start overlap nothing
+    """
+    cursor.execute(
+        "SELECT a.room_id, a.id, b.id "
+        "FROM reservations_reservation a "
+        "JOIN reservations_reservation b "
+        "ON a.room_id = b.room_id AND a.id < b.id "
+        "AND a.from_date < b.to_date AND b.from_date < a.to_date "
+        "WHERE a.from_date < a.to_date AND b.from_date < b.to_date "
+        "ORDER BY a.room_id, a.id, b.id"
+    )
+    return cursor.fetchall()
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    """
+    Let PostgreSQL reject overlapping reservations of the same room. Other
+    databases rely on the room locking done by the serializer. Overlapping
+    reservations already stored have to be moved or deleted first, the
+    migration lists them otherwise. Reservations ending before they start
+    have no range, so they are left out, the serializer rejects them anyway
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        overlaps = find_overlaps(cursor)
+    if overlaps:
+        listed = "\n".join(
+            f"room {room_id}: reservations {first} and {second}"
+            for room_id, first, second in overlaps[:MAX_REPORTED]
+        )
+        more = len(overlaps) - MAX_REPORTED
+        raise CommandError(
+            f"Overlapping reservations, move or delete one of each pair "
+            f"before migrating ({len(overlaps)} pairs):\n{listed}"
+            + (f"\nand {more} more" if more > 0 else "")
+        )
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        f"ALTER TABLE reservations_reservation ADD CONSTRAINT {CONSTRAINT} "
+        f"EXCLUDE USING gist (room_id WITH =, "
+        f"tstzrange(from_date, to_date, '[)') WITH &&) "
+        f"WHERE (from_date <= to_date)"
+    )
+
+
+def remove_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"ALTER TABLE reservations_reservation DROP CONSTRAINT {CONSTRAINT}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0002_reservation_overlap_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            add_exclusion_constraint, remove_exclusion_constraint
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.1.6 on 2026-10-18 18:23
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_reservation_no_overlap_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='recurrence',
+            field=models.CharField(blank=True, choices=[('', "The meeting doesn't repeat"), ('daily', 'The meeting repeats every day'), ('weekly', 'The meeting repeats every week'), ('monthly', 'The meeting repeats every month')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='recurrence_count',
+            field=models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='recurrence_end',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='recurrence_exceptions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='recurrence_interval',
+            field=models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='recurrence_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(recurrence__gt=''), fields=['room', 'from_date'], name='reservation_room_series'),
+        ),
+    ]
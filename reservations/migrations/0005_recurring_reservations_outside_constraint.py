@@ -0,0 +1,49 @@
+from django.db import migrations
+
+CONSTRAINT = "reservation_room_no_overlap"
+
+
+def limit_exclusion_constraint(apps, schema_editor):
+    """
+    The columns of a recurring reservation only describe its first
+    occurrence, which may be cancelled, so the exclusion constraint only
+    covers single reservations
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"ALTER TABLE reservations_reservation DROP CONSTRAINT {CONSTRAINT}"
+    )
+    schema_editor.execute(
+        f"ALTER TABLE reservations_reservation ADD CONSTRAINT {CONSTRAINT} "
+        f"EXCLUDE USING gist (room_id WITH =, "
+        f"tstzrange(from_date, to_date, '[)') WITH &&) "
+        f"WHERE (recurrence = '' AND from_date <= to_date)"
+    )
+
+
+def cover_all_reservations(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"ALTER TABLE reservations_reservation DROP CONSTRAINT {CONSTRAINT}"
+    )
+    schema_editor.execute(
+        f"ALTER TABLE reservations_reservation ADD CONSTRAINT {CONSTRAINT} "
+        f"EXCLUDE USING gist (room_id WITH =, "
+        f"tstzrange(from_date, to_date, '[)') WITH &&) "
+        f"WHERE (from_date <= to_date)"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0004_reservation_recurrence'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            limit_exclusion_constraint, cover_all_reservations
+        ),
+    ]
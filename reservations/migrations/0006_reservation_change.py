@@ -0,0 +1,25 @@
+# Generated by Django 3.1.6 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0005_recurring_reservations_outside_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reservation_id', models.IntegerField(unique=True)),
+                ('sequence', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reservationchange',
+            index=models.Index(fields=['sequence', 'reservation_id'], name='reservation_change_sequence'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.1.6 on 2026-10-18 19:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_schedules(apps, schema_editor):
+    from reservations.schedule import rebuild_schedules
+
+    rebuild_schedules(
+        reservation_model=apps.get_model("reservations", "Reservation"),
+        day_model=apps.get_model("reservations", "RoomDay"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0006_reservation_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('reservations', models.JSONField(default=list)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='reservations.meetingroom')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='roomday',
+            constraint=models.UniqueConstraint(fields=('room', 'day'), name='room_day_unique'),
+        ),
+        migrations.RunPython(build_schedules, migrations.RunPython.noop),
+    ]
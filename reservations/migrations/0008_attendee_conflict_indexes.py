@@ -0,0 +1,21 @@
+# Generated by Django 3.1.6 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0007_room_day'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invitation',
+            index=models.Index(fields=['invitee', 'status', 'reservation'], name='invitation_invitee_status'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['creator', 'to_date', 'from_date'], name='reservation_creator_to_from'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.1.6 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+def record_participants(apps, schema_editor):
+    # the current participants of every reservation get its latest change,
+    # so that syncs of a user can go on from tokens issued before
+    Reservation = apps.get_model("reservations", "Reservation")
+    Invitation = apps.get_model("reservations", "Invitation")
+    ReservationChange = apps.get_model("reservations", "ReservationChange")
+    ParticipantChange = apps.get_model("reservations", "ParticipantChange")
+    sequences = dict(
+        ReservationChange.objects.values_list("reservation_id", "sequence")
+    )
+    rows = Reservation.objects.values_list("creator_id", "id").union(
+        Invitation.objects.values_list("invitee_id", "reservation_id")
+    )
+    batch = []
+    for user_id, reservation_id in rows.iterator():
+        if reservation_id in sequences:
+            batch.append(
+                ParticipantChange(
+                    user_id=user_id,
+                    reservation_id=reservation_id,
+                    sequence=sequences[reservation_id],
+                )
+            )
+        if len(batch) >= 5000:
+            ParticipantChange.objects.bulk_create(batch)
+            batch = []
+    ParticipantChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0008_attendee_conflict_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipantChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField()),
+                ('reservation_id', models.IntegerField()),
+                ('sequence', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='participantchange',
+            index=models.Index(fields=['user_id', 'sequence', 'reservation_id'], name='participant_change_sequence'),
+        ),
+        migrations.AddConstraint(
+            model_name='participantchange',
+            constraint=models.UniqueConstraint(fields=('user_id', 'reservation_id'), name='participant_change_unique'),
+        ),
+        migrations.RunPython(record_participants, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,14 @@
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils.translation import gettext as _
 from django.conf import settings
+from .recurrence import (
+    FREQUENCIES,
+    NONE,
+    normalize_exceptions,
+    occurrences,
+    series_end,
+)
 
 
 class MeetingRoom(models.Model):
@@ -24,10 +32,60 @@ class Reservation(models.Model):
     attendees = models.ManyToManyField(
         settings.AUTH_USER_MODEL, through="Invitation", related_name="meetings"
     )
+    recurrence = models.CharField(
+        max_length=10,
+        choices=FREQUENCIES,
+        default=NONE,
+        blank=True,
+    )
+    recurrence_interval = models.PositiveIntegerField(
+        default=1, validators=[MinValueValidator(1)]
+    )
+    recurrence_count = models.PositiveIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1)]
+    )
+    recurrence_until = models.DateTimeField(null=True, blank=True)
+    # dates of the occurrences which were cancelled
+    recurrence_exceptions = models.JSONField(default=list, blank=True)
+    # end of the last occurrence of a bounded series, kept to find the series
+    # overlapping a time window with a query
+    recurrence_end = models.DateTimeField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["room", "from_date", "to_date"],
+                name="reservation_room_from_to",
+            ),
+            models.Index(
+                fields=["room", "to_date", "from_date"],
+                name="reservation_room_to_from",
+            ),
+            models.Index(
+                fields=["room", "from_date"],
+                name="reservation_room_series",
+                condition=models.Q(recurrence__gt=NONE),
+            ),
+            models.Index(
+                fields=["creator", "to_date", "from_date"],
+                name="reservation_creator_to_from",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} from {self.from_date} to {self.to_date}"
 
+    def save(self, *args, **kwargs):
+        self.recurrence_exceptions = normalize_exceptions(
+            self.recurrence_exceptions
+        )
+        self.recurrence_end = series_end(self)
+        super().save(*args, **kwargs)
+
+    def occurrences(self, start=None, end=None):
+        """Lazily expand the occurrences within the [start, end) window"""
+        return occurrences(self, start, end)
+
 
 class Invitation(models.Model):
     ATTENDING = "attending"
@@ -48,5 +106,80 @@ class Invitation(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["invitee", "status", "reservation"],
+                name="invitation_invitee_status",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.invitee} - {self.status}"
+
+
+class ReservationChange(models.Model):
+    """
+    The position of the latest change of a reservation, or of its guests,
+    in the sequence of changes clients sync from. The row outlives the
+    reservation, which tells the reservation was deleted
+    """
+
+    reservation_id = models.IntegerField(unique=True)
+    sequence = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["sequence", "reservation_id"],
+                name="reservation_change_sequence",
+            ),
+        ]
+
+
+class ParticipantChange(models.Model):
+    """
+    The position of the latest change of a reservation a user created or
+    was invited to, in the same sequence as ReservationChange, recorded for
+    that user. The change taking them out of the reservation, or deleting
+    it, is the last one they get. Syncs of a user read only these
+    """
+
+    user_id = models.IntegerField()
+    reservation_id = models.IntegerField()
+    sequence = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user_id", "reservation_id"],
+                name="participant_change_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user_id", "sequence", "reservation_id"],
+                name="participant_change_sequence",
+            ),
+        ]
+
+
+class RoomDay(models.Model):
+    """
+    The single reservations of a room overlapping one day, as they are
+    listed in its schedule, kept up to date as reservations are written.
+    Days without reservations have no row
+    """
+
+    room = models.ForeignKey(
+        MeetingRoom, related_name="days", on_delete=models.CASCADE
+    )
+    day = models.DateField()
+    reservations = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["room", "day"], name="room_day_unique"
+            ),
+        ]
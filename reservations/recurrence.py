@@ -0,0 +1,228 @@
+import calendar
+import math
+from collections import namedtuple
+from datetime import date, timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+NONE = ""
+DAILY = "daily"
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+FREQUENCIES = (
+    (NONE, _("The meeting doesn't repeat")),
+    (DAILY, _("The meeting repeats every day")),
+    (WEEKLY, _("The meeting repeats every week")),
+    (MONTHLY, _("The meeting repeats every month")),
+)
+
+PERIODS = {DAILY: timedelta(days=1), WEEKLY: timedelta(weeks=1)}
+
+# Anything with these attributes can be expanded, e.g. a Reservation or the
+# data of one which is being validated
+Series = namedtuple(
+    "Series",
+    [
+        "from_date",
+        "to_date",
+        "recurrence",
+        "recurrence_interval",
+        "recurrence_count",
+        "recurrence_until",
+        "recurrence_exceptions",
+    ],
+)
+
+
+def get_horizon():
+    """
+    How far ahead series without a fixed period, i.e. monthly ones, are
+    compared with each other when neither of them ends
+    """
+    return timedelta(
+        days=getattr(settings, "RESERVATIONS_RECURRENCE_HORIZON_DAYS", 3 * 366)
+    )
+
+
+def add_months(value, months):
+    """Shift a datetime by whole months, clamping the day to the month end"""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def fixed_period(series):
+    if series.recurrence in PERIODS:
+        return PERIODS[series.recurrence] * series.recurrence_interval
+    return None
+
+
+def nth_start(series, number):
+    period = fixed_period(series)
+    if period is not None:
+        return series.from_date + period * number
+    return add_months(series.from_date, number * series.recurrence_interval)
+
+
+def first_number_ending_after(series, moment):
+    """
+    The number of the first occurrence which may end after `moment`,
+    computed without walking the occurrences before it
+    """
+    duration = series.to_date - series.from_date
+    period = fixed_period(series)
+    if period is not None:
+        if moment - duration < series.from_date:
+            return 0
+        return (moment - duration - series.from_date) // period + 1
+    # months are at least 28 days long, so stepping back over the duration
+    # of the meeting in such months can only land before the occurrence
+    months = (moment.year - series.from_date.year) * 12 + (
+        moment.month - series.from_date.month
+    )
+    months -= math.ceil(duration / timedelta(days=28)) + 1
+    return max(0, months // series.recurrence_interval)
+
+
+def last_number(series):
+    """
+    The number of the last occurrence, or None if the series never ends
+    """
+    numbers = []
+    if series.recurrence_count is not None:
+        numbers.append(series.recurrence_count - 1)
+    if series.recurrence_until is not None:
+        until = series.recurrence_until
+        period = fixed_period(series)
+        if until < series.from_date:
+            numbers.append(0)
+        elif period is not None:
+            numbers.append((until - series.from_date) // period)
+        else:
+            months = (until.year - series.from_date.year) * 12 + (
+                until.month - series.from_date.month
+            )
+            number = months // series.recurrence_interval
+            while number > 0 and nth_start(series, number) > until:
+                number -= 1
+            numbers.append(number)
+    return min(numbers) if numbers else None
+
+
+def series_end(series):
+    """
+    End of the last occurrence of a recurring series, or None if it never
+    ends or doesn't recur
+    """
+    if not series.recurrence:
+        return None
+    number = last_number(series)
+    if number is None:
+        return None
+    return nth_start(series, number) + (series.to_date - series.from_date)
+
+
+def normalize_exceptions(values):
+    """Sorted ISO dates without duplicates, as stored in the database"""
+    return sorted(
+        {
+            value.isoformat() if isinstance(value, date) else value
+            for value in values or []
+        }
+    )
+
+
+def excluded_dates(series):
+    return {
+        value if isinstance(value, date) else date.fromisoformat(value)
+        for value in series.recurrence_exceptions or []
+    }
+
+
+def occurrence_date(start):
+    return timezone.localtime(start).date()
+
+
+def occurrences(series, start=None, end=None):
+    """
+    Lazily yield the (start, end) of the occurrences overlapping the
+    [start, end) window. The first occurrence in the window is computed
+    directly, so a window far into a long series costs the same as one at
+    its beginning
+    """
+    duration = series.to_date - series.from_date
+    if not series.recurrence:
+        if (start is None or series.to_date > start) and (
+            end is None or series.from_date < end
+        ):
+            yield series.from_date, series.to_date
+        return
+
+    number = 0 if start is None else first_number_ending_after(series, start)
+    last = last_number(series)
+    excluded = excluded_dates(series)
+    while last is None or number <= last:
+        occurrence_start = nth_start(series, number)
+        if end is not None and occurrence_start >= end:
+            return
+        number += 1
+        occurrence_end = occurrence_start + duration
+        if start is not None and occurrence_end <= start:
+            continue
+        if excluded and occurrence_date(occurrence_start) in excluded:
+            continue
+        yield occurrence_start, occurrence_end
+
+
+def overlaps(series, start, end):
+    """Tell whether any occurrence of the series overlaps [start, end)"""
+    return next(occurrences(series, start, end), None) is not None
+
+
+def series_overlap(first, second):
+    """
+    Tell whether any occurrences of two series overlap, without expanding
+    them further than needed.
+
+    Occurrences of the first series are checked against the second one
+    from the moment both have started. Two series with fixed periods line
+    up the same way again after the least common multiple of their periods,
+    so one such cycle is enough, plus a cycle for every exception, since an
+    exception can hide a clash in at most one cycle. Other series are
+    compared up to a configurable horizon.
+    """
+    common_start = max(first.from_date, second.from_date)
+    ends = [
+        value
+        for value in (series_end(first), series_end(second))
+        if value is not None
+    ]
+    if not first.recurrence or not second.recurrence:
+        horizon_end = min(ends) if ends else None
+    else:
+        periods = [fixed_period(first), fixed_period(second)]
+        if None in periods:
+            cycle = get_horizon()
+            cycles = 1
+        else:
+            seconds = [int(period.total_seconds()) for period in periods]
+            cycle = timedelta(
+                seconds=seconds[0] * seconds[1] // math.gcd(*seconds)
+            )
+            cycles = 1 + len(excluded_dates(first)) + len(
+                excluded_dates(second)
+            )
+        duration = max(
+            first.to_date - first.from_date, second.to_date - second.from_date
+        )
+        horizon_end = common_start + cycle * cycles + duration
+        if ends:
+            horizon_end = min(horizon_end, min(ends))
+
+    window_start = common_start - (first.to_date - first.from_date)
+    for start, end in occurrences(first, window_start, horizon_end):
+        if overlaps(second, start, end):
+            return True
+    return False
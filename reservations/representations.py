@@ -0,0 +1,117 @@
+from django.conf import settings
+from rest_framework import serializers
+from django.utils import timezone
+from instrumentation.middleware import measure_serialization
+from .export import DATETIME_FIELDS
+from .models import Invitation
+from .serializers import (
+    InvitationSerializer,
+    MeetingRoomSerializer,
+    ReservationSerializer,
+)
+
+# the serializers' field order, which the output has to keep
+RESERVATION_FIELDS = [
+    field for field in ReservationSerializer.Meta.fields if field != "guests"
+]
+GUEST_FIELDS = InvitationSerializer.Meta.fields
+ROOM_FIELDS = list(MeetingRoomSerializer().fields)
+
+
+def fast_reads_enabled():
+    return getattr(settings, "RESERVATIONS_FAST_READS", True)
+
+
+def reservation_values(queryset):
+    """The columns of the reservations of a queryset as dicts"""
+    return queryset.values(*RESERVATION_FIELDS)
+
+
+@measure_serialization()
+def represent_reservations(rows):
+    """
+    Build the same data as ReservationSerializer(many=True) from
+    reservation_values() rows, and their guests fetched with one query,
+    without going through serializer fields for every value. Datetimes are
+    left to the JSON renderer, which formats them like DateTimeField
+    """
+    guests = {row["id"]: [] for row in rows}
+    invitations = (
+        Invitation.objects.filter(reservation_id__in=list(guests))
+        .order_by("id")
+        .values_list("reservation_id", "invitee_id", "status")
+    )
+    # InvitationSerializer renders the reservation's str()
+    names = {
+        row["id"]: f"{row['title']} from {row['from_date']} "
+        f"to {row['to_date']}"
+        for row in rows
+    }
+    for reservation_id, invitee_id, status in invitations:
+        guests[reservation_id].append(
+            dict(
+                zip(
+                    GUEST_FIELDS,
+                    (invitee_id, status, names[reservation_id]),
+                )
+            )
+        )
+
+    # DateTimeField renders datetimes in the current time zone, in which
+    # the database's already are by default
+    convert = timezone.get_current_timezone_name() != "UTC"
+    results = []
+    for row in rows:
+        data = {}
+        for field in ReservationSerializer.Meta.fields:
+            if field == "guests":
+                data[field] = guests[row["id"]]
+            elif convert and field in DATETIME_FIELDS:
+                data[field] = row[field] and timezone.localtime(row[field])
+            else:
+                data[field] = row[field]
+        results.append(data)
+    return results
+
+
+@measure_serialization()
+def represent_rooms(rooms, reservations):
+    """
+    Build the same data as MeetingRoomSerializer(many=True) from rows of
+    rooms, and reservation_values() rows of their reservations in the order
+    they are to be listed
+    """
+    nested = {room["id"]: [] for room in rooms}
+    for reservation in represent_reservations(reservations):
+        nested[reservation["room"]].append(reservation)
+    results = []
+    for room in rooms:
+        data = {}
+        for field in ROOM_FIELDS:
+            data[field] = (
+                nested[room["id"]] if field == "reservations" else room[field]
+            )
+        results.append(data)
+    return results
+
+
+@measure_serialization()
+def represent_availability(available):
+    """The response to an availability search from find_free_slots()"""
+    field = serializers.DateTimeField()
+    return {
+        "results": [
+            {
+                "room": room_id,
+                "title": title,
+                "free": [
+                    {
+                        "from_date": field.to_representation(start),
+                        "to_date": field.to_representation(end),
+                    }
+                    for start, end in slots
+                ],
+            }
+            for room_id, title, slots in available
+        ]
+    }
@@ -0,0 +1,300 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from .intervals import recurring_filter, single_filter
+from .models import MeetingRoom, Reservation, RoomDay
+from .recurrence import Series, occurrences
+
+# the columns of the reservations listed in a schedule, by their key there
+ENTRY_FIELDS = {
+    "id": "id",
+    "title": "title",
+    "from_date": "from_date",
+    "to_date": "to_date",
+    "creator": "creator_id",
+}
+
+_batch = threading.local()
+
+
+def schedules_enabled():
+    return getattr(settings, "RESERVATIONS_SCHEDULES", True)
+
+
+def _datetime(value):
+    # models created with strings keep them until they are fetched again
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if settings.USE_TZ and timezone.is_naive(value):
+        return timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def local_date(value):
+    """The day of the server's time zone a datetime falls on"""
+    return timezone.localtime(
+        _datetime(value), timezone.get_default_timezone()
+    ).date()
+
+
+def day_start(day):
+    start = datetime.combine(day, time.min)
+    if settings.USE_TZ:
+        return timezone.make_aware(start, timezone.get_default_timezone())
+    return start
+
+
+def reservation_days(room_id, from_date, to_date):
+    """The (room id, day) of every day [from_date, to_date) overlaps"""
+    first = local_date(from_date)
+    # a reservation ending at midnight doesn't overlap the next day
+    last = max(first, local_date(_datetime(to_date) - timedelta.resolution))
+    return {
+        (room_id, first + timedelta(days=offset))
+        for offset in range((last - first).days + 1)
+    }
+
+
+@lru_cache(maxsize=None)
+def get_datetime_field():
+    # stored entries are in the server's time zone, whatever the request's
+    return serializers.DateTimeField(
+        default_timezone=timezone.get_default_timezone()
+    )
+
+
+def entry(row, start=None, end=None):
+    """
+    A reservation as listed in a schedule, from its columns, possibly one
+    occurrence of it from `start` to `end`
+    """
+    field = get_datetime_field()
+    data = {key: row[column] for key, column in ENTRY_FIELDS.items()}
+    data["from_date"] = field.to_representation(start or row["from_date"])
+    data["to_date"] = field.to_representation(end or row["to_date"])
+    return data
+
+
+def build_days(rows, wanted=None):
+    """
+    The entries of every day of every room from reservation rows ordered by
+    room and start time, limited to the (room id, day) pairs in `wanted`
+    """
+    days = defaultdict(list)
+    for row in rows:
+        data = None
+        for key in reservation_days(
+            row["room_id"], row["from_date"], row["to_date"]
+        ):
+            if wanted is None or key in wanted:
+                data = data or entry(row)
+                days[key].append(data)
+    return days
+
+
+def day_runs(days):
+    """The (first, last) days of the runs of consecutive days"""
+    runs = []
+    for day in sorted(days):
+        if runs and runs[-1][1] + timedelta(days=1) == day:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+def refresh_days(days):
+    """
+    Rebuild the schedule rows of the given (room id, day) pairs from the
+    reservations, in the transaction writing them. The rooms are locked
+    first, so that concurrent writes to a room rebuild its days one after
+    the other, from the reservations each of them committed. Days of a
+    batched_schedules() block are rebuilt together at its end
+    """
+    pending = getattr(_batch, "pending", None)
+    if pending is not None:
+        pending.update(days)
+        return
+    days = set(days)
+    if not days:
+        return
+    with transaction.atomic():
+        rooms = set(
+            MeetingRoom.objects.select_for_update()
+            .filter(pk__in={room_id for room_id, _ in days})
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        by_room = defaultdict(set)
+        for room_id, day in days:
+            if room_id in rooms:
+                by_room[room_id].add(day)
+        runs = [
+            (room_id, first, last)
+            for room_id, room_days in sorted(by_room.items())
+            for first, last in day_runs(room_days)
+        ]
+        # a condition per run of days, a few of them per query
+        for position in range(0, len(runs), 100):
+            refresh_runs(runs[position:position + 100])
+
+
+def refresh_runs(runs):
+    reservations = Q()
+    stale = Q()
+    wanted = set()
+    for room_id, first, last in runs:
+        reservations |= Q(room_id=room_id) & single_filter(
+            day_start(first), day_start(last + timedelta(days=1))
+        )
+        stale |= Q(room_id=room_id, day__gte=first, day__lte=last)
+        wanted.update(
+            (room_id, first + timedelta(days=offset))
+            for offset in range((last - first).days + 1)
+        )
+    rows = (
+        Reservation.objects.filter(reservations)
+        .order_by("room_id", "from_date", "id")
+        .values("room_id", *ENTRY_FIELDS.values())
+    )
+    built = build_days(rows, wanted)
+    RoomDay.objects.filter(stale).delete()
+    RoomDay.objects.bulk_create(
+        RoomDay(room_id=room_id, day=day, reservations=entries)
+        for (room_id, day), entries in built.items()
+    )
+
+
+@contextmanager
+def batched_schedules():
+    """
+    Rebuild the days touched by many writes, e.g. of a cascading delete,
+    with a few queries at the end of the block. Nothing is rebuilt if the
+    block fails, its transaction is rolled back
+    """
+    if getattr(_batch, "pending", None) is not None:
+        yield
+        return
+    pending = _batch.pending = set()
+    try:
+        yield
+    finally:
+        _batch.pending = None
+    refresh_days(pending)
+
+
+def rebuild_schedules(
+    room_ids=None,
+    reservation_model=Reservation,
+    day_model=RoomDay,
+    batch_size=5000,
+):
+    """
+    Build the schedules of the given rooms, or of all of them, from
+    scratch, e.g. after reservations were inserted without signals. Takes
+    the models to work with the ones of a migration too
+    """
+    reservations = reservation_model.objects.filter(recurrence="")
+    days = day_model.objects.all()
+    if room_ids is not None:
+        reservations = reservations.filter(room_id__in=room_ids)
+        days = days.filter(room_id__in=room_ids)
+    days.delete()
+    rows = reservations.order_by("room_id", "from_date", "id").values(
+        "room_id", *ENTRY_FIELDS.values()
+    )
+    batch = []
+    for room_id, room_rows in groupby(
+        rows.iterator(chunk_size=batch_size), key=itemgetter("room_id")
+    ):
+        batch += [
+            day_model(room_id=room_id, day=day, reservations=entries)
+            for (_, day), entries in build_days(room_rows).items()
+        ]
+        if len(batch) >= batch_size:
+            day_model.objects.bulk_create(batch)
+            batch = []
+    day_model.objects.bulk_create(batch)
+
+
+def week_grid(start, count, room_ids=None):
+    """
+    The schedules of the rooms, or of the given ones, for `count` days from
+    `start`: every room with its days, each listing the reservations
+    overlapping it. The stored days of all the rooms come with one query,
+    the occurrences of recurring reservations, which have no stored days,
+    are expanded from another one
+    """
+    end = start + timedelta(days=count)
+    # the alias goes into the SQL unquoted, so it can't be a keyword like
+    # window
+    rooms = MeetingRoom.objects.annotate(
+        window_days=FilteredRelation(
+            "days", condition=Q(days__day__gte=start, days__day__lt=end)
+        )
+    )
+    recurring = Reservation.objects.filter(
+        recurring_filter(day_start(start), day_start(end))
+    )
+    if room_ids is not None:
+        rooms = rooms.filter(id__in=room_ids)
+        recurring = recurring.filter(room_id__in=room_ids)
+
+    grid = {}
+    for room_id, title, day, entries in rooms.order_by(
+        "id", "window_days__day"
+    ).values_list(
+        "id", "title", "window_days__day", "window_days__reservations"
+    ):
+        if room_id not in grid:
+            grid[room_id] = {"id": room_id, "title": title, "days": {}}
+        if day is not None:
+            grid[room_id]["days"][day] = list(entries)
+
+    added = set()
+    for row in recurring.values(
+        "room_id", *ENTRY_FIELDS.values(), *Series._fields[2:]
+    ):
+        if row["room_id"] not in grid:
+            continue
+        series = Series(*(row[field] for field in Series._fields))
+        for occurrence in occurrences(
+            series, day_start(start), day_start(end)
+        ):
+            data = entry(row, *occurrence)
+            for room_id, day in reservation_days(row["room_id"], *occurrence):
+                if start <= day < end:
+                    grid[room_id]["days"].setdefault(day, []).append(data)
+                    added.add((room_id, day))
+    for room_id, day in added:
+        # entries are listed by start time, as stored
+        grid[room_id]["days"][day].sort(
+            key=lambda data: (data["from_date"], data["id"])
+        )
+
+    return [
+        {
+            "id": room["id"],
+            "title": room["title"],
+            "days": [
+                {
+                    "day": start + timedelta(days=offset),
+                    "reservations": room["days"].get(
+                        start + timedelta(days=offset), []
+                    ),
+                }
+                for offset in range(count)
+            ],
+        }
+        for room in grid.values()
+    ]
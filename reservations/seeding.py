@@ -0,0 +1,438 @@
+import csv
+import io
+import json
+import random
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from .models import MeetingRoom, Reservation, Invitation
+from .recurrence import NONE
+from .schedule import rebuild_schedules, schedules_enabled
+
+User = get_user_model()
+
+SLOT = timedelta(minutes=30)
+# lengths of ad hoc meetings in slots, 30 minutes to 2 hours
+DURATIONS = (1, 1, 1, 2, 2, 2, 2, 3, 4)
+STATUS_WEIGHTS = {
+    Invitation.ATTENDING: 60,
+    Invitation.MAYBE: 25,
+    Invitation.NOT_ATTENDING: 15,
+}
+TOPICS = (
+    "Planning",
+    "Review",
+    "Sync",
+    "Interview",
+    "Demo",
+    "Retro",
+    "Workshop",
+    "One on one",
+)
+
+USER_FIELDS = (
+    "id",
+    "username",
+    "password",
+    "first_name",
+    "last_name",
+    "email",
+    "is_superuser",
+    "is_staff",
+    "is_active",
+    "date_joined",
+)
+ROOM_FIELDS = ("id", "title")
+RESERVATION_FIELDS = (
+    "id",
+    "title",
+    "from_date",
+    "to_date",
+    "room_id",
+    "creator_id",
+    "recurrence",
+    "recurrence_interval",
+    "recurrence_exceptions",
+)
+INVITATION_FIELDS = ("id", "reservation_id", "invitee_id", "status")
+
+
+def next_id(model):
+    return (model.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+
+
+def copy_value(value):
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return json.dumps(value)
+    return value
+
+
+class BulkWriter:
+    """
+    Insert rows of a model given as tuples of `fields` values in batches of
+    `batch_size`, with COPY on PostgreSQL and a single executemany()
+    elsewhere, so only one batch is ever held in memory. Building models
+    for bulk_create would cost several times more than the inserts. Rows
+    carry their own ids, which the database sequence is moved past when the
+    writer is closed
+    """
+
+    def __init__(self, model, fields, batch_size=10000, use_copy=True):
+        self.model = model
+        self.fields = fields
+        self.batch_size = batch_size
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+        self.rows = []
+        self.count = 0
+        meta = model._meta
+        self.table = connection.ops.quote_name(meta.db_table)
+        self.columns = ", ".join(
+            connection.ops.quote_name(meta.get_field(field).column)
+            for field in fields
+        )
+        # only these fields' values need converting for the database driver
+        self.converters = [
+            (position, meta.get_field(field).get_db_prep_save)
+            for position, field in enumerate(fields)
+            if meta.get_field(field).get_internal_type()
+            in ("DateTimeField", "JSONField")
+        ]
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.use_copy:
+            self.copy()
+        else:
+            self.insert()
+        self.count += len(self.rows)
+        self.rows = []
+
+    def insert(self):
+        rows = self.rows
+        if self.converters:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for position, convert in self.converters:
+                    row[position] = convert(row[position], connection)
+        placeholders = ", ".join(["%s"] * len(self.fields))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} ({self.columns}) "
+                f"VALUES ({placeholders})",
+                rows,
+            )
+
+    def copy(self):
+        data = io.StringIO()
+        writer = csv.writer(data)
+        for row in self.rows:
+            writer.writerow([copy_value(value) for value in row])
+        data.seek(0)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f"COPY {self.table} ({self.columns}) "
+                "FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                data,
+            )
+
+    def close(self):
+        self.flush()
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [self.model]
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def standing_meetings(rng, count, day_slots):
+    """
+    Weekly meetings of a room, as (weekday, first slot, slots) without
+    overlaps, which are booked every week like a recurring series would be
+    """
+    meetings = []
+    for _ in range(count * 3):
+        if len(meetings) == count:
+            break
+        weekday = rng.randrange(5)
+        length = rng.choice((1, 2))
+        first = rng.randrange(day_slots - length + 1)
+        if any(
+            other[0] == weekday
+            and other[1] < first + length
+            and first < other[1] + other[2]
+            for other in meetings
+        ):
+            continue
+        meetings.append((weekday, first, length))
+    return meetings
+
+
+def room_schedule(
+    rng, start, count, standing, occupancy, day_start=8, day_end=18
+):
+    """
+    Lazily yield `count` non-overlapping (from, to, standing meeting number
+    or None) bookings of a room on weekdays between `day_start` and
+    `day_end` o'clock, starting with the week of `start`. Standing meetings
+    are booked first, the time between them is filled with ad hoc meetings
+    at the `occupancy` rate
+    """
+    day_slots = (day_end - day_start) * 2
+    by_weekday = {}
+    for number, (weekday, first, length) in enumerate(
+        standing_meetings(rng, standing, day_slots)
+    ):
+        by_weekday.setdefault(weekday, []).append((first, length, number))
+    for meetings in by_weekday.values():
+        meetings.sort()
+
+    day = start.date()
+    booked = 0
+    while True:
+        if day.weekday() < 5:
+            opening = timezone.make_aware(
+                datetime.combine(day, time(day_start)), timezone.utc
+            )
+            fixed = by_weekday.get(day.weekday(), [])
+            position = cursor = 0
+            while cursor < day_slots:
+                if booked == count:
+                    return
+                if position < len(fixed) and fixed[position][0] == cursor:
+                    _, length, number = fixed[position]
+                    position += 1
+                elif rng.random() < occupancy:
+                    limit = (
+                        fixed[position][0]
+                        if position < len(fixed)
+                        else day_slots
+                    )
+                    length = min(rng.choice(DURATIONS), limit - cursor)
+                    number = None
+                else:
+                    cursor += 1
+                    continue
+                yield (
+                    opening + SLOT * cursor,
+                    opening + SLOT * (cursor + length),
+                    number,
+                )
+                booked += 1
+                cursor += length
+        day += timedelta(days=1)
+
+
+class Population:
+    """
+    Users to draw creators and guests from. Users are picked with Zipf-like
+    weights, the one at rank r with weight 1 / r ** skew, so a few people
+    organise and attend most of the meetings
+    """
+
+    def __init__(self, rng, user_ids, skew):
+        self.rng = rng
+        self.user_ids = user_ids
+        self.cum_weights = list(
+            accumulate(
+                1 / rank ** skew for rank in range(1, len(user_ids) + 1)
+            )
+        )
+
+    def pick(self, count=1):
+        return self.rng.choices(
+            self.user_ids, cum_weights=self.cum_weights, k=count
+        )
+
+    def guests(self, creator_id, mean, maximum):
+        """Distinct guests other than the creator, about `mean` of them"""
+        if mean <= 0:
+            return []
+        count = min(maximum, int(self.rng.expovariate(1 / mean)))
+        return [
+            user_id
+            for user_id in dict.fromkeys(self.pick(count))
+            if user_id != creator_id
+        ]
+
+
+class Seeder:
+    """
+    Generates users, meeting rooms with non-overlapping reservations and
+    their invitations, streaming the rows to the database so memory doesn't
+    grow with the size of the data set. Every room gets up to `standing`
+    weekly meetings with the same creator and guests each week, the rest of
+    its reservations are ad hoc ones with about `guests` random guests
+    """
+
+    def __init__(
+        self,
+        guests=3,
+        max_guests=50,
+        creator_skew=1.0,
+        standing=3,
+        occupancy=0.6,
+        start=None,
+        random_seed=None,
+        batch_size=10000,
+        use_copy=True,
+    ):
+        self.guests = guests
+        self.max_guests = max_guests
+        self.creator_skew = creator_skew
+        self.standing = standing
+        self.occupancy = occupancy
+        self.start = start or datetime(2021, 1, 4, tzinfo=timezone.utc)
+        self.rng = random.Random(random_seed)
+        self.batch_size = batch_size
+        self.writers = {
+            model: BulkWriter(model, fields, batch_size, use_copy)
+            for model, fields in (
+                (User, USER_FIELDS),
+                (MeetingRoom, ROOM_FIELDS),
+                (Reservation, RESERVATION_FIELDS),
+                (Invitation, INVITATION_FIELDS),
+            )
+        }
+        self.statuses = list(STATUS_WEIGHTS)
+        self.status_weights = list(accumulate(STATUS_WEIGHTS.values()))
+
+    def create_users(self, count):
+        first = next_id(User)
+        now = timezone.now()
+        writer = self.writers[User]
+        with transaction.atomic():
+            for user_id in range(first, first + count):
+                writer.add(
+                    (
+                        user_id,
+                        f"seed{user_id}",
+                        UNUSABLE_PASSWORD_PREFIX,
+                        "",
+                        "",
+                        f"seed{user_id}@example.com",
+                        False,
+                        False,
+                        True,
+                        now,
+                    )
+                )
+            writer.close()
+        return list(range(first, first + count))
+
+    def create_rooms(self, count):
+        first = next_id(MeetingRoom)
+        writer = self.writers[MeetingRoom]
+        with transaction.atomic():
+            for room_id in range(first, first + count):
+                writer.add((room_id, f"Room {room_id}"))
+            writer.close()
+        return list(range(first, first + count))
+
+    def create_reservations(self, room_ids, per_room, population, log=None):
+        reservations = self.writers[Reservation]
+        invitations = self.writers[Invitation]
+        self.reservation_id = next_id(Reservation)
+        self.invitation_id = next_id(Invitation)
+        # about a batch of reservations is committed at a time
+        step = max(1, self.batch_size // max(1, per_room))
+        for position in range(0, len(room_ids), step):
+            with transaction.atomic():
+                for room_id in room_ids[position:position + step]:
+                    self.book_room(room_id, per_room, population)
+                reservations.flush()
+                invitations.flush()
+            if log is not None:
+                log(
+                    f"{reservations.count} reservations, "
+                    f"{invitations.count} invitations"
+                )
+        with transaction.atomic():
+            reservations.close()
+            invitations.close()
+
+    def book_room(self, room_id, count, population):
+        rng = self.rng
+        # creators and guests of the standing meetings, chosen when first
+        # booked
+        standing_people = {}
+        for from_date, to_date, number in room_schedule(
+            rng, self.start, count, self.standing, self.occupancy
+        ):
+            if number is None:
+                creator_id = population.pick()[0]
+                invitees = population.guests(
+                    creator_id, self.guests, self.max_guests
+                )
+                title = f"{rng.choice(TOPICS)} {self.reservation_id}"
+            else:
+                if number not in standing_people:
+                    creator_id = population.pick()[0]
+                    standing_people[number] = (
+                        creator_id,
+                        population.guests(
+                            creator_id, self.guests, self.max_guests
+                        ),
+                    )
+                creator_id, invitees = standing_people[number]
+                title = f"Weekly {TOPICS[number % len(TOPICS)].lower()}"
+            self.writers[Reservation].add(
+                (
+                    self.reservation_id,
+                    title,
+                    from_date,
+                    to_date,
+                    room_id,
+                    creator_id,
+                    NONE,
+                    1,
+                    [],
+                )
+            )
+            statuses = rng.choices(
+                self.statuses,
+                cum_weights=self.status_weights,
+                k=len(invitees),
+            )
+            for invitee_id, status in zip(invitees, statuses):
+                self.writers[Invitation].add(
+                    (
+                        self.invitation_id,
+                        self.reservation_id,
+                        invitee_id,
+                        status,
+                    )
+                )
+                self.invitation_id += 1
+            self.reservation_id += 1
+
+    def run(self, rooms, reservations_per_room, users, log=None):
+        """Seed the data set and return the number of rows per model"""
+        user_ids = self.create_users(users)
+        room_ids = self.create_rooms(rooms)
+        population = Population(self.rng, user_ids, self.creator_skew)
+        self.create_reservations(
+            room_ids, reservations_per_room, population, log
+        )
+        # the rows were inserted without the signals maintaining them
+        if schedules_enabled():
+            with transaction.atomic():
+                rebuild_schedules(room_ids)
+        return {model: writer.count for model, writer in self.writers.items()}
@@ -1,11 +1,33 @@
 import logging
-from django.db.models import Q
+from contextlib import contextmanager
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import MeetingRoom, Reservation, Invitation
+from .intervals import has_overlapping_reservation
+from .booking import is_overlap_violation, room_lock
+from .cache import batched_invalidation, invalidate
+from .export import CSV, FORMATS
+from .recurrence import MONTHLY, Series, fixed_period
+from .changes import batched_changes, record_changes
+from .conflicts import ERROR, OFF, find_conflicts, get_mode
+
+User = get_user_model()
 
 logger = logging.getLogger("django")
 
 
+class ConflictSerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    reservation = serializers.IntegerField()
+    title = serializers.CharField()
+    room = serializers.IntegerField()
+    from_date = serializers.DateTimeField()
+    to_date = serializers.DateTimeField()
+
+
 class InvitationSerializer(serializers.ModelSerializer):
     reservation = serializers.CharField(read_only=True)
 
@@ -16,6 +38,9 @@ class InvitationSerializer(serializers.ModelSerializer):
 
 class ReservationSerializer(serializers.ModelSerializer):
     guests = InvitationSerializer(many=True, required=False)
+    recurrence_exceptions = serializers.ListField(
+        child=serializers.DateField(), required=False
+    )
 
     class Meta:
         model = Reservation
@@ -27,23 +52,43 @@ class ReservationSerializer(serializers.ModelSerializer):
             "room",
             "creator",
             "guests",
+            "recurrence",
+            "recurrence_interval",
+            "recurrence_count",
+            "recurrence_until",
+            "recurrence_exceptions",
+            "recurrence_end",
         ]
 
+    # other meetings of the people of the validated reservation
+    conflicts = ()
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.conflicts:
+            data["conflicts"] = ConflictSerializer(
+                self.conflicts, many=True
+            ).data
+        return data
+
     def create(self, validated_data):
         logger.info(
             f"Creating a new reservation with the following validated data: "
             f"{validated_data}"
         )
-        invitations = validated_data.get("guests", None)
-        if invitations:
-            invitations = validated_data.pop("guests")
-            reservation = Reservation.objects.create(**validated_data)
-            for invitation in invitations:
-                Invitation.objects.create(
-                    reservation=reservation, **invitation
-                )
-        else:
+        invitations = validated_data.pop("guests", [])
+        with self.booking(validated_data):
             reservation = Reservation.objects.create(**validated_data)
+            Invitation.objects.bulk_create(
+                Invitation(reservation=reservation, **invitation)
+                for invitation in invitations
+            )
+            # bulk queries don't send signals
+            invalidate(
+                user_ids=[
+                    invitation["invitee"].pk for invitation in invitations
+                ]
+            )
         return reservation
 
     def update(self, instance, validated_data):
@@ -51,79 +96,119 @@ class ReservationSerializer(serializers.ModelSerializer):
             f"Updating a reservation with id {instance.id} with the following "
             f"validated data: {validated_data}"
         )
-        instance.title = validated_data.get("title", instance.title)
-        instance.from_date = validated_data.get(
-            "from_date", instance.from_date
-        )
-        instance.to_date = validated_data.get("to_date", instance.to_date)
-        instance.room = validated_data.get("room", instance.room)
-        instance.creator = validated_data.get("creator", instance.creator)
-        instance.save()
+        with self.booking(validated_data):
+            instance.title = validated_data.get("title", instance.title)
+            instance.from_date = validated_data.get(
+                "from_date", instance.from_date
+            )
+            instance.to_date = validated_data.get("to_date", instance.to_date)
+            instance.room = validated_data.get("room", instance.room)
+            instance.creator = validated_data.get("creator", instance.creator)
+            for field in Series._fields[2:]:
+                setattr(
+                    instance,
+                    field,
+                    validated_data.get(field, getattr(instance, field)),
+                )
+            instance.save()
 
-        new_invitation_data = validated_data.get("guests", [])
-        self.update_invitation_data(new_invitation_data)
+            new_invitation_data = validated_data.get("guests", [])
+            self.update_invitation_data(new_invitation_data)
 
         return instance
 
-    def update_invitation_data(self, new_invitation_data):
+    @contextmanager
+    def booking(self, validated_data):
         """
-        Update invitations depending if new data has the same number of
-        invitations, more invitations or less invitations than before
+        Write the reservation in a transaction holding the lock of its room,
+        repeating the overlap check inside it, since another booking of the
+        room might have been committed after the data was validated. A
+        reservation moved to another room locks its previous room with it,
+        which the schedules rebuild too, so that two reservations moved in
+        opposite directions don't each wait for the other's room
         """
-        old_invitation_data = self.instance.guests.all()
-        if old_invitation_data:
-
-            if len(new_invitation_data) == len(old_invitation_data):
-                logger.info(
-                    "updating with the reservation with the same number of "
-                    "invitations"
-                )
-                for number, old_invitation in enumerate(old_invitation_data):
-                    old_invitation.invitee = new_invitation_data[number].get(
-                        "invitee", old_invitation.invitee
-                    )
-                    old_invitation.save()
-
-            elif len(new_invitation_data) > len(old_invitation_data):
-                logger.info(
-                    "updating with the reservation with more "
-                    "invitations than before"
-                )
-                for number, new_invitation in enumerate(new_invitation_data):
-                    if number < len(old_invitation_data):
-                        old_invitation_data[
-                            number
-                        ].invitee = new_invitation.get(
-                            "invitee", old_invitation_data[number].invitee
-                        )
-                        old_invitation_data[number].save()
-                    else:
-                        Invitation.objects.create(
-                            reservation=self.instance, **new_invitation
-                        )
-
-            elif len(new_invitation_data) < len(old_invitation_data):
-                logger.info(
-                    "updating with the reservation with less invitations"
-                    "than before"
+        (
+            room,
+            start_time,
+            end_time,
+        ) = self.get_data_from_request_data_or_from_instance(validated_data)
+        series = self.get_series(validated_data)
+        rooms = [room.id]
+        if self.instance is not None:
+            rooms.append(self.instance.room_id)
+        try:
+            with room_lock(*rooms), batched_invalidation(), batched_changes():
+                self.validate_if_there_are_no_other_meetings_at_the_same_time(
+                    room, start_time, end_time, series
                 )
-                for number, old_invitation in enumerate(old_invitation_data):
-                    if number < len(new_invitation_data):
-                        old_invitation.invitee = new_invitation_data[
-                            number
-                        ].get("invitee", old_invitation.invitee)
-                        old_invitation.save()
-                    else:
-                        old_invitation.delete()
-        else:
+                yield
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: error.detail}
+            )
+        except IntegrityError as error:
+            if not is_overlap_violation(error):
+                raise
             logger.info(
-                "updating the reservation which previously had no invitations"
-                "with new invitations"
+                f"Exclusion constraint rejected a reservation for room: "
+                f"{room.id}, start time: {start_time} and end time: "
+                f"{end_time}"
+            )
+            raise serializers.ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        "There is an overlap with another reservation"
+                    ]
+                }
             )
-            for new_invitation in new_invitation_data:
-                Invitation.objects.create(
-                    reservation=self.instance, **new_invitation
-                )
+
+    def update_invitation_data(self, new_invitation_data):
+        """
+        Bring the invitations in line with the new data by matching them on
+        the invitee: invitations of guests missing from the new data are
+        deleted, new guests are invited and the status of the remaining
+        invitations is updated, each with a single query
+        """
+        new_invitations = {
+            invitation["invitee"].pk: invitation
+            for invitation in new_invitation_data
+        }
+        old_invitations = {
+            invitation.invitee_id: invitation
+            for invitation in self.instance.guests.all()
+        }
+
+        removed = old_invitations.keys() - new_invitations.keys()
+        added = [
+            Invitation(reservation=self.instance, **invitation)
+            for invitee_id, invitation in new_invitations.items()
+            if invitee_id not in old_invitations
+        ]
+        changed = []
+        for invitee_id, invitation in old_invitations.items():
+            status = new_invitations.get(invitee_id, {}).get("status")
+            if status is not None and status != invitation.status:
+                invitation.status = status
+                changed.append(invitation)
+
+        logger.info(
+            f"Updating invitations of the reservation with id "
+            f"{self.instance.id}: {len(removed)} removed, {len(added)} added "
+            f"and {len(changed)} changed"
+        )
+        with transaction.atomic(), batched_invalidation(), batched_changes():
+            if removed:
+                Invitation.objects.filter(
+                    reservation=self.instance, invitee_id__in=removed
+                ).delete()
+            if added:
+                Invitation.objects.bulk_create(added)
+            if changed:
+                Invitation.objects.bulk_update(changed, ["status"])
+            if added or changed:
+                # bulk queries don't send signals
+                invalidate(reservation_ids=[self.instance.id])
+                record_changes([self.instance.id])
 
     def validate(self, data):
         logger.info(f"Validating the following request data: {data}")
@@ -139,9 +224,12 @@ class ReservationSerializer(serializers.ModelSerializer):
         ) = self.get_data_from_request_data_or_from_instance(data)
 
         self.validate_times(start_time, end_time)
+        series = self.get_series(data)
+        self.validate_series(series)
         self.validate_if_there_are_no_other_meetings_at_the_same_time(
-            room, start_time, end_time
+            room, start_time, end_time, series
         )
+        self.validate_attendee_conflicts(data, series)
         return data
 
     def get_data_from_request_data_or_from_instance(self, data):
@@ -167,29 +255,30 @@ class ReservationSerializer(serializers.ModelSerializer):
 
         return room, start_time, end_time
 
+    def get_series(self, data):
+        """
+        Get the times and the recurrence rule of the reservation from
+        request data, from the instance or from the model defaults
+        """
+        values = {}
+        for field in Series._fields:
+            if field in data:
+                values[field] = data[field]
+            elif self.instance is not None:
+                values[field] = getattr(self.instance, field)
+            else:
+                values[field] = Reservation._meta.get_field(
+                    field
+                ).get_default()
+        return Series(**values)
+
     def validate_if_there_are_no_other_meetings_at_the_same_time(
-        self, room, start_time, end_time
+        self, room, start_time, end_time, series=None
     ):
-        # if validating during update
-        if self.instance:
-            reservation_id = self.instance.id
-            same_time_same_room = (
-                Reservation.objects.exclude(id=reservation_id)
-                .filter(room=room)
-                .filter(
-                    Q(from_date=start_time, to_date=end_time)
-                    | Q(from_date__lte=start_time, to_date__gt=start_time)
-                    | Q(from_date__lt=end_time, to_date__gte=end_time)
-                )
-            )
-        # if validating during create
-        else:
-            same_time_same_room = Reservation.objects.filter(room=room).filter(
-                Q(from_date=start_time, to_date=end_time)
-                | Q(from_date__lte=start_time, to_date__gt=start_time)
-                | Q(from_date__lt=end_time, to_date__gte=end_time)
-            )
-        if same_time_same_room.exists():
+        exclude = self.instance.id if self.instance else None
+        if has_overlapping_reservation(
+            room, start_time, end_time, exclude=exclude, series=series
+        ):
             logger.info(
                 f"Meeting time clash validation error for room: {room.id},"
                 f"start time: {start_time} and end time: {end_time} "
@@ -198,6 +287,49 @@ class ReservationSerializer(serializers.ModelSerializer):
                 "There is an overlap with another reservation"
             )
 
+    def validate_attendee_conflicts(self, data, series):
+        """
+        Look up the other meetings of the creator and of the guests, except
+        the ones declining, at the time of the reservation with a single
+        query. Depending on RESERVATIONS_ATTENDEE_CONFLICTS they turn the
+        reservation down, are listed in its response, or aren't looked up.
+        Unlike room overlaps they aren't checked again as the reservation
+        is written
+        """
+        mode = get_mode()
+        if mode == OFF:
+            return
+        if "creator" in data:
+            creator_id = data["creator"].pk
+        else:
+            creator_id = self.instance.creator_id
+        user_ids = {creator_id} | {
+            invitation["invitee"].pk
+            for invitation in data.get("guests", [])
+            if invitation.get("status") != Invitation.NOT_ATTENDING
+        }
+        exclude = self.instance.id if self.instance else None
+        self.conflicts = find_conflicts(user_ids, series, exclude=exclude)
+        if not self.conflicts or mode != ERROR:
+            return
+        names = dict(
+            User.objects.filter(
+                pk__in={conflict["user"] for conflict in self.conflicts}
+            ).values_list("pk", User.USERNAME_FIELD)
+        )
+        logger.info(
+            f"Attendee conflict validation error for users: "
+            f"{sorted(names)}, start time: {series.from_date} and end time: "
+            f"{series.to_date}"
+        )
+        raise serializers.ValidationError(
+            [
+                f"{names[conflict['user']]} has another meeting at the same "
+                f"time: {conflict['title']}"
+                for conflict in self.conflicts
+            ]
+        )
+
     def validate_times(self, start, end):
         if start >= end:
             logger.info(
@@ -208,6 +340,65 @@ class ReservationSerializer(serializers.ModelSerializer):
                 "Start time must be set earlier than end time"
             )
 
+    def validate_series(self, series):
+        if not series.recurrence:
+            return
+        duration = series.to_date - series.from_date
+        if series.recurrence == MONTHLY:
+            too_long = duration > timedelta(days=28)
+        else:
+            too_long = duration > fixed_period(series)
+        if too_long:
+            logger.info(
+                f"Recurrence validation error with duration {duration} and "
+                f"rule {series.recurrence} every "
+                f"{series.recurrence_interval}"
+            )
+            raise serializers.ValidationError(
+                "A recurring meeting must end before its next occurrence "
+                "starts"
+            )
+        if (
+            series.recurrence_until is not None
+            and series.recurrence_until < series.from_date
+        ):
+            raise serializers.ValidationError(
+                "Recurrence must not end before the meeting starts"
+            )
+
+
+class BatchInvitationSerializer(InvitationSerializer):
+    invitee = serializers.IntegerField()
+
+
+class BatchReservationSerializer(ReservationSerializer):
+    """
+    Validates a single item of a batch without querying the database: the
+    room and the users are referenced by id and looked up for the whole
+    batch at once, and overlaps are checked by the batch sweep. Batches
+    only book single reservations
+    """
+
+    room = serializers.IntegerField()
+    creator = serializers.IntegerField()
+    guests = BatchInvitationSerializer(many=True, required=False)
+    recurrence_exceptions = None
+
+    class Meta(ReservationSerializer.Meta):
+        fields = [
+            "id",
+            "title",
+            "from_date",
+            "to_date",
+            "room",
+            "creator",
+            "guests",
+        ]
+
+    def validate(self, data):
+        self.validate_times(data["from_date"], data["to_date"])
+        return data
+
 
 class MeetingRoomSerializer(serializers.ModelSerializer):
     reservations = ReservationSerializer(many=True, required=False)
@@ -215,3 +406,116 @@ class MeetingRoomSerializer(serializers.ModelSerializer):
     class Meta:
         model = MeetingRoom
         fields = "__all__"
+
+
+class AvailabilitySerializer(serializers.Serializer):
+    """
+    Query parameters of the room availability search: the `from` - `to`
+    window, the minimum `duration` of a free slot in minutes and optionally
+    comma separated ids of the `rooms` to search
+    """
+
+    duration = serializers.IntegerField(min_value=1, default=1)
+    rooms = serializers.CharField(required=False)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # "from" is a keyword, so these can't be declared as attributes
+        fields["from"] = serializers.DateTimeField()
+        fields["to"] = serializers.DateTimeField()
+        return fields
+
+    def validate_rooms(self, value):
+        try:
+            return [int(room_id) for room_id in value.split(",")]
+        except ValueError:
+            raise serializers.ValidationError(
+                "Expected comma separated room ids"
+            )
+
+    def validate(self, data):
+        if data["from"] >= data["to"]:
+            raise serializers.ValidationError(
+                "Start time must be set earlier than end time"
+            )
+        # compared in seconds, a huge duration doesn't fit a timedelta
+        if data["duration"] * 60 > (data["to"] - data["from"]).total_seconds():
+            raise serializers.ValidationError(
+                {"duration": ["Must not be longer than the time window"]}
+            )
+        return data
+
+
+class ScheduleSerializer(serializers.Serializer):
+    """
+    Query parameters of the room schedules: the first day, `from`, the
+    number of `days` and optionally comma separated ids of the `rooms`
+    """
+
+    days = serializers.IntegerField(min_value=1, max_value=31, default=7)
+    rooms = serializers.CharField(required=False)
+
+    validate_rooms = AvailabilitySerializer.validate_rooms
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"] = serializers.DateField()
+        return fields
+
+
+class AnalyticsSerializer(serializers.Serializer):
+    """
+    Query parameters of the utilization report: the `from` and `to` days,
+    both included, and optionally comma separated ids of the `rooms`
+    """
+
+    # about three years
+    MAX_DAYS = 1096
+
+    rooms = serializers.CharField(required=False)
+
+    validate_rooms = AvailabilitySerializer.validate_rooms
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"] = serializers.DateField()
+        fields["to"] = serializers.DateField()
+        return fields
+
+    def validate(self, data):
+        if data["from"] > data["to"]:
+            raise serializers.ValidationError(
+                "The first day must not be after the last one"
+            )
+        if (data["to"] - data["from"]).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(
+                f"Reports cover up to {self.MAX_DAYS} days"
+            )
+        return data
+
+
+class ExportSerializer(serializers.Serializer):
+    """
+    Query parameters of the reservations export: the `output` format,
+    whether to `gzip` it, and optionally a `from` - `to` window and comma
+    separated ids of the `rooms` to export
+    """
+
+    output = serializers.ChoiceField(choices=FORMATS, default=CSV)
+    gzip = serializers.BooleanField(default=False)
+    rooms = serializers.CharField(required=False)
+
+    validate_rooms = AvailabilitySerializer.validate_rooms
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"] = serializers.DateTimeField(required=False)
+        fields["to"] = serializers.DateTimeField(required=False)
+        return fields
+
+    def validate(self, data):
+        if "from" in data and "to" in data and data["from"] >= data["to"]:
+            raise serializers.ValidationError(
+                "Start time must be set earlier than end time"
+            )
+        return data
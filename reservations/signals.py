@@ -0,0 +1,277 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+from .cache import get_cache, invalidate, related_ids
+from .events import Change, hub, notifications_enabled, notify
+from .intervals import interval_index_enabled, room_index
+from .models import MeetingRoom, Reservation, Invitation
+from .changes import record_changes
+from .schedule import refresh_days, reservation_days, schedules_enabled
+
+# sent after reservations were inserted with bulk queries, which don't send
+# post_save, with the list of created reservations as `reservations`
+reservations_bulk_created = Signal()
+
+
+@receiver(post_save, sender=Reservation)
+def update_room_index(sender, instance, **kwargs):
+    if interval_index_enabled():
+        transaction.on_commit(lambda: room_index.add(instance))
+
+
+@receiver(post_delete, sender=Reservation)
+def remove_from_room_index(sender, instance, **kwargs):
+    if interval_index_enabled():
+        reservation_id = instance.id
+        transaction.on_commit(lambda: room_index.discard(reservation_id))
+
+
+@receiver(reservations_bulk_created, sender=Reservation)
+def add_to_room_index(sender, reservations, **kwargs):
+    if interval_index_enabled():
+
+        def add_all():
+            for reservation in reservations:
+                room_index.add(reservation)
+
+        transaction.on_commit(add_all)
+
+
+@receiver(pre_save, sender=Reservation)
+def remember_previous_creator(sender, instance, **kwargs):
+    instance._previous = None
+    if instance._state.adding:
+        return
+    # the previous creator is needed by the cache and the recorded changes,
+    # the previous room by the cache and the room events, its previous days
+    # by the schedules
+    instance._previous = (
+        Reservation.objects.filter(pk=instance.pk)
+        .values_list(
+            "creator_id", "room_id", "from_date", "to_date", "recurrence"
+        )
+        .first()
+    )
+
+
+@receiver(post_save, sender=Reservation)
+def invalidate_reservation_users(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    # the reservation may have moved away from its previous creator or room
+    invalidate(
+        user_ids=previous[:1] if previous else [],
+        reservation_ids=[instance.id],
+        room_ids=previous[1:2] if previous else [],
+    )
+
+
+@receiver(post_delete, sender=Reservation)
+def invalidate_deleted_reservation_users(sender, instance, **kwargs):
+    # the guests are invalidated as their invitations are deleted
+    invalidate(user_ids=[instance.creator_id], room_ids=[instance.room_id])
+
+
+@receiver(post_save, sender=Invitation)
+@receiver(post_delete, sender=Invitation)
+def invalidate_invitation_users(sender, instance, **kwargs):
+    # the guest list is part of the reservation seen by everyone related
+    invalidate(
+        user_ids=[instance.invitee_id],
+        reservation_ids=[instance.reservation_id],
+    )
+
+
+def changed(update_fields, fields):
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver(post_save, sender=MeetingRoom)
+def invalidate_renamed_room_feeds(sender, instance, created, **kwargs):
+    # the title is the location of the room's reservations in the calendar
+    # feeds of the room and of everyone related to them
+    if (
+        created
+        or get_cache() is None
+        or not changed(kwargs["update_fields"], {"title"})
+    ):
+        return
+    user_ids, _ = related_ids(
+        Reservation.objects.filter(room_id=instance.id).values("id")
+    )
+    invalidate(user_ids=user_ids, room_ids=[instance.id])
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_renamed_user_feeds(sender, instance, created, **kwargs):
+    # users are named in the feeds of their meetings' people and rooms by
+    # their username and email address, logins don't change them
+    if (
+        created
+        or get_cache() is None
+        or not changed(kwargs["update_fields"], {"username", "email"})
+    ):
+        return
+    user_ids, room_ids = related_ids(
+        Reservation.objects.filter(
+            Q(creator_id=instance.pk)
+            | Q(
+                id__in=Invitation.objects.filter(
+                    invitee_id=instance.pk
+                ).values("reservation_id")
+            )
+        ).values("id")
+    )
+    invalidate(user_ids={instance.pk, *user_ids}, room_ids=room_ids)
+
+
+@receiver(reservations_bulk_created, sender=Reservation)
+def invalidate_bulk_created_reservation_users(
+    sender, reservations, **kwargs
+):
+    invalidate(
+        reservation_ids=[reservation.id for reservation in reservations]
+    )
+
+
+def streamed(room_ids=None):
+    """
+    Whether the given rooms, or any room, may be streamed. With
+    notifications, by the hub of any process, which this one can't tell
+    """
+    if notifications_enabled():
+        return True
+    return hub.active() if room_ids is None else hub.watched(room_ids)
+
+
+def record_changes_of(changes):
+    if notifications_enabled():
+        notify(changes)
+        return
+
+    def record_all():
+        for change in changes:
+            hub.record(change)
+
+    transaction.on_commit(record_all)
+
+
+def record_change(reservation_id, created=False, room_ids=()):
+    record_changes_of([Change(reservation_id, created, frozenset(room_ids))])
+
+
+@receiver(post_save, sender=Reservation)
+def publish_saved_reservation(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    room_ids = {instance.room_id, *(previous[1:2] if previous else ())}
+    if streamed(room_ids):
+        record_change(instance.id, created, room_ids)
+
+
+@receiver(post_delete, sender=Reservation)
+def publish_deleted_reservation(sender, instance, **kwargs):
+    if streamed([instance.room_id]):
+        record_change(instance.id, room_ids=[instance.room_id])
+
+
+@receiver(post_save, sender=Invitation)
+@receiver(post_delete, sender=Invitation)
+def publish_changed_guests(sender, instance, **kwargs):
+    # the room is looked up by the publisher, with the guest list
+    if streamed():
+        record_change(instance.reservation_id)
+
+
+@receiver(reservations_bulk_created, sender=Reservation)
+def publish_bulk_created_reservations(sender, reservations, **kwargs):
+    changes = [
+        Change(reservation.id, True, frozenset([reservation.room_id]))
+        for reservation in reservations
+        if streamed([reservation.room_id])
+    ]
+    if changes:
+        record_changes_of(changes)
+
+
+@receiver(post_save, sender=Reservation)
+def record_reservation_change(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    # a previous creator gets the change taking the reservation from them
+    record_changes(
+        [instance.id],
+        [(previous[0], instance.id)] if previous else [],
+    )
+
+
+@receiver(post_delete, sender=Reservation)
+def record_deleted_reservation(sender, instance, **kwargs):
+    # the guests are recorded as their invitations are deleted
+    record_changes([instance.id], [(instance.creator_id, instance.id)])
+
+
+@receiver(post_save, sender=Invitation)
+@receiver(post_delete, sender=Invitation)
+def record_guests_change(sender, instance, **kwargs):
+    # clients sync reservations with their guest lists, a guest who is no
+    # longer invited gets the change too
+    record_changes(
+        [instance.reservation_id],
+        [(instance.invitee_id, instance.reservation_id)],
+    )
+
+
+@receiver(reservations_bulk_created, sender=Reservation)
+def record_bulk_created_reservations(sender, reservations, **kwargs):
+    record_changes([reservation.id for reservation in reservations])
+
+
+def single_days(room_id, from_date, to_date, recurrence):
+    # series have no stored days, their occurrences are expanded on reads
+    if recurrence:
+        return set()
+    return reservation_days(room_id, from_date, to_date)
+
+
+@receiver(post_save, sender=Reservation)
+def refresh_reservation_days(sender, instance, **kwargs):
+    if not schedules_enabled():
+        return
+    previous = getattr(instance, "_previous", None)
+    days = single_days(
+        instance.room_id,
+        instance.from_date,
+        instance.to_date,
+        instance.recurrence,
+    )
+    if previous:
+        days |= single_days(*previous[1:])
+    refresh_days(days)
+
+
+@receiver(post_delete, sender=Reservation)
+def refresh_deleted_reservation_days(sender, instance, **kwargs):
+    if schedules_enabled():
+        refresh_days(
+            single_days(
+                instance.room_id,
+                instance.from_date,
+                instance.to_date,
+                instance.recurrence,
+            )
+        )
+
+
+@receiver(reservations_bulk_created, sender=Reservation)
+def refresh_bulk_created_reservation_days(sender, reservations, **kwargs):
+    if schedules_enabled():
+        refresh_days(
+            day
+            for reservation in reservations
+            for day in single_days(
+                reservation.room_id,
+                reservation.from_date,
+                reservation.to_date,
+                reservation.recurrence,
+            )
+        )
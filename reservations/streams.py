@@ -0,0 +1,188 @@
+import asyncio
+import re
+from datetime import timedelta
+from urllib.parse import parse_qs
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.views import exception_handler
+from accounts.authentication import HashedTokenAuthentication
+from meetings.renderers import FastJSONRenderer
+from .async_views import database
+from .events import RESET, hub
+from .intervals import window_filter
+from .models import MeetingRoom, Reservation
+from .representations import represent_reservations, reservation_values
+from .tickets import redeem_ticket
+from .views import get_window
+
+EVENTS_PATH = re.compile(r"^/api/rooms/(?P<pk>\d+)/events/$")
+
+
+def get_heartbeat():
+    """Seconds between comments keeping idle streams open through proxies"""
+    return getattr(settings, "RESERVATIONS_EVENTS_HEARTBEAT", 15)
+
+
+def room_events_application(application):
+    """
+    Serve the event streams of rooms from an ASGI application, in front of
+    `application`, Django's. Django 3.1 can't stream from async code
+    """
+
+    async def app(scope, receive, send):
+        if scope["type"] == "http":
+            match = EVENTS_PATH.match(scope["path"])
+            if match:
+                return await room_events(
+                    scope, receive, send, int(match.group("pk"))
+                )
+        return await application(scope, receive, send)
+
+    return app
+
+
+async def respond_error(send, exc, headers=()):
+    """Answer with an API exception, like DRF views do"""
+    response = exception_handler(exc, {})
+    headers = [(b"content-type", b"application/json"), *headers]
+    if response.status_code == 401:
+        headers.append((b"www-authenticate", b"Token"))
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": headers,
+        }
+    )
+    await send(
+        {
+            "type": "http.response.body",
+            "body": FastJSONRenderer().render(response.data),
+        }
+    )
+
+
+def snapshot(key, ticket, room_id, query):
+    """
+    The room with its reservations in the `from` - `to` window, the next
+    day by default, for a user authenticated by a token `key`, or else by a
+    `ticket` to open the room's stream. Raises API exceptions like the
+    views
+    """
+    if key:
+        HashedTokenAuthentication().authenticate_credentials(key)
+    else:
+        redeem_ticket(ticket, room_id)
+    hub.wait_until_listening()
+    room = MeetingRoom.objects.filter(pk=room_id).values("id", "title").first()
+    if room is None:
+        raise exceptions.NotFound()
+    start, end = get_window(query)
+    start = start or timezone.now()
+    end = end or start + timedelta(days=1)
+    reservations = reservation_values(
+        Reservation.objects.filter(
+            window_filter(start, end), room_id=room_id
+        ).order_by("from_date", "id")
+    )
+    return {**room, "reservations": represent_reservations(list(reservations))}
+
+
+async def room_events(scope, receive, send, room_id):
+    """
+    Stream the reservations of a room as server-sent events: a `snapshot`
+    of the room first, then `created`, `updated` and `deleted` events with
+    the reservation, or only its id when deleted. A client falling behind
+    gets `reset` and the stream ends, EventSource reconnects and gets a new
+    snapshot. EventSource can't set headers, so instead of the token it
+    can pass a ticket from the room's `events/ticket/` as `?ticket=`, which
+    keeps the token out of the URL, and out of access logs
+    """
+    if scope["method"] != "GET":
+        return await respond_error(
+            send,
+            exceptions.MethodNotAllowed(scope["method"]),
+            [(b"allow", b"GET")],
+        )
+    query = {
+        name: values[-1]
+        for name, values in parse_qs(
+            scope["query_string"].decode("latin-1")
+        ).items()
+    }
+    headers = dict(scope["headers"])
+    ticket = query.pop("ticket", None)
+    scheme, _, key = (
+        headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    )
+    if scheme != "Token":
+        key = None
+    if not key and not ticket:
+        return await respond_error(send, exceptions.NotAuthenticated())
+
+    # subscribed before the snapshot is read, so no change falls in between
+    subscription = hub.subscribe(room_id)
+    try:
+        try:
+            room = await database(snapshot)(key, ticket, room_id, query)
+        except exceptions.APIException as exc:
+            return await respond_error(send, exc)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    # nginx would buffer the stream otherwise
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"retry: 5000\nevent: snapshot\ndata: "
+                + FastJSONRenderer().render(room)
+                + b"\n\n",
+                "more_body": True,
+            }
+        )
+        await stream(subscription, receive, send)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def stream(subscription, receive, send):
+    """Send the queued events until the client leaves or falls behind"""
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        while True:
+            message = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                [message, disconnected],
+                timeout=get_heartbeat(),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected in done:
+                message.cancel()
+                return
+            if message not in done:
+                message.cancel()
+                body = b": heartbeat\n\n"
+            else:
+                body = message.result()
+            if body is RESET:
+                await send({"type": "http.response.body", "body": body})
+                return
+            await send(
+                {"type": "http.response.body", "body": body, "more_body": True}
+            )
+    finally:
+        disconnected.cancel()
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
@@ -0,0 +1,117 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from django.db import connection
+from django.db.models import Max, Q
+from rest_framework import serializers
+from .models import ParticipantChange, ReservationChange
+from .representations import represent_reservations, reservation_values
+
+INVALID_TOKEN = "Invalid sync token"
+
+
+def get_horizon():
+    """
+    The sequence below which no change can still appear. On PostgreSQL that
+    is the oldest transaction still running, the changes of the later ones
+    may be committed before it is
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT txid_snapshot_xmin(txid_current_snapshot())"
+            )
+            return cursor.fetchone()[0]
+    latest = ReservationChange.objects.aggregate(latest=Max("sequence"))
+    return (latest["latest"] or 0) + 1
+
+
+def encode_token(**position):
+    return b64encode(json.dumps(position).encode("ascii")).decode("ascii")
+
+
+def decode_token(token):
+    """
+    The position a token stands for: {"full": horizon, "after": id} while
+    every reservation is being listed, {"sequence": s, "id": id} for the
+    changes from (s, id) on
+    """
+    try:
+        position = json.loads(b64decode(token.encode("ascii"), validate=True))
+        if set(position) not in ({"full", "after"}, {"sequence", "id"}):
+            raise ValueError
+        if not all(isinstance(value, int) for value in position.values()):
+            raise ValueError
+    except (TypeError, ValueError, UnicodeEncodeError, BinasciiError):
+        raise serializers.ValidationError({"since": [INVALID_TOKEN]})
+    return position
+
+
+def changes_since(reservations, since, page_size, user_id=None):
+    """
+    The reservations changed since a token, the ids of the ones deleted, or
+    gone from `reservations`, and the token to continue from. Without a
+    token every reservation is listed first, by id, then the changes made
+    since the listing started. With a `user_id`, `reservations` being the
+    user's, only the changes recorded for the user are read
+    """
+    horizon = get_horizon()
+    position = (
+        decode_token(since)
+        if since is not None
+        else {"full": horizon, "after": 0}
+    )
+    if "full" in position:
+        rows = list(
+            reservation_values(
+                reservations.filter(id__gt=position["after"]).order_by("id")
+            )[:page_size + 1]
+        )
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        if more:
+            token = encode_token(full=position["full"], after=rows[-1]["id"])
+        else:
+            token = encode_token(sequence=position["full"], id=0)
+        return {
+            "changed": represent_reservations(rows),
+            "deleted": [],
+            "token": token,
+            "more": more,
+        }
+
+    if user_id is None:
+        recorded = ReservationChange.objects.all()
+    else:
+        recorded = ParticipantChange.objects.filter(user_id=user_id)
+    changes = list(
+        recorded.filter(
+            Q(sequence__gt=position["sequence"])
+            | Q(
+                sequence=position["sequence"],
+                reservation_id__gte=position["id"],
+            ),
+            sequence__lt=horizon,
+        )
+        .order_by("sequence", "reservation_id")
+        .values_list("sequence", "reservation_id")[:page_size + 1]
+    )
+    more = len(changes) > page_size
+    if more:
+        sequence, reservation_id = changes.pop()
+        token = encode_token(sequence=sequence, id=reservation_id)
+    else:
+        token = encode_token(sequence=horizon, id=0)
+    changed_ids = [reservation_id for _, reservation_id in changes]
+    rows = list(
+        reservation_values(
+            reservations.filter(id__in=changed_ids).order_by("id")
+        )
+    )
+    found = {row["id"] for row in rows}
+    return {
+        "changed": represent_reservations(rows),
+        "deleted": sorted(set(changed_ids) - found),
+        "token": token,
+        "more": more,
+    }
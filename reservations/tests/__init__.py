@@ -1,3 +1,24 @@
 from .models import *
 from .api import *
 from .serializers import *
+from .intervals import *
+from .booking import *
+from .queries import *
+from .pagination import *
+from .batch import *
+from .availability import *
+from .recurrence import *
+from .cache import *
+from .seeding import *
+from .ics import *
+from .export import *
+from .representations import *
+from .renderers import *
+from .async_views import *
+from .events import *
+from .sync import *
+from .databases import *
+from .schedule import *
+from .analytics import *
+from .conflicts import *
+from .benchmarks import *
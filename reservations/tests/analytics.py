@@ -0,0 +1,151 @@
+from datetime import date, datetime
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from reservations.analytics import covered
+from reservations.models import MeetingRoom, Reservation, Invitation
+from reservations.recurrence import DAILY
+
+User = get_user_model()
+
+ANALYTICS_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    "analytics": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "analytics-tests",
+    },
+}
+
+
+def at(day, hour, minute=0):
+    return datetime(2021, 9, day, hour, minute, tzinfo=timezone.utc)
+
+
+class CoveredTests(SimpleTestCase):
+    def test_intervals_are_split_at_the_bounds(self):
+        starts = np.array([0, 5, 25])
+        ends = np.array([15, 8, 40])
+        self.assertEqual(
+            covered(starts, ends, np.array([0, 10, 20, 30])).tolist(),
+            [13, 5, 5],
+        )
+
+    def test_bounds_by_row(self):
+        bounds = np.array([[0, 10, 20], [100, 110, 120]])
+        self.assertEqual(
+            covered(np.array([5, 105]), np.array([15, 106]), bounds).tolist(),
+            [[5, 5], [1, 0]],
+        )
+
+
+class AnalyticsTests(APITestCase):
+    def setUp(self):
+        self.url = reverse("rooms-analytics")
+        self.user = User.objects.create(username="jim", password="123456")
+        self.guests = [
+            User.objects.create(username=f"guest{number}")
+            for number in range(4)
+        ]
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.empty_room = MeetingRoom.objects.create(title="Empty room")
+        # Monday the 6th, 12 hours, then Tuesday 9 - 10 every day
+        self.workshop = Reservation.objects.create(
+            title="Workshop",
+            from_date=at(6, 6),
+            to_date=at(6, 18),
+            room=self.room,
+            creator=self.user,
+        )
+        Reservation.objects.create(
+            title="Standup",
+            from_date=at(7, 9),
+            to_date=at(7, 10),
+            room=self.room,
+            creator=self.user,
+            recurrence=DAILY,
+        )
+        for guest, answer in zip(
+            self.guests,
+            [
+                Invitation.ATTENDING,
+                Invitation.ATTENDING,
+                Invitation.NOT_ATTENDING,
+                Invitation.MAYBE,
+            ],
+        ):
+            Invitation.objects.create(
+                reservation=self.workshop, invitee=guest, status=answer
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def report(self, **params):
+        response = self.client.get(
+            self.url, {"from": "2021-09-06", "to": "2021-09-08", **params}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_report(self):
+        report = self.report()
+        self.assertEqual(report["from"], date(2021, 9, 6))
+        room, empty_room = report["rooms"]
+        self.assertEqual(room["booked_hours"], 14)
+        self.assertEqual(room["utilization"], round(14 / 72, 4))
+        # half a day on Monday, an hour on Tuesday and Wednesday
+        self.assertEqual(
+            room["daily_occupancy"], [2, 0, 0, 0, 0, 1, 0, 0, 0, 0]
+        )
+        self.assertEqual(
+            room["invitations"],
+            {"attending": 2, "not attending": 1, "maybe": 1},
+        )
+        self.assertEqual(room["attendance"], 0.5)
+        self.assertEqual(room["declined"], 0.25)
+
+        self.assertEqual(empty_room["booked_hours"], 0)
+        self.assertEqual(empty_room["daily_occupancy"], [3] + [0] * 9)
+        self.assertIsNone(empty_room["attendance"])
+
+        heatmap = report["hour_of_week"]
+        # one of two rooms on Monday from 6 to 18
+        self.assertEqual(heatmap[0][5:7], [0, 0.5])
+        self.assertEqual(heatmap[0][17:19], [0.5, 0])
+        self.assertEqual(heatmap[1][9], 0.5)
+        self.assertEqual(heatmap[2][9], 0.5)
+        self.assertEqual(heatmap[3][9], 0)
+        self.assertEqual(
+            report["peak_hours"][0],
+            {"weekday": 0, "hour": 6, "utilization": 0.5},
+        )
+
+    def test_rooms(self):
+        report = self.report(rooms=str(self.empty_room.id))
+        self.assertEqual(
+            [room["id"] for room in report["rooms"]], [self.empty_room.id]
+        )
+        self.assertEqual(report["peak_hours"], [])
+
+    @override_settings(CACHES=ANALYTICS_CACHES)
+    def test_cached_reports(self):
+        first = self.report()
+        self.workshop.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.report(), first)
+        self.assertNotEqual(self.report(to="2021-09-07"), first)
+
+    def test_invalid_parameters(self):
+        for params in (
+            {"from": "2021-09-06"},
+            {"from": "2021-09-08", "to": "2021-09-06"},
+            {"from": "2021-01-01", "to": "2025-01-01"},
+            {"from": "2021-09-06", "to": "2021-09-07", "rooms": "x"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
@@ -2,7 +2,8 @@ from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, force_authenticate
 from rest_framework import status
-from datetime import datetime
+from datetime import datetime, timedelta
+from django.utils import timezone
 from reservations.models import MeetingRoom, Reservation, Invitation
 
 User = get_user_model()
@@ -33,13 +34,41 @@ class TestRooms(APITestCase):
             room=room,
             creator=self.user,
         )
-        room_url = f'{self.rooms_url}{room.id}/'
+        room_url = f'{self.rooms_url}{room.id}/?from=2031-02-27T00:00:00Z'
                 
         self.client.force_authenticate(user=self.user)
         response = self.client.get(room_url)
         
         self.assertEqual(len(response.data["reservations"]), 1)
 
+    def test_rooms_nest_the_next_days_by_default(self):
+        room = MeetingRoom.objects.create(title="Guest room")
+        now = timezone.now()
+        for title, days in (("Past", -1), ("Soon", 1), ("Later", 40)):
+            Reservation.objects.create(
+                title=title,
+                from_date=now + timedelta(days=days),
+                to_date=now + timedelta(days=days, hours=1),
+                room=room,
+                creator=self.user,
+            )
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(f'{self.rooms_url}{room.id}/')
+        self.assertEqual(
+            [item["title"] for item in response.data["reservations"]],
+            ["Soon"],
+        )
+        with self.settings(RESERVATIONS_ROOM_WINDOW_DAYS=60):
+            response = self.client.get(self.rooms_url)
+        self.assertEqual(
+            [
+                item["title"]
+                for item in response.data["results"][0]["reservations"]
+            ],
+            ["Soon", "Later"],
+        )
+
     def test_rooms_list_endpoint_can_be_filtered_by_user_id(self):
         room = MeetingRoom.objects.create(title="Cake room")
         reservation = Reservation.objects.create(
@@ -58,10 +87,14 @@ class TestRooms(APITestCase):
             reservation=reservation, invitee=zigmas
         )
 
-        room_url_with_parameter = f'{self.rooms_url}?user_id={petras.id}'
+        room_url_with_parameter = (
+            f'{self.rooms_url}?user_id={petras.id}&from=2041-02-27T00:00:00Z'
+        )
         self.client.force_authenticate(user=self.user)
         response = self.client.get(room_url_with_parameter)
-        self.assertEqual(len(response.data[0]["reservations"]), 1)
+        self.assertEqual(
+            len(response.data["results"][0]["reservations"]), 1
+        )
 
 
 class ReservationTests(APITestCase):
@@ -165,9 +198,9 @@ class ReservationTests(APITestCase):
         )
         response3 = self.client.get(filtering_url_user_1)
         self.assertEqual(response3.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response3.data), 2)
-        self.assertEqual(response3.data[0]["title"], "Go meetup 1")
-        self.assertEqual(response3.data[1]["title"], "Go meetup 2")
+        self.assertEqual(len(response3.data["results"]), 2)
+        self.assertEqual(response3.data["results"][0]["title"], "Go meetup 2")
+        self.assertEqual(response3.data["results"][1]["title"], "Go meetup 1")
 
         # test if invitee can see only one event after filtering
         filtering_url_user_2 = (
@@ -175,8 +208,8 @@ class ReservationTests(APITestCase):
         )
         response4 = self.client.get(filtering_url_user_2)
         self.assertEqual(response4.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response4.data), 1)
-        self.assertEqual(response4.data[0]["title"], "Go meetup 1")
+        self.assertEqual(len(response4.data["results"]), 1)
+        self.assertEqual(response4.data["results"][0]["title"], "Go meetup 1")
 
     def test_auth_user_can_update_the_reservation(self):
         reservation = Reservation.objects.create(
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from reservations.async_views import room_groups
+from reservations.cache import get_cache
+from reservations.models import MeetingRoom, Reservation, Invitation
+
+User = get_user_model()
+
+
+class AsyncReadTests(TransactionTestCase):
+    """
+    The async endpoints answer like the sync ones. Their queries run in
+    other threads, which only see committed data
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create(username="jim", password="123456")
+        self.guest = User.objects.create(username="tom", password="123456")
+        token = Token.objects.create(user=self.user)
+        self.headers = {"authorization": f"Token {token.key}"}
+        self.rooms = [
+            MeetingRoom.objects.create(title=f"Room {number}")
+            for number in range(5)
+        ]
+        start = datetime(2021, 9, 6, 9, tzinfo=timezone.utc)
+        for number in range(12):
+            reservation = Reservation.objects.create(
+                title=f"Meeting {number}",
+                from_date=start + timedelta(hours=number % 4),
+                to_date=start + timedelta(hours=number % 4, minutes=45),
+                room=self.rooms[number // 4],
+                creator=self.user,
+            )
+            if number % 2:
+                Invitation.objects.create(
+                    reservation=reservation, invitee=self.guest
+                )
+        self.reservation = reservation
+        self.client = AsyncClient()
+        self.sync_client = APIClient()
+        self.sync_client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    async def get(self, url, params=None, **headers):
+        # AsyncClient of Django 3.1 takes headers by their names and drops
+        # query parameters given as data
+        if params:
+            url = f"{url}?{urlencode(params)}"
+        return await self.client.get(url, **self.headers, **headers)
+
+    async def assertSameResponse(self, name, sync_name, params, args=()):
+        response = await self.get(reverse(name, args=args), params)
+        expected = await sync_to_async(self.sync_client.get)(
+            reverse(sync_name, args=args), params
+        )
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(
+            response.content,
+            expected.content.replace(
+                b"/api/reservations/", b"/api/async/reservations/"
+            ),
+        )
+        return response
+
+    async def test_list(self):
+        for params in (
+            {},
+            {"page_size": 5},
+            {"user_id": self.guest.id},
+            {"from": "2021-09-06T10:00:00Z", "to": "2021-09-06T11:00:00Z"},
+            {"from": "never"},
+        ):
+            with self.subTest(params=params):
+                await self.assertSameResponse(
+                    "async-reservations-list", "reservations-list", params
+                )
+
+    async def test_list_pages(self):
+        response = await self.get(
+            reverse("async-reservations-list"), {"page_size": 5}
+        )
+        next_page = response.json()["next"]
+        self.assertIn("/api/async/reservations/", next_page)
+        response = await self.get(next_page)
+        self.assertEqual(len(response.json()["results"]), 5)
+
+    async def test_cached_user_list(self):
+        url = reverse("async-reservations-list")
+        params = {"user_id": self.user.id}
+        response = await self.get(url, params)
+        self.assertEqual(response["X-Cache"], "MISS")
+        response = await self.get(url, params)
+        self.assertEqual(response["X-Cache"], "HIT")
+        response = await self.get(
+            url, params, **{"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    async def test_detail(self):
+        for pk in (self.reservation.id, 0, "x"):
+            with self.subTest(pk=pk):
+                await self.assertSameResponse(
+                    "async-reservations-detail",
+                    "reservations-detail",
+                    {},
+                    args=[pk],
+                )
+
+    @override_settings(
+        RESERVATIONS_ASYNC_FANOUT=2, RESERVATIONS_ASYNC_FANOUT_MIN_ROOMS=1
+    )
+    async def test_availability(self):
+        for params in (
+            {"from": "2021-09-06T08:00:00Z", "to": "2021-09-06T18:00:00Z"},
+            {
+                "from": "2021-09-06T08:00:00Z",
+                "to": "2021-09-06T18:00:00Z",
+                "duration": 120,
+                "rooms": f"{self.rooms[4].id},{self.rooms[0].id}",
+            },
+            {"from": "2021-09-06T18:00:00Z", "to": "2021-09-06T08:00:00Z"},
+            {"from": "2021-09-06T08:00:00Z"},
+            {
+                "from": "2021-09-06T08:00:00Z",
+                "to": "2021-09-06T18:00:00Z",
+                "duration": 10000000000000,
+            },
+        ):
+            with self.subTest(params=params):
+                await self.assertSameResponse(
+                    "async-rooms-availability", "rooms-availability", params
+                )
+
+    async def test_authentication(self):
+        url = reverse("async-reservations-list")
+        response = await self.client.get(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], "Token")
+        response = await self.client.get(url, authorization="Token invalid")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_only_reads(self):
+        response = await self.client.post(
+            reverse("async-reservations-list"), {}, **self.headers
+        )
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response["Allow"], "GET")
+
+    def test_room_groups(self):
+        self.assertEqual(
+            room_groups([5, 1, 4, 2, 3], 2), [[1, 2, 3], [4, 5]]
+        )
+        self.assertEqual(room_groups([1, 2], 4), [[1], [2]])
+        self.assertEqual(room_groups([3, 1, 2], 4, min_size=3), [[1, 2, 3]])
+        self.assertEqual(room_groups([], 4), [])
+        self.assertEqual(
+            room_groups(None, 10, min_size=2),
+            [[room.id for room in self.rooms[:2]]]
+            + [[room.id for room in self.rooms[2:4]]]
+            + [[self.rooms[4].id]],
+        )
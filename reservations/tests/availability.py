@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from reservations.intervals import free_slots
+from reservations.models import MeetingRoom, Reservation
+
+User = get_user_model()
+
+
+def at(hour, minute=0):
+    return datetime(2021, 9, 6, hour, minute, tzinfo=timezone.utc)
+
+
+class FreeSlotsTests(SimpleTestCase):
+    def test_gaps_between_busy_intervals(self):
+        busy = [(at(10), at(11)), (at(12), at(13))]
+        self.assertEqual(
+            list(free_slots(busy, at(9), at(17))),
+            [(at(9), at(10)), (at(11), at(12)), (at(13), at(17))],
+        )
+
+    def test_overlapping_and_outside_busy_intervals_are_merged(self):
+        busy = [(at(8), at(10)), (at(9), at(11)), (at(10), at(12))]
+        self.assertEqual(
+            list(free_slots(busy, at(9), at(17))), [(at(12), at(17))]
+        )
+
+    def test_short_gaps_are_skipped(self):
+        busy = [(at(10), at(11)), (at(11, 15), at(13))]
+        self.assertEqual(
+            list(free_slots(busy, at(10), at(14), timedelta(minutes=30))),
+            [(at(13), at(14))],
+        )
+
+    def test_fully_booked_window_has_no_slots(self):
+        busy = [(at(8), at(18))]
+        self.assertEqual(list(free_slots(busy, at(9), at(17))), [])
+
+
+class AvailabilityTests(APITestCase):
+    def setUp(self):
+        self.availability_url = reverse("rooms-availability")
+        self.user = User.objects.create(username="jim", password="123456")
+        self.busy_room = MeetingRoom.objects.create(title="Busy room")
+        self.free_room = MeetingRoom.objects.create(title="Free room")
+        self.booked_room = MeetingRoom.objects.create(title="Booked room")
+        for start, end in [(9, 12), (12, 13), (14, 17)]:
+            Reservation.objects.create(
+                title="Meeting",
+                from_date=at(start),
+                to_date=at(end),
+                room=self.busy_room,
+                creator=self.user,
+            )
+        Reservation.objects.create(
+            title="Workshop",
+            from_date=at(8),
+            to_date=at(18),
+            room=self.booked_room,
+            creator=self.user,
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def get(self, **params):
+        params.setdefault("from", "2021-09-06T09:00:00Z")
+        params.setdefault("to", "2021-09-06T17:00:00Z")
+        return self.client.get(self.availability_url, params)
+
+    def test_lists_free_slots_of_available_rooms(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "room": self.busy_room.id,
+                    "title": "Busy room",
+                    "free": [
+                        {
+                            "from_date": "2021-09-06T13:00:00Z",
+                            "to_date": "2021-09-06T14:00:00Z",
+                        }
+                    ],
+                },
+                {
+                    "room": self.free_room.id,
+                    "title": "Free room",
+                    "free": [
+                        {
+                            "from_date": "2021-09-06T09:00:00Z",
+                            "to_date": "2021-09-06T17:00:00Z",
+                        }
+                    ],
+                },
+            ],
+        )
+
+    def test_slots_shorter_than_duration_are_skipped(self):
+        response = self.get(duration=90)
+        self.assertEqual(
+            [room["room"] for room in response.data["results"]],
+            [self.free_room.id],
+        )
+
+    def test_search_can_be_limited_to_rooms(self):
+        response = self.get(rooms=f"{self.busy_room.id},{self.booked_room.id}")
+        self.assertEqual(
+            [room["room"] for room in response.data["results"]],
+            [self.busy_room.id],
+        )
+
+    def test_search_takes_three_queries(self):
+        # single reservations, recurring reservations and rooms
+        with self.assertNumQueries(3):
+            self.get()
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in [
+            {"from": "tomorrow"},
+            {"to": "2021-09-06T08:00:00Z"},
+            {"duration": 0},
+            {"duration": 10000000000000},
+            {"rooms": "1,two"},
+        ]:
+            response = self.get(**params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
@@ -0,0 +1,222 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from reservations.models import MeetingRoom, Reservation, Invitation
+
+User = get_user_model()
+
+
+class BatchTests(APITestCase):
+    def setUp(self):
+        self.batch_url = reverse("reservations-batch")
+        self.room = MeetingRoom.objects.create(title="Pythonista room")
+        self.other_room = MeetingRoom.objects.create(title="Rust room")
+        self.creator = User.objects.create(username="jim", password="123456")
+        self.invitee = User.objects.create(username="tom", password="654321")
+        self.client.force_authenticate(user=self.creator)
+
+    def item(self, start, end, room=None, **extra):
+        return dict(
+            {
+                "title": "Sync",
+                "from_date": f"2021-05-10T{start}:00Z",
+                "to_date": f"2021-05-10T{end}:00Z",
+                "room": (room or self.room).id,
+                "creator": self.creator.id,
+            },
+            **extra,
+        )
+
+    def test_batch_books_all_valid_reservations(self):
+        items = [
+            self.item("09:00", "10:00", guests=[{"invitee": self.invitee.id}]),
+            self.item("10:00", "11:00"),
+            self.item("09:00", "10:00", room=self.other_room),
+        ]
+        response = self.client.post(self.batch_url, items, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [201, 201, 201]
+        )
+        self.assertEqual(Reservation.objects.count(), 3)
+        first = Reservation.objects.get(id=results[0]["id"])
+        self.assertEqual(first.from_date.hour, 9)
+        self.assertEqual(
+            list(first.guests.values_list("invitee", flat=True)),
+            [self.invitee.id],
+        )
+
+    def test_batch_rejects_items_overlapping_existing_reservations(self):
+        Reservation.objects.create(
+            title="Existing",
+            from_date="2021-05-10T09:30:00Z",
+            to_date="2021-05-10T10:30:00Z",
+            room=self.room,
+            creator=self.creator,
+        )
+        items = [
+            self.item("09:00", "09:30"),
+            self.item("10:00", "11:00"),
+            self.item("08:00", "12:00"),
+            self.item("10:30", "11:00"),
+        ]
+        response = self.client.post(self.batch_url, items, format="json")
+
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [201, 400, 400, 201]
+        )
+        self.assertEqual(
+            results[1]["errors"]["non_field_errors"][0],
+            "There is an overlap with another reservation",
+        )
+
+    def test_batch_results_name_the_reservations_booked(self):
+        # an empty reservation overlaps nothing, but starts with the item
+        empty = Reservation.objects.create(
+            title="Empty",
+            from_date="2021-05-10T09:00:00Z",
+            to_date="2021-05-10T09:00:00Z",
+            room=self.room,
+            creator=self.creator,
+        )
+        items = [
+            self.item("09:00", "10:00", guests=[{"invitee": self.invitee.id}])
+        ]
+        response = self.client.post(self.batch_url, items, format="json")
+
+        booked = response.data["results"][0]["id"]
+        self.assertNotEqual(booked, empty.id)
+        self.assertEqual(Reservation.objects.get(id=booked).title, "Sync")
+        self.assertEqual(
+            list(Invitation.objects.values_list("reservation", flat=True)),
+            [booked],
+        )
+
+    def test_batch_items_overlapping_each_other_book_the_earliest(self):
+        items = [
+            self.item("09:30", "10:30"),
+            self.item("09:00", "10:00"),
+            self.item("09:00", "09:45"),
+            self.item("10:00", "11:00"),
+        ]
+        response = self.client.post(self.batch_url, items, format="json")
+
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            [400, 201, 400, 201],
+        )
+
+    def test_batch_reports_invalid_items(self):
+        items = [
+            self.item("10:00", "09:00"),
+            self.item("09:00", "10:00", room=MeetingRoom(id=999)),
+            self.item("09:00", "10:00", guests=[{"invitee": 999}]),
+            {"title": "Missing fields"},
+            self.item("11:00", "12:00"),
+        ]
+        response = self.client.post(self.batch_url, items, format="json")
+
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            [400, 400, 400, 400, 201],
+        )
+        self.assertIn("non_field_errors", results[0]["errors"])
+        self.assertIn("room", results[1]["errors"])
+        self.assertIn("invitee", results[2]["errors"]["guests"][0])
+        self.assertIn("from_date", results[3]["errors"])
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(Invitation.objects.count(), 0)
+
+    def test_batch_lists_attendee_conflicts(self):
+        existing = Reservation.objects.create(
+            title="Existing",
+            from_date="2021-05-10T09:00:00Z",
+            to_date="2021-05-10T10:00:00Z",
+            room=self.other_room,
+            creator=self.invitee,
+        )
+        items = [
+            self.item("09:30", "10:30", guests=[{"invitee": self.invitee.id}]),
+            self.item("10:00", "11:00", room=self.other_room),
+            self.item("11:00", "12:00"),
+        ]
+        response = self.client.post(self.batch_url, items, format="json")
+
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [201, 201, 201]
+        )
+        self.assertEqual(
+            [
+                (conflict["user"], conflict["reservation"])
+                for conflict in results[0]["conflicts"]
+            ],
+            [(self.invitee.id, existing.id)],
+        )
+        # the item of the batch booked before it
+        self.assertEqual(
+            results[1]["conflicts"][0],
+            {
+                "user": self.creator.id,
+                "reservation": results[0]["id"],
+                "title": "Sync",
+                "room": self.room.id,
+                "from_date": "2021-05-10T09:30:00Z",
+                "to_date": "2021-05-10T10:30:00Z",
+            },
+        )
+        self.assertNotIn("conflicts", results[2])
+
+    @override_settings(RESERVATIONS_ATTENDEE_CONFLICTS="error")
+    def test_batch_turns_down_items_with_attendee_conflicts(self):
+        Reservation.objects.create(
+            title="Existing",
+            from_date="2021-05-10T09:00:00Z",
+            to_date="2021-05-10T10:00:00Z",
+            room=self.other_room,
+            creator=self.invitee,
+        )
+        declined = [
+            {"invitee": self.invitee.id, "status": Invitation.NOT_ATTENDING}
+        ]
+        third_room = MeetingRoom.objects.create(title="Go room")
+        items = [
+            self.item("09:30", "10:30", guests=[{"invitee": self.invitee.id}]),
+            self.item("09:30", "10:30", room=third_room, guests=declined),
+            self.item("10:00", "11:00", room=self.other_room),
+            self.item("11:00", "12:00", room=self.other_room),
+        ]
+        response = self.client.post(self.batch_url, items, format="json")
+
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [400, 201, 400, 201]
+        )
+        self.assertEqual(
+            results[0]["errors"]["non_field_errors"],
+            ["tom has another meeting at the same time: Existing"],
+        )
+        self.assertEqual(
+            results[2]["errors"]["non_field_errors"],
+            ["jim has another meeting at the same time: Sync"],
+        )
+        self.assertEqual(Reservation.objects.count(), 3)
+
+    def test_batch_must_be_a_list(self):
+        response = self.client.post(
+            self.batch_url, self.item("09:00", "10:00"), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RESERVATIONS_BATCH_MAX_SIZE=2)
+    def test_batch_size_is_limited(self):
+        items = [self.item("09:00", "10:00")] * 3
+        response = self.client.post(self.batch_url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Reservation.objects.count(), 0)
@@ -0,0 +1,82 @@
+import io
+import logging
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+from reservations.benchmarks import BENCHMARKS, BenchmarkOutput
+
+# the smallest sizes of every benchmark, which run them through all of their
+# cases within seconds
+SMOKE_SIZES = {
+    "overlap_validation": {"sizes": (10,)},
+    "concurrent_booking": {"workers": (1, 2), "requests": 4, "rooms": 2},
+    "list_response_size": {"rooms": 2, "reservations_per_room": 3},
+    "invitation_writes": {"sizes": (2,)},
+    "batch_booking": {"sizes": (4,), "rooms": 2},
+    "room_availability": {"rooms": (2,), "days": 2},
+    "recurring_reservations": {"series_counts": (2,), "weeks": 4},
+    "user_reservations_cache": {"reservations": (4,), "guests": 2},
+    "instrumentation_overhead": {"rates": (0, 1.0), "reservations": 4},
+    "api_endpoints": {"scale": 0.01, "rounds": 2},
+    "calendar_feeds": {"sizes": (4,), "guests": 2},
+    "reservations_export": {"reservations": 4, "guests": 2},
+    "read_serialization": {"reservations": 4, "guests": 2},
+    "json_encoding": {"sizes": (4,), "guests": 2},
+    "async_reads": {
+        "scale": 0.01,
+        "clients": (2,),
+        "latencies": (0,),
+        "requests": 4,
+        "threads": 2,
+    },
+    "room_events": {"displays": (2,), "reservations": 4},
+    "incremental_sync": {"sizes": (4,), "changes": (0, 2), "guests": 2},
+    "database_connections": {
+        "requests": 4,
+        "threads": 2,
+        "connect_latency": 0,
+        "pool_size": 2,
+    },
+    "token_authentication": {"reservations": 2},
+    "token_verification": {"threads": (1, 2), "requests": 4, "users": 2},
+    "room_schedules": {"rooms": 2, "days": 2, "per_day": 2},
+    "utilization_analytics": {"rooms": (2,), "days": 2, "per_day": 2},
+    "attendee_conflicts": {"guests": (2,), "history": 4},
+}
+
+# benchmarks querying from several threads
+THREADED = {
+    "concurrent_booking",
+    "async_reads",
+    "database_connections",
+    "token_verification",
+}
+
+
+class BenchmarkSmokeTests(TransactionTestCase):
+    """
+    Every benchmark at a tiny size, so that they keep running as the code
+    they measure changes
+    """
+
+    def setUp(self):
+        # request logging of the benchmarks' errors
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_every_benchmark_has_a_smoke_size(self):
+        self.assertEqual(set(SMOKE_SIZES), set(BENCHMARKS))
+
+    def test_benchmarks_run(self):
+        in_memory = (
+            connection.vendor == "sqlite" and connection.is_in_memory_db()
+        )
+        for name, func in BENCHMARKS.items():
+            # in-memory SQLite databases lock whole tables between threads
+            if in_memory and name in THREADED:
+                continue
+            with self.subTest(benchmark=name):
+                call_command("flush", interactive=False, verbosity=0)
+                output = BenchmarkOutput(io.StringIO())
+                func(output, **SMOKE_SIZES.get(name, {}))
+                self.assertTrue(output.results)
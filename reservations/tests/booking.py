@@ -0,0 +1,201 @@
+import threading
+from importlib import import_module
+from unittest import SkipTest
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from reservations.models import MeetingRoom, Reservation
+
+User = get_user_model()
+
+constraint_migration = import_module(
+    "reservations.migrations.0003_reservation_no_overlap_constraint"
+)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    requests = 200
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise SkipTest(
+                "in-memory SQLite databases lock whole tables between threads"
+            )
+        super().setUpClass()
+
+    def setUp(self):
+        self.reservations_url = reverse("reservations-list")
+        self.rooms = [
+            MeetingRoom.objects.create(title=f"Room {number}")
+            for number in range(4)
+        ]
+        self.user = User.objects.create(username="jim", password="123456")
+
+    def book_concurrently(self, payloads):
+        barrier = threading.Barrier(len(payloads))
+        status_codes = []
+
+        def book(data):
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            try:
+                barrier.wait()
+                response = client.post(
+                    self.reservations_url, data, format="json"
+                )
+                status_codes.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=book, args=(data,)) for data in payloads
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return status_codes
+
+    def move_concurrently(self, moves):
+        barrier = threading.Barrier(len(moves))
+        status_codes = []
+
+        def move(reservation, room):
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            try:
+                barrier.wait()
+                response = client.patch(
+                    reverse("reservations-detail", args=[reservation.id]),
+                    {"room": room.id},
+                    format="json",
+                )
+                status_codes.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=move, args=args) for args in moves]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return status_codes
+
+    def assert_no_double_bookings(self):
+        for room in self.rooms:
+            reservations = list(
+                room.reservations.order_by("from_date").values_list(
+                    "from_date", "to_date"
+                )
+            )
+            for (_, end), (next_start, _) in zip(
+                reservations, reservations[1:]
+            ):
+                self.assertLessEqual(end, next_start)
+
+    def test_concurrent_requests_for_the_same_slot_book_it_once(self):
+        data = {
+            "title": "Stand-up",
+            "from_date": "2021-04-01T09:00:00Z",
+            "to_date": "2021-04-01T09:15:00Z",
+            "room": self.rooms[0].id,
+            "creator": self.user.id,
+        }
+        status_codes = self.book_concurrently([data] * self.requests)
+
+        self.assertEqual(status_codes.count(status.HTTP_201_CREATED), 1)
+        self.assertEqual(
+            status_codes.count(status.HTTP_400_BAD_REQUEST),
+            self.requests - 1,
+        )
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_concurrent_overlapping_requests_never_double_book(self):
+        start = datetime(2021, 4, 1, 9, tzinfo=timezone.utc)
+        payloads = []
+        for number in range(self.requests):
+            from_date = start + timedelta(minutes=10 * (number // 4))
+            payloads.append(
+                {
+                    "title": f"Meeting {number}",
+                    "from_date": from_date.isoformat(),
+                    "to_date": (from_date + timedelta(minutes=30)).isoformat(),
+                    "room": self.rooms[number % 4].id,
+                    "creator": self.user.id,
+                }
+            )
+        status_codes = self.book_concurrently(payloads)
+
+        self.assertEqual(
+            status_codes.count(status.HTTP_201_CREATED),
+            Reservation.objects.count(),
+        )
+        self.assertEqual(len(status_codes), self.requests)
+        self.assert_no_double_bookings()
+
+    def test_reservations_moved_between_rooms_in_both_directions(self):
+        start = datetime(2021, 4, 1, 9, tzinfo=timezone.utc)
+        moves = []
+        for number in range(20):
+            from_date = start + timedelta(hours=number)
+            source, target = self.rooms[number % 2], self.rooms[1 - number % 2]
+            reservation = Reservation.objects.create(
+                title=f"Meeting {number}",
+                from_date=from_date,
+                to_date=from_date + timedelta(minutes=30),
+                room=source,
+                creator=self.user,
+            )
+            moves.append((reservation, target))
+        status_codes = self.move_concurrently(moves)
+
+        self.assertEqual(status_codes, [status.HTTP_200_OK] * len(moves))
+        for reservation, target in moves:
+            reservation.refresh_from_db()
+            self.assertEqual(reservation.room_id, target.id)
+
+
+class OverlapReportTests(TestCase):
+    """The reservations the exclusion constraint's migration would reject"""
+
+    def test_overlapping_reservations_are_found(self):
+        if connection.vendor == "postgresql":
+            # only for the transaction of the test
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "ALTER TABLE reservations_reservation DROP CONSTRAINT "
+                    f"{constraint_migration.CONSTRAINT}"
+                )
+        user = User.objects.create(username="jim", password="123456")
+        room, other_room = (
+            MeetingRoom.objects.create(title=f"Room {number}")
+            for number in range(2)
+        )
+        start = datetime(2021, 4, 1, 9, tzinfo=timezone.utc)
+
+        def book(room, start_hour, end_hour):
+            return Reservation.objects.create(
+                title="Meeting",
+                from_date=start + timedelta(hours=start_hour),
+                to_date=start + timedelta(hours=end_hour),
+                room=room,
+                creator=user,
+            )
+
+        outer = book(room, 0, 4)
+        inner = book(room, 1, 2)
+        book(room, 4, 5)
+        book(room, 3, 1)
+        book(other_room, 1, 2)
+
+        with connection.cursor() as cursor:
+            self.assertEqual(
+                constraint_migration.find_overlaps(cursor),
+                [(room.id, outer.id, inner.id)],
+            )
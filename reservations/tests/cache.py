@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from meetings.caches import parse_cache_url
+from reservations.cache import cache_stats, get_cache, reset_cache_stats
+from reservations.models import MeetingRoom, Reservation, Invitation
+
+User = get_user_model()
+
+
+class UserReservationsCacheTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        reset_cache_stats()
+        self.user = User.objects.create(username="jim", password="123456")
+        self.guest = User.objects.create(username="tom", password="123456")
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.start = datetime(2021, 9, 1, 9, tzinfo=timezone.utc)
+        self.reservation = Reservation.objects.create(
+            title="Planning",
+            from_date=self.start,
+            to_date=self.start + timedelta(hours=1),
+            room=self.room,
+            creator=self.user,
+        )
+        Invitation.objects.create(
+            reservation=self.reservation, invitee=self.guest
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def get_list(self, user, **headers):
+        return self.client.get(
+            reverse("reservations-list"), {"user_id": user.id}, **headers
+        )
+
+    def test_reservation_created_by_and_invited_to_is_listed_once(self):
+        Invitation.objects.create(
+            reservation=self.reservation, invitee=self.user
+        )
+        response = self.get_list(self.user)
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]],
+            [self.reservation.id],
+        )
+
+    def test_repeated_request_is_served_from_the_cache(self):
+        first = self.get_list(self.guest)
+        with self.assertNumQueries(0):
+            second = self.get_list(self.guest)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(cache_stats()["hits"], 1)
+        self.assertEqual(cache_stats()["misses"], 1)
+
+    def test_current_etag_gets_not_modified(self):
+        etag = self.get_list(self.guest)["ETag"]
+        response = self.get_list(self.guest, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cache_stats()["not_modified"], 1)
+
+        self.reservation.title = "Retro"
+        self.reservation.save()
+        response = self.get_list(self.guest, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["title"], "Retro")
+
+    def test_invitations_invalidate_every_related_user(self):
+        other_guest = User.objects.create(username="ann", password="123456")
+        self.get_list(self.user)
+        self.get_list(self.guest)
+        self.get_list(other_guest)
+
+        Invitation.objects.create(
+            reservation=self.reservation, invitee=other_guest
+        )
+        for user in (self.user, self.guest, other_guest):
+            response = self.get_list(user)
+            self.assertEqual(response["X-Cache"], "MISS")
+            self.assertEqual(
+                len(response.data["results"][0]["guests"]), 2, user
+            )
+
+    def test_previous_creator_is_invalidated(self):
+        new_creator = User.objects.create(username="ann", password="123456")
+        self.get_list(self.user)
+        self.reservation.creator = new_creator
+        self.reservation.save()
+        self.assertEqual(self.get_list(self.user).data["results"], [])
+
+    def test_deleting_a_room_invalidates_its_reservations_users(self):
+        self.get_list(self.guest)
+        response = self.client.delete(
+            reverse("rooms-detail", args=[self.room.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.get_list(self.guest).data["results"], [])
+
+    def test_guests_updated_through_the_api_are_invalidated(self):
+        self.get_list(self.guest)
+        response = self.client.patch(
+            reverse("reservations-detail", args=[self.reservation.id]),
+            {"guests": [{"invitee": self.guest.id, "status": "attending"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = self.get_list(self.guest).data["results"]
+        self.assertEqual(results[0]["guests"][0]["status"], "attending")
+
+
+class CacheUrlTests(TestCase):
+    def test_cache_urls_select_backends(self):
+        self.assertEqual(
+            parse_cache_url("locmem://reservations"),
+            {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "reservations",
+            },
+        )
+        self.assertEqual(
+            parse_cache_url("file:///var/tmp/reservations")["LOCATION"],
+            "/var/tmp/reservations",
+        )
+        self.assertEqual(
+            parse_cache_url("redis://localhost:6379/1"),
+            {
+                "BACKEND": "django_redis.cache.RedisCache",
+                "LOCATION": "redis://localhost:6379/1",
+            },
+        )
+        with self.assertRaises(ValueError):
+            parse_cache_url("nope://")
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from reservations.conflicts import find_conflicts
+from reservations.models import Invitation, MeetingRoom, Reservation
+from reservations.recurrence import WEEKLY, Series
+
+User = get_user_model()
+
+
+def at(day, hour, minute=0):
+    return datetime(2021, 9, day, hour, minute, tzinfo=timezone.utc)
+
+
+def single(start, end):
+    return Series(start, end, "", 1, None, None, [])
+
+
+class AttendeeConflictTests(APITestCase):
+    def setUp(self):
+        self.url = reverse("reservations-list")
+        self.jim = User.objects.create(username="jim", password="123456")
+        self.ann = User.objects.create(username="ann", password="123456")
+        self.bob = User.objects.create(username="bob", password="123456")
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.client.force_authenticate(user=self.jim)
+
+    def book(self, start, end, creator, guests=(), **fields):
+        # in a room of its own, which overlapping meetings couldn't share
+        reservation = Reservation.objects.create(
+            title="Standup",
+            from_date=start,
+            to_date=end,
+            room=MeetingRoom.objects.create(title="Small room"),
+            creator=creator,
+            **fields,
+        )
+        for guest, status_ in guests:
+            Invitation.objects.create(
+                reservation=reservation, invitee=guest, status=status_
+            )
+        return reservation
+
+    def post(self, start, end, guests=()):
+        return self.client.post(
+            self.url,
+            {
+                "title": "Planning",
+                "from_date": start.isoformat(),
+                "to_date": end.isoformat(),
+                "room": self.room.id,
+                "creator": self.jim.id,
+                "guests": [{"invitee": guest.id} for guest in guests],
+            },
+            format="json",
+        )
+
+    def test_finds_meetings_created_and_attended(self):
+        created = self.book(at(6, 9), at(6, 10), self.jim)
+        invited = self.book(
+            at(6, 10), at(6, 11), self.bob, [(self.ann, Invitation.MAYBE)]
+        )
+        # declined, back to back and other people's meetings don't clash
+        self.book(
+            at(6, 9), at(6, 10), self.bob,
+            [(self.ann, Invitation.NOT_ATTENDING)],
+        )
+        self.book(at(6, 11), at(6, 12), self.jim)
+        self.book(at(6, 9), at(6, 11), self.bob)
+
+        with self.assertNumQueries(1):
+            conflicts = find_conflicts(
+                [self.jim.id, self.ann.id], single(at(6, 9, 30), at(6, 11))
+            )
+        self.assertEqual(
+            [
+                (conflict["user"], conflict["reservation"])
+                for conflict in conflicts
+            ],
+            sorted([(self.jim.id, created.id), (self.ann.id, invited.id)]),
+        )
+        self.assertEqual(
+            find_conflicts(
+                [self.jim.id], single(at(6, 9), at(6, 10)), exclude=created.id
+            ),
+            [],
+        )
+
+    def test_compares_recurring_meetings(self):
+        weekly = self.book(
+            at(6, 9), at(6, 10), self.bob,
+            [(self.ann, Invitation.ATTENDING)],
+            recurrence=WEEKLY,
+        )
+        conflicts = find_conflicts(
+            [self.ann.id], single(at(20, 9), at(20, 11))
+        )
+        self.assertEqual(conflicts[0]["reservation"], weekly.id)
+        # the occurrence the meeting clashes with
+        self.assertEqual(
+            (conflicts[0]["from_date"], conflicts[0]["to_date"]),
+            (at(20, 9), at(20, 10)),
+        )
+        self.assertEqual(
+            find_conflicts([self.ann.id], single(at(21, 9), at(21, 11))), []
+        )
+
+        self.book(at(23, 14), at(23, 15), self.jim)
+        series = Series(at(2, 14), at(2, 15), WEEKLY, 1, 4, None, [])
+        self.assertEqual(len(find_conflicts([self.jim.id], series)), 1)
+        self.assertEqual(len(find_conflicts([self.ann.id], series)), 0)
+
+    def test_conflicts_are_listed_in_the_response(self):
+        other = self.book(
+            at(6, 9), at(6, 10), self.bob, [(self.ann, Invitation.ATTENDING)]
+        )
+        response = self.post(at(6, 9), at(6, 10), [self.ann])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            response.data["conflicts"],
+            [
+                {
+                    "user": self.ann.id,
+                    "reservation": other.id,
+                    "title": "Standup",
+                    "room": other.room_id,
+                    "from_date": "2021-09-06T09:00:00Z",
+                    "to_date": "2021-09-06T10:00:00Z",
+                }
+            ],
+        )
+
+        response = self.post(at(7, 9), at(7, 10), [self.ann])
+        self.assertNotIn("conflicts", response.data)
+
+    @override_settings(RESERVATIONS_ATTENDEE_CONFLICTS="error")
+    def test_conflicts_turn_reservations_down(self):
+        self.book(at(6, 9), at(6, 10), self.jim)
+        response = self.post(at(6, 9, 30), at(6, 10, 30))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["non_field_errors"],
+            ["jim has another meeting at the same time: Standup"],
+        )
+
+        reservation = self.book(at(7, 9), at(7, 10), self.jim)
+        response = self.client.patch(
+            reverse("reservations-detail", args=[reservation.id]),
+            {"to_date": (at(7, 10) + timedelta(minutes=30)).isoformat()},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(RESERVATIONS_ATTENDEE_CONFLICTS="off")
+    def test_conflicts_can_be_ignored(self):
+        self.book(at(6, 9), at(6, 10), self.jim)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                find_conflicts([], single(at(6, 9), at(6, 10))), []
+            )
+        response = self.post(at(6, 9), at(6, 10))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("conflicts", response.data)
@@ -0,0 +1,172 @@
+import os
+import tempfile
+import threading
+from django.db import DatabaseError, OperationalError, connection
+from django.test import SimpleTestCase
+from meetings.backends.pool import ConnectionPool, PoolTimeout, close_pools
+from meetings.backends.sqlite3.base import DatabaseWrapper
+from meetings.databases import configure_database
+
+
+class FakeConnection:
+    def __init__(self, fail_rollback=False):
+        self.fail_rollback = fail_rollback
+        self.closed = False
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise RuntimeError("server closed the connection")
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_connections_are_reused_most_recent_first(self):
+        pool = ConnectionPool(2)
+        first, reused = pool.acquire(FakeConnection)
+        self.assertFalse(reused)
+        second, _ = pool.acquire(FakeConnection)
+        pool.release(first)
+        pool.release(second)
+        self.assertEqual(pool.acquire(FakeConnection), (second, True))
+        self.assertEqual(pool.stats["created"], 2)
+        self.assertEqual(pool.stats["reused"], 1)
+        self.assertEqual(pool.checked_out, 1)
+
+    def test_broken_connections_are_discarded(self):
+        pool = ConnectionPool(2)
+        broken, _ = pool.acquire(lambda: FakeConnection(fail_rollback=True))
+        pool.release(broken)
+        self.assertTrue(broken.closed)
+
+        failing, _ = pool.acquire(FakeConnection)
+        pool.release(failing)
+        connection, reused = pool.acquire(
+            FakeConnection, check=lambda connection: connection is not failing
+        )
+        self.assertFalse(reused)
+        self.assertTrue(failing.closed)
+        self.assertEqual(pool.stats["discarded"], 2)
+
+    def test_waits_for_a_connection_to_be_released(self):
+        pool = ConnectionPool(1, timeout=0.01)
+        connection, _ = pool.acquire(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+
+        pool.timeout = 5
+        timer = threading.Timer(0.05, pool.release, [connection])
+        timer.start()
+        self.assertEqual(pool.acquire(FakeConnection), (connection, True))
+        timer.join()
+        self.assertEqual(pool.stats["waits"], 2)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """A pooled SQLite database next to the one of the tests"""
+
+    def setUp(self):
+        self.addCleanup(close_pools)
+        descriptor, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(descriptor)
+        self.addCleanup(os.remove, self.path)
+
+    def get_database(self, **settings):
+        settings_dict = {
+            **connection.settings_dict,
+            "NAME": self.path,
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": True,
+            "POOL_SIZE": 0,
+            **settings,
+        }
+        database = DatabaseWrapper(settings_dict, alias="pooled")
+        self.addCleanup(database.close)
+        return database
+
+    def query(self, database):
+        with database.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            return cursor.fetchone()[0]
+
+    def test_closed_connections_go_back_to_the_pool(self):
+        database = self.get_database(POOL_SIZE=1, POOL_TIMEOUT=0.01)
+        self.query(database)
+        first = database.connection
+        database.close()
+        self.query(database)
+        self.assertIs(database.connection, first)
+        self.assertTrue(database.connection_reused)
+
+        other = self.get_database(POOL_SIZE=1, POOL_TIMEOUT=0.01)
+        with self.assertRaises(OperationalError):
+            self.query(other)
+        database.close()
+        self.query(other)
+        self.assertIs(other.connection, first)
+
+    def test_pooled_connections_are_released_after_every_request(self):
+        settings = {"POOL_SIZE": 2, "POOL_TIMEOUT": 0.01, "CONN_MAX_AGE": 60}
+        database = self.get_database(**settings)
+        pool = database.get_pool(database.get_connection_params())
+        results = []
+
+        def request():
+            # a connection of its own, like every thread gets from Django
+            database = DatabaseWrapper(
+                {**connection.settings_dict, "NAME": self.path, **settings},
+                alias="pooled",
+            )
+            database.close_if_unusable_or_obsolete()
+            try:
+                results.append(self.query(database))
+            finally:
+                database.close_if_unusable_or_obsolete()
+
+        for _ in range(3):
+            thread = threading.Thread(target=request)
+            thread.start()
+            thread.join()
+        self.assertEqual(results, [1, 1, 1])
+        self.assertEqual(pool.checked_out, 0)
+        self.assertEqual(len(pool.idle), 1)
+        self.assertEqual(pool.stats["created"], 1)
+
+    def test_dropped_pooled_connections_are_replaced(self):
+        database = self.get_database(POOL_SIZE=1)
+        self.query(database)
+        dropped = database.connection
+        database.close()
+        dropped.close()
+        self.assertEqual(self.query(database), 1)
+        self.assertIsNot(database.connection, dropped)
+        self.assertFalse(database.connection_reused)
+
+    def test_dropped_persistent_connections_are_replaced(self):
+        database = self.get_database(CONN_MAX_AGE=None)
+        self.query(database)
+        database.connection.close()
+        # as a new request starts
+        database.close_if_unusable_or_obsolete()
+        self.assertEqual(self.query(database), 1)
+
+        database.connection.close()
+        database.close_if_unusable_or_obsolete()
+        database.settings_dict["CONN_HEALTH_CHECKS"] = False
+        with self.assertRaises(DatabaseError):
+            self.query(database)
+
+    def test_configure_database(self):
+        config = configure_database(
+            {"ENGINE": "django.db.backends.postgresql_psycopg2"},
+            conn_max_age=60,
+            pool_size=10,
+        )
+        self.assertEqual(config["ENGINE"], "meetings.backends.postgresql")
+        self.assertEqual(config["CONN_MAX_AGE"], 60)
+        self.assertEqual(config["POOL_SIZE"], 10)
+        self.assertEqual(
+            configure_database({"ENGINE": "other.backend"})["ENGINE"],
+            "other.backend",
+        )
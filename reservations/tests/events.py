@@ -0,0 +1,314 @@
+import asyncio
+import json
+import threading
+from unittest import SkipTest
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from reservations.events import RESET, Change, Hub, encode_change, hub
+from reservations.models import MeetingRoom, Reservation
+from reservations.streams import room_events_application
+
+User = get_user_model()
+
+
+def parse_events(body):
+    """(event, data) of the server-sent events in a body"""
+    events = []
+    for block in body.decode("utf-8").split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.split("\n") if ": " in line
+        )
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class HubTests(SimpleTestCase):
+    async def test_events_are_delivered_from_other_threads(self):
+        hub = Hub()
+        first, second = hub.subscribe(1), hub.subscribe(1)
+        other = hub.subscribe(2)
+        thread = threading.Thread(
+            target=hub.publish, args=(1, "deleted", {"id": 5})
+        )
+        thread.start()
+        thread.join()
+        for subscription in (first, second):
+            message = await asyncio.wait_for(subscription.queue.get(), 1)
+            self.assertEqual(parse_events(message), [("deleted", {"id": 5})])
+        self.assertTrue(other.queue.empty())
+
+    @override_settings(RESERVATIONS_EVENTS_QUEUE_SIZE=2)
+    async def test_subscribers_falling_behind_are_reset(self):
+        hub = Hub()
+        subscription = hub.subscribe(1)
+        for number in range(3):
+            hub.publish(1, "deleted", {"id": number})
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.queue.qsize(), 1)
+        self.assertIs(subscription.queue.get_nowait(), RESET)
+
+    async def test_watched_rooms(self):
+        hub = Hub()
+        self.assertFalse(hub.active())
+        subscription = hub.subscribe(1)
+        self.assertTrue(hub.watched([2, 1]))
+        self.assertFalse(hub.watched([2]))
+        hub.unsubscribe(subscription)
+        self.assertFalse(hub.active())
+        self.assertEqual(hub.subscriber_count(), 0)
+
+    async def test_notified_changes_of_streamed_rooms_are_recorded(self):
+        hub = Hub()
+        recorded = []
+        hub.record = recorded.append
+        created = Change(1, True, frozenset([2]))
+        hub.receive(encode_change(created))
+        self.assertEqual(recorded, [])
+
+        hub.subscribe(2)
+        guests = Change(3, False, frozenset())
+        for change in (created, guests, Change(4, False, frozenset([5]))):
+            hub.receive(encode_change(change))
+        self.assertEqual(recorded, [created, guests])
+
+
+class RoomEventsTests(TransactionTestCase):
+    """
+    Writes are published after they commit, by a thread with its own
+    connection, so the tests commit
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username="jim", password="123456")
+        self.guest = User.objects.create(username="tom", password="123456")
+        self.token = Token.objects.create(user=self.user).key
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.other_room = MeetingRoom.objects.create(title="Game room")
+        self.reservation = Reservation.objects.create(
+            title="Planning",
+            from_date="2021-09-06T09:00:00Z",
+            to_date="2021-09-06T10:00:00Z",
+            room=self.room,
+            creator=self.user,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.application = room_events_application(ASGIHandler())
+
+    async def connect(self, path, query=b"", headers=()):
+        """
+        Open a stream, return the queue of the bodies sent and a function
+        disconnecting
+        """
+        bodies = asyncio.Queue()
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                self.status = message["status"]
+                self.headers = dict(message["headers"])
+            else:
+                await bodies.put(message["body"])
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": query,
+            "headers": [(b"host", b"localhost"), *headers],
+        }
+        task = asyncio.ensure_future(self.application(scope, receive, send))
+
+        async def close():
+            disconnect.set()
+            await asyncio.wait_for(task, 1)
+
+        return bodies, close
+
+    async def next_events(self, bodies):
+        return parse_events(await asyncio.wait_for(bodies.get(), 5))
+
+    async def write(self, method, *args):
+        response = await sync_to_async(getattr(self.client, method))(
+            *args, format="json"
+        )
+        self.assertLess(response.status_code, 300, response.data)
+        return response
+
+    async def test_changes_are_streamed(self):
+        bodies, close = await self.connect(
+            f"/api/rooms/{self.room.id}/events/",
+            b"from=2021-09-06T00:00:00Z&to=2021-09-07T00:00:00Z",
+            [(b"authorization", f"Token {self.token}".encode())],
+        )
+        [(event, room)] = await self.next_events(bodies)
+        self.assertEqual(self.status, 200)
+        self.assertEqual(self.headers[b"content-type"], b"text/event-stream")
+        self.assertEqual(event, "snapshot")
+        self.assertEqual(room["title"], "Board room")
+        self.assertEqual(
+            [reservation["id"] for reservation in room["reservations"]],
+            [self.reservation.id],
+        )
+
+        created = await self.write(
+            "post",
+            reverse("reservations-list"),
+            {
+                "title": "Review",
+                "from_date": "2021-09-06T11:00:00Z",
+                "to_date": "2021-09-06T12:00:00Z",
+                "room": self.room.id,
+                "creator": self.user.id,
+                "guests": [{"invitee": self.guest.id}],
+            },
+        )
+        # the reservation and its invitation are one event
+        [(event, data)] = await self.next_events(bodies)
+        self.assertEqual(event, "created")
+        self.assertEqual(data["id"], created.data["id"])
+        self.assertEqual(data["guests"][0]["invitee"], self.guest.id)
+        self.assertEqual(data["from_date"], "2021-09-06T11:00:00Z")
+
+        detail = reverse("reservations-detail", args=[self.reservation.id])
+        await self.write("patch", detail, {"title": "Sprint planning"})
+        [(event, data)] = await self.next_events(bodies)
+        self.assertEqual(event, "updated")
+        self.assertEqual(data["title"], "Sprint planning")
+
+        await self.write("patch", detail, {"room": self.other_room.id})
+        self.assertEqual(
+            await self.next_events(bodies),
+            [("deleted", {"id": self.reservation.id})],
+        )
+
+        await self.write(
+            "delete",
+            reverse("reservations-detail", args=[created.data["id"]]),
+        )
+        self.assertEqual(
+            await self.next_events(bodies),
+            [("deleted", {"id": created.data["id"]})],
+        )
+        await close()
+        self.assertFalse(hub.active())
+
+    async def get_ticket(self, room_id):
+        response = await sync_to_async(self.client.post)(
+            reverse("rooms-events-ticket", args=[room_id])
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["ticket"]
+
+    async def test_ticket_in_query(self):
+        ticket = await self.get_ticket(self.room.id)
+        self.assertNotIn(self.token, ticket)
+        bodies, close = await self.connect(
+            f"/api/rooms/{self.room.id}/events/",
+            f"ticket={ticket}".encode(),
+        )
+        [(event, room)] = await self.next_events(bodies)
+        self.assertEqual(event, "snapshot")
+        await close()
+
+        # tickets are used once
+        bodies, close = await self.connect(
+            f"/api/rooms/{self.room.id}/events/",
+            f"ticket={ticket}".encode(),
+        )
+        await asyncio.wait_for(bodies.get(), 5)
+        self.assertEqual(self.status, 401)
+        await close()
+
+    @override_settings(RESERVATIONS_EVENTS_TICKET_TIMEOUT=-1)
+    async def test_expired_ticket(self):
+        ticket = await self.get_ticket(self.room.id)
+        bodies, close = await self.connect(
+            f"/api/rooms/{self.room.id}/events/",
+            f"ticket={ticket}".encode(),
+        )
+        await asyncio.wait_for(bodies.get(), 5)
+        self.assertEqual(self.status, 401)
+        await close()
+
+    @override_settings(RESERVATIONS_EVENTS_HEARTBEAT=0.01)
+    async def test_heartbeat(self):
+        bodies, close = await self.connect(
+            f"/api/rooms/{self.room.id}/events/",
+            headers=[(b"authorization", f"Token {self.token}".encode())],
+        )
+        await bodies.get()
+        self.assertEqual(await bodies.get(), b": heartbeat\n\n")
+        await close()
+
+    async def test_errors(self):
+        other_ticket = await self.get_ticket(self.other_room.id)
+        authorization = [(b"authorization", f"Token {self.token}".encode())]
+        for path, query, headers, status in [
+            (f"/api/rooms/{self.room.id}/events/", b"", [], 401),
+            # tokens don't go in URLs
+            (
+                f"/api/rooms/{self.room.id}/events/",
+                f"token={self.token}".encode(),
+                [],
+                401,
+            ),
+            (f"/api/rooms/{self.room.id}/events/", b"ticket=invalid", [], 401),
+            (
+                f"/api/rooms/{self.room.id}/events/",
+                f"ticket={other_ticket}".encode(),
+                [],
+                401,
+            ),
+            (
+                f"/api/rooms/{self.room.id}/events/",
+                b"",
+                [(b"authorization", b"Token invalid")],
+                401,
+            ),
+            ("/api/rooms/0/events/", b"", authorization, 404),
+            (
+                f"/api/rooms/{self.room.id}/events/",
+                b"from=never",
+                authorization,
+                400,
+            ),
+        ]:
+            with self.subTest(path=path, query=query):
+                bodies, close = await self.connect(path, query, headers)
+                body = await asyncio.wait_for(bodies.get(), 5)
+                self.assertEqual(self.status, status)
+                self.assertIsInstance(json.loads(body), dict)
+                await close()
+        self.assertFalse(hub.active())
+
+
+@override_settings(RESERVATIONS_EVENTS_NOTIFY=True)
+class NotifiedRoomEventsTests(RoomEventsTests):
+    """
+    The same streams, with every change going through PostgreSQL's NOTIFY,
+    as it would to the other processes
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor != "postgresql":
+            raise SkipTest("notifications need PostgreSQL")
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        # the listener's connection would keep the test database
+        hub.stop_listener()
+        super().tearDownClass()
@@ -0,0 +1,162 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from reservations.models import MeetingRoom, Reservation, Invitation
+from reservations.recurrence import WEEKLY
+from reservations.serializers import ReservationSerializer
+
+User = get_user_model()
+
+
+class ExportTestCase:
+    def setUp(self):
+        self.user = User.objects.create(username="jim", password="123456")
+        self.guest = User.objects.create(username="tom", password="123456")
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.other_room = MeetingRoom.objects.create(title="Game room")
+        self.start = datetime(2021, 9, 1, 9, tzinfo=timezone.utc)
+        self.reservations = [
+            Reservation.objects.create(
+                title=f"Meeting, {number}",
+                from_date=self.start + timedelta(days=number),
+                to_date=self.start + timedelta(days=number, hours=1),
+                room=room,
+                creator=self.user,
+            )
+            for number, room in enumerate(
+                [self.room, self.other_room, self.room]
+            )
+        ]
+        self.reservations.append(
+            Reservation.objects.create(
+                title="Standup",
+                from_date=self.start - timedelta(days=7),
+                to_date=self.start - timedelta(days=7, minutes=-15),
+                room=self.room,
+                creator=self.user,
+                recurrence=WEEKLY,
+                recurrence_count=2,
+                recurrence_exceptions=["2021-08-25"],
+            )
+        )
+        Invitation.objects.create(
+            reservation=self.reservations[0],
+            invitee=self.guest,
+            status=Invitation.ATTENDING,
+        )
+
+
+class ExportApiTests(ExportTestCase, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse("reservations-export"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b"".join(response.streaming_content)
+
+    def test_json_lines_match_the_api_representation(self):
+        response, content = self.export(output="jsonl")
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        records = [json.loads(line) for line in content.splitlines()]
+        expected = ReservationSerializer(
+            Reservation.objects.order_by("from_date", "id"), many=True
+        ).data
+        for record, reservation in zip(records, expected):
+            for guest in reservation["guests"]:
+                del guest["reservation"]
+            self.assertEqual(record, json.loads(json.dumps(reservation)))
+        self.assertEqual(len(records), 4)
+
+    def test_csv_has_a_header_and_a_row_per_reservation(self):
+        response, content = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.DictReader(io.StringIO(content.decode("utf-8"))))
+        self.assertEqual(
+            [row["title"] for row in rows],
+            ["Standup", "Meeting, 0", "Meeting, 1", "Meeting, 2"],
+        )
+        self.assertEqual(
+            json.loads(rows[1]["guests"]),
+            [{"invitee": self.guest.id, "status": "attending"}],
+        )
+        self.assertEqual(rows[1]["from_date"], "2021-09-01T09:00:00Z")
+
+    def test_export_is_filtered_by_window_and_rooms(self):
+        _, content = self.export(
+            output="jsonl",
+            rooms=str(self.room.id),
+            **{
+                "from": self.start.isoformat(),
+                "to": (self.start + timedelta(days=3)).isoformat(),
+            },
+        )
+        self.assertEqual(
+            [json.loads(line)["id"] for line in content.splitlines()],
+            # the series has an occurrence in the window too
+            [
+                self.reservations[3].id,
+                self.reservations[0].id,
+                self.reservations[2].id,
+            ],
+        )
+
+    def test_gzipped_export(self):
+        response, content = self.export(output="jsonl", gzip="true")
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn("reservations.jsonl.gz", response["Content-Disposition"])
+        self.assertEqual(len(gzip.decompress(content).splitlines()), 4)
+
+    def test_invalid_parameters_are_rejected(self):
+        url = reverse("reservations-export")
+        for params in ({"output": "xml"}, {"rooms": "a,b"}):
+            response = self.client.get(url, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_export_is_read_in_chunks(self):
+        Reservation.objects.bulk_create(
+            Reservation(
+                title="Meeting",
+                from_date=self.start + timedelta(days=10, hours=number),
+                to_date=self.start + timedelta(days=10, hours=number + 1),
+                room=self.room,
+                creator=self.user,
+            )
+            for number in range(2000)
+        )
+        response = self.client.get(reverse("reservations-export"))
+        # the reservations, and the guests of each chunk of 1000 of them
+        with self.assertNumQueries(4):
+            lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 2005)
+
+
+class ExportCommandTests(ExportTestCase, TestCase):
+    def test_command_writes_the_export_to_a_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "reservations.csv.gz")
+            call_command(
+                "export_reservations",
+                rooms=str(self.other_room.id),
+                gzip=True,
+                file=path,
+            )
+            with gzip.open(path, "rt") as exported:
+                rows = list(csv.DictReader(exported))
+        self.assertEqual([row["title"] for row in rows], ["Meeting, 1"])
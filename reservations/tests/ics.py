@@ -0,0 +1,211 @@
+from datetime import date, datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from reservations.cache import get_cache
+from reservations.ics import fold, recurrence_rule
+from reservations.models import MeetingRoom, Reservation, Invitation
+from reservations.recurrence import MONTHLY, WEEKLY, Series
+
+User = get_user_model()
+
+
+def read(response):
+    content = b"".join(response.streaming_content).decode("utf-8")
+    # unfold continuation lines
+    return content.replace("\r\n ", "").split("\r\n")
+
+
+class CalendarFeedTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create(
+            username="jim", password="123456", email="jim@example.com"
+        )
+        self.guest = User.objects.create(
+            username="tom", password="123456", email="tom@example.com"
+        )
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.start = datetime(2021, 9, 1, 9, tzinfo=timezone.utc)
+        self.reservation = Reservation.objects.create(
+            title="Planning, Q4",
+            from_date=self.start,
+            to_date=self.start + timedelta(hours=1),
+            room=self.room,
+            creator=self.user,
+        )
+        Invitation.objects.create(
+            reservation=self.reservation,
+            invitee=self.guest,
+            status=Invitation.ATTENDING,
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def user_feed(self, user, **headers):
+        return self.client.get(
+            reverse("reservations-calendar"), {"user_id": user.id}, **headers
+        )
+
+    def room_feed(self, **headers):
+        return self.client.get(
+            reverse("rooms-calendar", args=[self.room.id]), **headers
+        )
+
+    def test_user_feed_lists_created_and_invited_reservations(self):
+        other_room = MeetingRoom.objects.create(title="Game room")
+        Reservation.objects.create(
+            title="Someone else's",
+            from_date=self.start,
+            to_date=self.start + timedelta(hours=1),
+            room=other_room,
+            creator=self.user,
+        )
+        response = self.user_feed(self.guest)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response["Content-Type"], "text/calendar; charset=utf-8"
+        )
+        lines = read(response)
+        self.assertEqual(lines[0], "BEGIN:VCALENDAR")
+        self.assertEqual(lines[-2:], ["END:VCALENDAR", ""])
+        self.assertEqual(lines.count("BEGIN:VEVENT"), 1)
+        self.assertIn("SUMMARY:Planning\\, Q4", lines)
+        self.assertIn("DTSTART:20210901T090000Z", lines)
+        self.assertIn("LOCATION:Board room", lines)
+        self.assertIn(
+            "ATTENDEE;PARTSTAT=ACCEPTED;CN=tom:mailto:tom@example.com", lines
+        )
+        lines = read(self.user_feed(self.user))
+        self.assertEqual(lines.count("BEGIN:VEVENT"), 2)
+
+    def test_room_feed_lists_recurring_reservations_with_rules(self):
+        Reservation.objects.create(
+            title="Standup",
+            from_date=self.start + timedelta(days=1),
+            to_date=self.start + timedelta(days=1, minutes=15),
+            room=self.room,
+            creator=self.user,
+            recurrence=WEEKLY,
+            recurrence_count=4,
+            recurrence_exceptions=[date(2021, 9, 9)],
+        )
+        lines = read(self.room_feed())
+        self.assertEqual(lines.count("BEGIN:VEVENT"), 2)
+        self.assertIn("RRULE:FREQ=WEEKLY;INTERVAL=1;COUNT=4", lines)
+        self.assertIn("EXDATE:20210909T090000Z", lines)
+
+    def test_feed_is_read_in_chunks_with_their_guests(self):
+        Reservation.objects.bulk_create(
+            Reservation(
+                title=f"Meeting {number}",
+                from_date=self.start + timedelta(hours=number),
+                to_date=self.start + timedelta(hours=number + 1),
+                room=self.room,
+                creator=self.user,
+            )
+            for number in range(1, 2500)
+        )
+        response = self.room_feed()
+        # the reservations, and the guests of each chunk of 1000 of them
+        with self.assertNumQueries(4):
+            lines = read(response)
+        self.assertEqual(lines.count("BEGIN:VEVENT"), 2500)
+
+    def test_unchanged_feed_is_not_modified(self):
+        response = self.room_feed()
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        response = self.room_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        response = self.room_feed(HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.reservation.title = "Retro"
+        self.reservation.save()
+        response = self.room_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("SUMMARY:Retro", read(response))
+
+    def test_feeds_change_with_the_guests(self):
+        user_etag = self.user_feed(self.guest)["ETag"]
+        room_etag = self.room_feed()["ETag"]
+        Invitation.objects.filter(invitee=self.guest).update(
+            status=Invitation.MAYBE
+        )
+        Invitation.objects.get(invitee=self.guest).save()
+        response = self.user_feed(self.guest, HTTP_IF_NONE_MATCH=user_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.room_feed(HTTP_IF_NONE_MATCH=room_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_feeds_change_with_room_and_user_names(self):
+        room_etag = self.room_feed()["ETag"]
+        user_etag = self.user_feed(self.guest)["ETag"]
+        self.room.title = "Game room"
+        self.room.save()
+        response = self.room_feed(HTTP_IF_NONE_MATCH=room_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("X-WR-CALNAME:Game room", read(response))
+        response = self.user_feed(self.guest, HTTP_IF_NONE_MATCH=user_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("LOCATION:Game room", read(response))
+
+        room_etag = self.room_feed()["ETag"]
+        user_etag = self.user_feed(self.guest)["ETag"]
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=["last_login"])
+        response = self.user_feed(self.guest, HTTP_IF_NONE_MATCH=user_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.user.email = "james@example.com"
+        self.user.save()
+        response = self.user_feed(self.guest, HTTP_IF_NONE_MATCH=user_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            "ORGANIZER;CN=jim:mailto:james@example.com", read(response)
+        )
+        response = self.room_feed(HTTP_IF_NONE_MATCH=room_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_moving_a_reservation_changes_the_previous_room_feed(self):
+        etag = self.room_feed()["ETag"]
+        self.reservation.room = MeetingRoom.objects.create(title="Game room")
+        self.reservation.save()
+        response = self.room_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("BEGIN:VEVENT", read(response))
+
+    def test_user_feed_needs_an_existing_user(self):
+        response = self.client.get(reverse("reservations-calendar"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(
+            reverse("reservations-calendar"),
+            {"user_id": 1000},
+            HTTP_ACCEPT="text/calendar",
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ICalendarFormatTests(TestCase):
+    def test_long_lines_are_folded_between_characters(self):
+        line = "SUMMARY:" + "ä" * 80
+        folded = fold(line)
+        self.assertTrue(
+            all(len(part) <= 75 for part in folded.split(b"\r\n"))
+        )
+        self.assertEqual(
+            folded.replace(b"\r\n ", b"").decode(), line + "\r\n"
+        )
+
+    def test_monthly_rule_keeps_to_the_end_of_short_months(self):
+        start = datetime(2021, 1, 31, 15, tzinfo=timezone.utc)
+        series = Series(
+            start, start + timedelta(hours=1), MONTHLY, 1, 3, None, []
+        )
+        self.assertEqual(
+            recurrence_rule(series),
+            "FREQ=MONTHLY;INTERVAL=1;BYMONTHDAY=31,-1;BYSETPOS=1;COUNT=3",
+        )
@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from reservations.intervals import has_overlapping_reservation, room_index
+from reservations.models import MeetingRoom, Reservation
+
+User = get_user_model()
+
+
+def at(hour, minute=0):
+    return datetime(2021, 6, 1, hour, minute, tzinfo=timezone.utc)
+
+
+class OverlapTests(TestCase):
+    def setUp(self):
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.user = User.objects.create(username="jim", password="123456")
+        self.reservation = Reservation.objects.create(
+            title="Planning",
+            from_date=at(10),
+            to_date=at(12),
+            room=self.room,
+            creator=self.user,
+        )
+
+    def test_detects_partial_overlaps(self):
+        self.assertTrue(has_overlapping_reservation(self.room, at(9), at(11)))
+        self.assertTrue(
+            has_overlapping_reservation(self.room, at(11), at(13))
+        )
+
+    def test_detects_existing_meeting_inside_the_new_one(self):
+        self.assertTrue(has_overlapping_reservation(self.room, at(9), at(13)))
+
+    def test_detects_new_meeting_inside_an_existing_one(self):
+        self.assertTrue(
+            has_overlapping_reservation(self.room, at(10, 30), at(11))
+        )
+
+    def test_back_to_back_meetings_do_not_overlap(self):
+        self.assertFalse(has_overlapping_reservation(self.room, at(8), at(10)))
+        self.assertFalse(
+            has_overlapping_reservation(self.room, at(12), at(13))
+        )
+
+    def test_excluded_reservation_is_ignored(self):
+        self.assertFalse(
+            has_overlapping_reservation(
+                self.room, at(9), at(13), exclude=self.reservation.id
+            )
+        )
+
+    def test_other_rooms_are_ignored(self):
+        other_room = MeetingRoom.objects.create(title="Kitchen")
+        self.assertFalse(
+            has_overlapping_reservation(other_room, at(9), at(13))
+        )
+
+
+@override_settings(RESERVATIONS_INTERVAL_INDEX=True)
+class RoomIntervalIndexTests(TransactionTestCase):
+    def setUp(self):
+        room_index.clear()
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.user = User.objects.create(username="jim", password="123456")
+        for hour in (8, 10, 14):
+            Reservation.objects.create(
+                title=f"Meeting at {hour}",
+                from_date=at(hour),
+                to_date=at(hour + 1),
+                room=self.room,
+                creator=self.user,
+            )
+
+    def tearDown(self):
+        room_index.clear()
+
+    def test_index_matches_database_lookups(self):
+        cases = [
+            (at(7), at(8)),
+            (at(7), at(8, 30)),
+            (at(9), at(10)),
+            (at(9, 30), at(10, 30)),
+            (at(10, 15), at(10, 45)),
+            (at(11), at(14)),
+            (at(11), at(14, 1)),
+            (at(7), at(16)),
+            (at(15), at(16)),
+        ]
+        for start, end in cases:
+            with override_settings(RESERVATIONS_INTERVAL_INDEX=False):
+                expected = has_overlapping_reservation(self.room, start, end)
+            self.assertEqual(
+                room_index.overlaps(self.room.id, start, end),
+                expected,
+                f"{start} - {end}",
+            )
+
+    def test_index_follows_reservation_changes(self):
+        self.assertFalse(room_index.overlaps(self.room.id, at(12), at(13)))
+
+        reservation = Reservation.objects.create(
+            title="Lunch",
+            from_date=at(12),
+            to_date=at(13),
+            room=self.room,
+            creator=self.user,
+        )
+        self.assertTrue(room_index.overlaps(self.room.id, at(12), at(13)))
+
+        reservation.from_date = at(16)
+        reservation.to_date = at(17)
+        reservation.save()
+        self.assertFalse(room_index.overlaps(self.room.id, at(12), at(13)))
+        self.assertTrue(room_index.overlaps(self.room.id, at(16), at(17)))
+
+        reservation.delete()
+        self.assertFalse(room_index.overlaps(self.room.id, at(16), at(17)))
+
+    def test_index_skips_the_excluded_reservation(self):
+        reservation = Reservation.objects.get(from_date=at(10))
+        self.assertFalse(
+            room_index.overlaps(
+                self.room.id, at(9, 30), at(10, 30), exclude=reservation.id
+            )
+        )
+
+    def test_index_expands_recurring_reservations(self):
+        standup = Reservation.objects.create(
+            title="Standup",
+            from_date=at(9),
+            to_date=at(9, 30),
+            room=self.room,
+            creator=self.user,
+            recurrence="daily",
+        )
+        next_week = timedelta(weeks=1)
+        self.assertTrue(
+            room_index.overlaps(
+                self.room.id, at(9) + next_week, at(10) + next_week
+            )
+        )
+        self.assertFalse(
+            room_index.overlaps(
+                self.room.id,
+                at(9) + next_week,
+                at(10) + next_week,
+                exclude=standup.id,
+            )
+        )
+
+        standup.delete()
+        self.assertFalse(
+            room_index.overlaps(
+                self.room.id, at(9) + next_week, at(10) + next_week
+            )
+        )
@@ -0,0 +1,113 @@
+import json
+from base64 import b64encode
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from reservations.models import MeetingRoom, Reservation
+from reservations.views import ReservationPagination
+
+User = get_user_model()
+
+
+class PaginationTests(APITestCase):
+    def setUp(self):
+        self.reservations_url = reverse("reservations-list")
+        self.user = User.objects.create(username="jim", password="123456")
+        self.start = datetime(2021, 8, 2, 9, tzinfo=timezone.utc)
+        # three rooms with meetings starting at the same times
+        for room_number in range(3):
+            room = MeetingRoom.objects.create(title=f"Room {room_number}")
+            for hour in range(5):
+                Reservation.objects.create(
+                    title=f"Meeting {room_number}-{hour}",
+                    from_date=self.start + timedelta(hours=hour),
+                    to_date=self.start + timedelta(hours=hour + 1),
+                    room=room,
+                    creator=self.user,
+                )
+        self.client.force_authenticate(user=self.user)
+
+    def collect_pages(self, url, link="next"):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.append([item["id"] for item in response.data["results"]])
+            url = response.data[link]
+        return ids
+
+    def test_pages_follow_start_time_and_id_order(self):
+        pages = self.collect_pages(f"{self.reservations_url}?page_size=4")
+
+        expected = list(
+            Reservation.objects.order_by("from_date", "id").values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 3])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_previous_links_walk_back_over_the_same_pages(self):
+        url = f"{self.reservations_url}?page_size=4"
+        forward = []
+        while url:
+            response = self.client.get(url)
+            forward.append([item["id"] for item in response.data["results"]])
+            last_response, url = response, response.data["next"]
+
+        backward = self.collect_pages(
+            last_response.data["previous"], link="previous"
+        )
+        self.assertEqual(backward, forward[-2::-1])
+
+    def test_page_size_is_capped(self):
+        with patch.object(ReservationPagination, "max_page_size", 10):
+            response = self.client.get(f"{self.reservations_url}?page_size=50")
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(f"{self.reservations_url}?cursor=nope")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_values_of_the_wrong_type_are_rejected(self):
+        for position in (["x", "y"], [None, None], [[1], {"a": 1}]):
+            cursor = b64encode(
+                json.dumps({"r": 0, "p": position}).encode("ascii")
+            ).decode("ascii")
+            response = self.client.get(
+                self.reservations_url, {"cursor": cursor}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_404_NOT_FOUND, position
+            )
+
+    def test_reservations_can_be_limited_to_a_window(self):
+        window_start = (self.start + timedelta(hours=1, minutes=30)).isoformat()
+        window_end = (self.start + timedelta(hours=3)).isoformat()
+        response = self.client.get(
+            self.reservations_url,
+            {"from": window_start, "to": window_end},
+        )
+        titles = {item["title"] for item in response.data["results"]}
+        self.assertEqual(
+            titles,
+            {f"Meeting {room}-{hour}" for room in range(3) for hour in (1, 2)},
+        )
+
+    def test_invalid_window_is_rejected(self):
+        response = self.client.get(self.reservations_url, {"from": "never"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("from", response.data)
+
+    def test_nested_room_reservations_can_be_limited_to_a_window(self):
+        response = self.client.get(
+            reverse("rooms-list"),
+            {"from": (self.start + timedelta(hours=4)).isoformat()},
+        )
+        self.assertEqual(len(response.data["results"]), 3)
+        for room in response.data["results"]:
+            self.assertEqual(len(room["reservations"]), 1)
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from reservations.models import MeetingRoom, Reservation, Invitation
+
+User = get_user_model()
+
+
+class QueryCountTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="jim", password="123456")
+        self.guests = [
+            User.objects.create(username=f"guest{number}", password="123456")
+            for number in range(3)
+        ]
+        self.start = datetime(2021, 7, 1, 9, tzinfo=timezone.utc)
+        # nested reservations are limited to the next days by default
+        self.window = (
+            f"from={self.start.date()}T00:00:00Z"
+            f"&to={self.start.date()}T23:00:00Z"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_data(self, rooms, reservations_per_room):
+        for room_number in range(rooms):
+            room = MeetingRoom.objects.create(title=f"Room {room_number}")
+            for number in range(reservations_per_room):
+                reservation = Reservation.objects.create(
+                    title=f"Meeting {number}",
+                    from_date=self.start + timedelta(hours=number),
+                    to_date=self.start + timedelta(hours=number + 1),
+                    room=room,
+                    creator=self.user,
+                )
+                for guest in self.guests:
+                    Invitation.objects.create(
+                        reservation=reservation, invitee=guest
+                    )
+
+    def assert_constant_queries(self, url, queries):
+        self.create_data(rooms=1, reservations_per_room=1)
+        with self.assertNumQueries(queries):
+            self.client.get(url)
+        self.create_data(rooms=3, reservations_per_room=4)
+        with self.assertNumQueries(queries):
+            self.client.get(url)
+
+    def test_reservations_list_query_count_is_constant(self):
+        self.assert_constant_queries(reverse("reservations-list"), 2)
+
+    def test_filtered_reservations_list_query_count_is_constant(self):
+        url = f"{reverse('reservations-list')}?user_id={self.guests[0].id}"
+        self.assert_constant_queries(url, 2)
+
+    def test_reservation_detail_query_count(self):
+        self.create_data(rooms=1, reservations_per_room=1)
+        reservation = Reservation.objects.get()
+        with self.assertNumQueries(2):
+            self.client.get(
+                reverse("reservations-detail", args=[reservation.id])
+            )
+
+    def test_rooms_list_query_count_is_constant(self):
+        url = f"{reverse('rooms-list')}?{self.window}"
+        self.assert_constant_queries(url, 3)
+
+    def test_filtered_rooms_list_query_count_is_constant(self):
+        url = (
+            f"{reverse('rooms-list')}?user_id={self.guests[0].id}"
+            f"&{self.window}"
+        )
+        self.assert_constant_queries(url, 3)
+
+    def test_room_detail_query_count(self):
+        self.create_data(rooms=1, reservations_per_room=3)
+        room = MeetingRoom.objects.get()
+        with self.assertNumQueries(3):
+            self.client.get(
+                f"{reverse('rooms-detail', args=[room.id])}?{self.window}"
+            )
+
+    def test_users_list_query_count_is_constant(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse("users-list"))
+
+
+@override_settings(RESERVATIONS_FAST_READS=False)
+class SerializerQueryCountTests(QueryCountTests):
+    """The same query counts when reads go through the serializers"""
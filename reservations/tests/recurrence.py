@@ -0,0 +1,249 @@
+from datetime import date, datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from reservations.models import MeetingRoom, Reservation
+from reservations.recurrence import (
+    DAILY,
+    MONTHLY,
+    WEEKLY,
+    Series,
+    occurrences,
+    series_end,
+    series_overlap,
+)
+
+User = get_user_model()
+
+
+def at(day, hour, minute=0, month=6):
+    return datetime(2021, month, day, hour, minute, tzinfo=timezone.utc)
+
+
+def series(
+    start, end, recurrence, interval=1, count=None, until=None, exceptions=()
+):
+    return Series(start, end, recurrence, interval, count, until, exceptions)
+
+
+class OccurrenceTests(TestCase):
+    # 2021-06-07 is a Monday
+    def test_count_limits_the_occurrences(self):
+        standup = series(at(7, 9), at(7, 10), WEEKLY, count=3)
+        self.assertEqual(
+            [start for start, _ in occurrences(standup)],
+            [at(7, 9), at(14, 9), at(21, 9)],
+        )
+        self.assertEqual(series_end(standup), at(21, 10))
+
+    def test_until_limits_the_occurrences(self):
+        standup = series(at(7, 9), at(7, 10), DAILY, 2, until=at(13, 9))
+        self.assertEqual(
+            [start for start, _ in occurrences(standup)],
+            [at(7, 9), at(9, 9), at(11, 9), at(13, 9)],
+        )
+
+    def test_window_is_reached_without_walking_the_series(self):
+        standup = series(at(7, 9), at(7, 10), WEEKLY)
+        later = timedelta(weeks=10000)
+        first = next(occurrences(standup, at(7, 9, 30) + later, None))
+        self.assertEqual(first, (at(7, 9) + later, at(7, 10) + later))
+
+    def test_occurrences_are_limited_to_the_window(self):
+        standup = series(at(7, 9), at(7, 10), DAILY)
+        self.assertEqual(
+            list(occurrences(standup, at(8, 9, 30), at(10, 9))),
+            [(at(8, 9), at(8, 10)), (at(9, 9), at(9, 10))],
+        )
+
+    def test_cancelled_occurrences_are_skipped(self):
+        standup = series(
+            at(7, 9), at(7, 10), DAILY, count=3, exceptions=["2021-06-08"]
+        )
+        self.assertEqual(
+            [start for start, _ in occurrences(standup)],
+            [at(7, 9), at(9, 9)],
+        )
+
+    def test_monthly_occurrences_keep_to_the_end_of_short_months(self):
+        review = series(
+            at(31, 15, month=1), at(31, 16, month=1), MONTHLY, count=3
+        )
+        self.assertEqual(
+            [start for start, _ in occurrences(review)],
+            [at(31, 15, month=1), at(28, 15, month=2), at(31, 15, month=3)],
+        )
+        self.assertEqual(
+            list(occurrences(review, at(1, 0, month=3), None)),
+            [(at(31, 15, month=3), at(31, 16, month=3))],
+        )
+
+
+class SeriesOverlapTests(TestCase):
+    def test_series_at_different_times_do_not_clash(self):
+        standup = series(at(7, 9), at(7, 10), DAILY)
+        retro = series(at(11, 10), at(11, 11), WEEKLY)
+        self.assertFalse(series_overlap(standup, retro))
+        self.assertFalse(series_overlap(retro, standup))
+
+    def test_clash_after_both_series_started_is_found(self):
+        standup = series(at(7, 9), at(7, 10), DAILY, 3)
+        retro = series(at(11, 9, 30), at(11, 10), WEEKLY)
+        self.assertTrue(series_overlap(standup, retro))
+        self.assertTrue(series_overlap(retro, standup))
+
+    def test_alternating_series_do_not_clash(self):
+        first = series(at(7, 9), at(7, 10), WEEKLY, 2)
+        second = series(at(14, 9), at(14, 10), WEEKLY, 2)
+        self.assertFalse(series_overlap(first, second))
+
+    def test_series_ending_before_the_clash_does_not_clash(self):
+        first = series(at(7, 9), at(7, 10), WEEKLY, 2)
+        second = series(at(14, 9), at(14, 10), WEEKLY, 3, count=1)
+        # the second series would meet the first one on 2021-07-05
+        self.assertFalse(series_overlap(first, second))
+        second = series(at(14, 9), at(14, 10), WEEKLY, 3, count=2)
+        self.assertTrue(series_overlap(first, second))
+
+    def test_cancelled_occurrence_does_not_hide_later_clashes(self):
+        first = series(
+            at(7, 9), at(7, 10), WEEKLY, exceptions=[date(2021, 6, 14)]
+        )
+        second = series(at(14, 9), at(14, 10), WEEKLY, 4)
+        self.assertTrue(series_overlap(first, second))
+        second = series(at(14, 9), at(14, 10), WEEKLY, 4, count=1)
+        self.assertFalse(series_overlap(first, second))
+
+
+class RecurringReservationApiTests(APITestCase):
+    def setUp(self):
+        self.reservations_url = reverse("reservations-list")
+        self.user = User.objects.create(username="jim", password="123456")
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.standup = Reservation.objects.create(
+            title="Standup",
+            from_date=at(7, 9),
+            to_date=at(7, 10),
+            room=self.room,
+            creator=self.user,
+            recurrence=WEEKLY,
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def book(self, start, end, **data):
+        return self.client.post(
+            self.reservations_url,
+            {
+                "title": "Meeting",
+                "from_date": start,
+                "to_date": end,
+                "room": self.room.id,
+                "creator": self.user.id,
+                **data,
+            },
+            format="json",
+        )
+
+    def test_single_reservation_clashing_with_a_later_occurrence(self):
+        start = at(7, 9, 30) + timedelta(weeks=100)
+        response = self.book(start, start + timedelta(hours=1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        start = at(8, 9, 30) + timedelta(weeks=100)
+        response = self.book(start, start + timedelta(hours=1))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_cancelled_occurrence_can_be_booked(self):
+        self.standup.recurrence_exceptions = [date(2021, 6, 21)]
+        self.standup.save()
+        response = self.book(at(21, 9), at(21, 10))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_series_clashing_with_a_later_reservation(self):
+        Reservation.objects.create(
+            title="Interview",
+            from_date=at(30, 15),
+            to_date=at(30, 16),
+            room=self.room,
+            creator=self.user,
+        )
+        response = self.book(at(9, 15), at(9, 16), recurrence=WEEKLY)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.book(
+            at(9, 15), at(9, 16), recurrence=WEEKLY, recurrence_count=3
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Reservation.objects.get(id=response.data["id"]).recurrence_end,
+            at(23, 16),
+        )
+
+    def test_series_clashing_with_another_series(self):
+        response = self.book(
+            at(8, 9), at(8, 10), recurrence=DAILY, recurrence_interval=3
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.book(
+            at(8, 9), at(8, 10), recurrence=WEEKLY, recurrence_interval=3
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_meeting_longer_than_its_interval_is_rejected(self):
+        response = self.book(at(8, 9), at(9, 10), recurrence=DAILY)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_series_is_listed_in_windows_of_later_occurrences(self):
+        response = self.client.get(
+            self.reservations_url,
+            {
+                "from": at(10, 0, month=8).isoformat(),
+                "to": at(20, 0, month=8).isoformat(),
+            },
+        )
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]],
+            [self.standup.id],
+        )
+
+    def test_batch_items_clashing_with_occurrences_are_rejected(self):
+        item = {
+            "title": "Meeting",
+            "room": self.room.id,
+            "creator": self.user.id,
+        }
+        response = self.client.post(
+            reverse("reservations-batch"),
+            [
+                {**item, "from_date": at(14, 9), "to_date": at(14, 10)},
+                {**item, "from_date": at(14, 10), "to_date": at(14, 11)},
+            ],
+            format="json",
+        )
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            [status.HTTP_400_BAD_REQUEST, status.HTTP_201_CREATED],
+        )
+
+    def test_free_slots_leave_out_occurrences(self):
+        response = self.client.get(
+            reverse("rooms-availability"),
+            {"from": at(14, 8).isoformat(), "to": at(14, 12).isoformat()},
+        )
+        self.assertEqual(
+            response.data["results"][0]["free"],
+            [
+                {
+                    "from_date": "2021-06-14T08:00:00Z",
+                    "to_date": "2021-06-14T09:00:00Z",
+                },
+                {
+                    "from_date": "2021-06-14T10:00:00Z",
+                    "to_date": "2021-06-14T12:00:00Z",
+                },
+            ],
+        )
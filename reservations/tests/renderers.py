@@ -0,0 +1,131 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock, skipIf
+from uuid import UUID
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from meetings import renderers
+from meetings.renderers import FastJSONParser, FastJSONRenderer
+from reservations.models import MeetingRoom
+
+User = get_user_model()
+
+DATA = {
+    "id": 1,
+    "title": "Café   \"planning\"",
+    "from_date": datetime(2021, 3, 17, 9, 0, tzinfo=timezone.utc),
+    "to_date": datetime(2021, 3, 17, 9, 30, 0, 123456, tzinfo=timezone.utc),
+    "recurrence_until": None,
+    "recurrence_exceptions": [date(2021, 3, 24)],
+    "duration": timedelta(minutes=30),
+    "price": Decimal("1.50"),
+    "uuid": UUID("12345678123456781234567812345678"),
+    "label": gettext_lazy("Meeting room"),
+    "guests": [{"invitee": 2, "status": 1}],
+    3: "integer key",
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """The fast renderer and parser match DRF's JSON ones"""
+
+    def test_same_output(self):
+        self.assertEqual(
+            FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+        )
+
+    def test_same_output_without_orjson(self):
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(
+                FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+            )
+
+    def test_indented(self):
+        media_type = "application/json; indent=4"
+        self.assertEqual(
+            FastJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type),
+        )
+
+    def test_none(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_parse(self):
+        body = b'{"title": "Caf\xc3\xa9", "guests": [{"invitee": 2}]}'
+        self.assertEqual(
+            FastJSONParser().parse(BytesIO(body)),
+            JSONParser().parse(BytesIO(body)),
+        )
+
+    def test_parse_other_encoding(self):
+        body = '{"title": "Café"}'.encode("latin-1")
+        self.assertEqual(
+            FastJSONParser().parse(
+                BytesIO(body), parser_context={"encoding": "latin-1"}
+            ),
+            {"title": "Café"},
+        )
+
+    def test_parse_errors(self):
+        for body in (b'{"title": ', b'{"value": NaN}', b"\xff"):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    FastJSONParser().parse(BytesIO(body))
+
+    @skipIf(renderers.orjson is None, "orjson is not installed")
+    def test_uses_orjson(self):
+        with mock.patch.object(
+            renderers.orjson, "dumps", wraps=renderers.orjson.dumps
+        ) as dumps:
+            FastJSONRenderer().render(DATA)
+        dumps.assert_called_once()
+
+
+class FastJSONAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="jim", password="123456")
+        self.client.force_authenticate(user=self.user)
+
+    def test_round_trip(self):
+        room = MeetingRoom.objects.create(title="Room")
+        response = self.client.post(
+            reverse("reservations-list"),
+            {
+                "title": "Café",
+                "from_date": "2021-03-17T09:00:00Z",
+                "to_date": "2021-03-17T09:30:00.5Z",
+                "room": room.id,
+                "creator": self.user.id,
+                "guests": [],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get(
+            reverse("reservations-detail", args=[response.data["id"]])
+        )
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.json()["title"], "Café")
+        self.assertEqual(
+            response.json()["from_date"], "2021-03-17T09:00:00Z"
+        )
+        self.assertEqual(
+            response.json()["to_date"], "2021-03-17T09:30:00.500000Z"
+        )
+
+    def test_invalid_json(self):
+        response = self.client.post(
+            reverse("reservations-list"),
+            b'{"title": ',
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("JSON parse error", response.json()["detail"])
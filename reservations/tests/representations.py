@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from reservations.cache import get_cache
+from reservations.models import MeetingRoom, Reservation, Invitation
+from reservations.recurrence import WEEKLY
+
+User = get_user_model()
+
+
+class FastReadTests(APITestCase):
+    """The fast read path renders exactly what the serializers render"""
+
+    def setUp(self):
+        self.user = User.objects.create(username="jim", password="123456")
+        self.guests = [
+            User.objects.create(username=f"guest{number}", password="123456")
+            for number in range(3)
+        ]
+        self.rooms = [
+            MeetingRoom.objects.create(title=title)
+            for title in ("Board room", "Game room", "Empty room")
+        ]
+        start = datetime(2021, 9, 1, 9, 0, 0, 123456, tzinfo=timezone.utc)
+        for number in range(12):
+            reservation = Reservation.objects.create(
+                title=f"Meeting {number}",
+                from_date=start + timedelta(hours=number),
+                to_date=start + timedelta(hours=number, minutes=30),
+                room=self.rooms[number % 2],
+                creator=self.user if number % 3 else self.guests[0],
+            )
+            for guest in self.guests[: number % 4]:
+                Invitation.objects.create(
+                    reservation=reservation,
+                    invitee=guest,
+                    status=Invitation.ATTENDING,
+                )
+        Reservation.objects.create(
+            title="Standup",
+            from_date=start - timedelta(days=7),
+            to_date=start - timedelta(days=7, minutes=-15),
+            room=self.rooms[0],
+            creator=self.user,
+            recurrence=WEEKLY,
+            recurrence_until=start + timedelta(days=60),
+            recurrence_exceptions=["2021-09-08"],
+        )
+        self.client.force_authenticate(user=self.user)
+        self.window = {
+            "from": (start + timedelta(hours=3)).isoformat(),
+            "to": (start + timedelta(hours=8)).isoformat(),
+        }
+        self.history = {
+            "from": (start - timedelta(days=7)).isoformat(),
+            "to": (start + timedelta(days=60)).isoformat(),
+        }
+
+    def assertSameContent(self, url, params=None):
+        get_cache().clear()
+        fast = self.client.get(url, params)
+        get_cache().clear()
+        with override_settings(RESERVATIONS_FAST_READS=False):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, slow.status_code)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_reservation_lists(self):
+        url = reverse("reservations-list")
+        self.assertSameContent(url)
+        self.assertSameContent(url, {"page_size": 5})
+        self.assertSameContent(url, self.window)
+        self.assertSameContent(url, {"user_id": self.guests[1].id})
+        cursor = self.client.get(url, {"page_size": 5}).data["next"]
+        self.assertSameContent(cursor)
+
+    def test_single_reservations(self):
+        for reservation in Reservation.objects.all():
+            self.assertSameContent(
+                reverse("reservations-detail", args=[reservation.id])
+            )
+        self.assertSameContent(reverse("reservations-detail", args=[1000]))
+
+    def test_room_lists(self):
+        url = reverse("rooms-list")
+        self.assertSameContent(url)
+        self.assertSameContent(url, self.window)
+        self.assertSameContent(url, self.history)
+        self.assertSameContent(
+            url, {"user_id": self.guests[2].id, **self.history}
+        )
+        self.assertSameContent(url, {"page_size": 1, **self.history})
+
+    def test_single_rooms(self):
+        for room in self.rooms:
+            url = reverse("rooms-detail", args=[room.id])
+            self.assertSameContent(url)
+            self.assertSameContent(url, self.window)
+            self.assertSameContent(url, self.history)
+
+    def test_room_list_takes_three_queries(self):
+        with self.assertNumQueries(3):
+            self.client.get(reverse("rooms-list"), self.window)
@@ -0,0 +1,162 @@
+from datetime import date, datetime
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from reservations.models import MeetingRoom, Reservation, RoomDay
+from reservations.recurrence import WEEKLY
+from reservations.schedule import rebuild_schedules
+
+User = get_user_model()
+
+
+def at(day, hour, minute=0):
+    return datetime(2021, 9, day, hour, minute, tzinfo=timezone.utc)
+
+
+class ScheduleTests(APITestCase):
+    def setUp(self):
+        self.url = reverse("rooms-schedule")
+        self.user = User.objects.create(username="jim", password="123456")
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.other_room = MeetingRoom.objects.create(title="Small room")
+        self.client.force_authenticate(user=self.user)
+
+    def book(self, start, end, room=None, **fields):
+        return Reservation.objects.create(
+            title="Meeting",
+            from_date=start,
+            to_date=end,
+            room=room or self.room,
+            creator=self.user,
+            **fields,
+        )
+
+    def stored(self):
+        return {
+            (day.room_id, day.day.day): [
+                reservation["id"] for reservation in day.reservations
+            ]
+            for day in RoomDay.objects.all()
+        }
+
+    def test_days_follow_reservation_writes(self):
+        late = self.book(at(6, 14), at(6, 15))
+        early = self.book(at(6, 9), at(6, 10))
+        # ends at midnight, so doesn't show on the 9th
+        offsite = self.book(at(7, 9), at(9, 0))
+        self.assertEqual(
+            self.stored(),
+            {
+                (self.room.id, 6): [early.id, late.id],
+                (self.room.id, 7): [offsite.id],
+                (self.room.id, 8): [offsite.id],
+            },
+        )
+        stored = RoomDay.objects.get(room=self.room, day=date(2021, 9, 6))
+        self.assertEqual(
+            stored.reservations[0],
+            {
+                "id": early.id,
+                "title": "Meeting",
+                "from_date": "2021-09-06T09:00:00Z",
+                "to_date": "2021-09-06T10:00:00Z",
+                "creator": self.user.id,
+            },
+        )
+
+        late.room = self.other_room
+        late.from_date, late.to_date = at(10, 14), at(10, 15)
+        late.save()
+        offsite.delete()
+        self.assertEqual(
+            self.stored(),
+            {
+                (self.room.id, 6): [early.id],
+                (self.other_room.id, 10): [late.id],
+            },
+        )
+
+    def test_batch_bookings_and_room_deletes(self):
+        response = self.client.post(
+            reverse("reservations-batch"),
+            [
+                {
+                    "title": "Sync",
+                    "from_date": f"2021-09-{day:02}T09:00:00Z",
+                    "to_date": f"2021-09-{day:02}T10:00:00Z",
+                    "room": self.room.id,
+                    "creator": self.user.id,
+                }
+                for day in (6, 7)
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(self.stored()), {(self.room.id, 6), (self.room.id, 7)}
+        )
+
+        self.client.delete(reverse("rooms-detail", args=[self.room.id]))
+        self.assertEqual(self.stored(), {})
+
+    def test_rebuild(self):
+        self.book(at(6, 9), at(7, 10))
+        self.book(at(6, 11), at(6, 12), room=self.other_room)
+        stored = self.stored()
+        RoomDay.objects.all().delete()
+        rebuild_schedules()
+        self.assertEqual(self.stored(), stored)
+
+    def test_week_grid(self):
+        meeting = self.book(at(7, 9), at(7, 10))
+        standup = self.book(
+            at(1, 8), at(1, 8, 15), recurrence=WEEKLY, recurrence_count=2
+        )
+        self.assertEqual(self.stored(), {(self.room.id, 7): [meeting.id]})
+        # the stored days, then the series
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                self.url, {"from": "2021-09-06", "days": 3}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["from"], date(2021, 9, 6))
+        room, other_room = response.data["results"]
+        self.assertEqual(
+            [
+                (day["day"].day, [item["id"] for item in day["reservations"]])
+                for day in room["days"]
+            ],
+            [(6, []), (7, [meeting.id]), (8, [standup.id])],
+        )
+        self.assertEqual(
+            room["days"][2]["reservations"][0]["from_date"],
+            "2021-09-08T08:00:00Z",
+        )
+        self.assertEqual(other_room["title"], "Small room")
+        self.assertEqual(
+            [day["reservations"] for day in other_room["days"]], [[]] * 3
+        )
+
+        response = self.client.get(
+            self.url, {"from": "2021-09-06", "rooms": self.other_room.id}
+        )
+        self.assertEqual(
+            [room["id"] for room in response.data["results"]],
+            [self.other_room.id],
+        )
+        self.assertEqual(len(response.data["results"][0]["days"]), 7)
+
+    def test_invalid_parameters(self):
+        for params in (
+            {},
+            {"from": "monday"},
+            {"from": "2021-09-06", "days": 0},
+            {"from": "2021-09-06", "rooms": "x"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
@@ -0,0 +1,89 @@
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from reservations.models import MeetingRoom, Reservation, Invitation
+from reservations.seeding import Seeder
+
+User = get_user_model()
+
+
+class SeederTests(TestCase):
+    def seed(self, **options):
+        return Seeder(random_seed=1, batch_size=100, **options).run(
+            rooms=3, reservations_per_room=150, users=20
+        )
+
+    def test_counts_of_the_inserted_rows(self):
+        counts = self.seed()
+        self.assertEqual(counts[User], User.objects.count())
+        self.assertEqual(counts[MeetingRoom], 3)
+        self.assertEqual(counts[Reservation], 450)
+        self.assertEqual(counts[Invitation], Invitation.objects.count())
+        self.assertEqual(
+            list(MeetingRoom.objects.values_list("id", flat=True)),
+            sorted(
+                set(Reservation.objects.values_list("room_id", flat=True))
+            ),
+        )
+
+    def test_reservations_of_a_room_do_not_overlap(self):
+        self.seed()
+        clashes = Reservation.objects.filter(
+            room__reservations__id__lt=F("id"),
+            room__reservations__from_date__lt=F("to_date"),
+            room__reservations__to_date__gt=F("from_date"),
+        )
+        self.assertFalse(clashes.exists())
+        back_to_back = Reservation.objects.filter(
+            room__reservations__id__lt=F("id"),
+            room__reservations__to_date=F("from_date"),
+        )
+        self.assertTrue(back_to_back.exists())
+
+    def test_creator_is_not_a_guest(self):
+        self.seed(guests=10)
+        self.assertFalse(
+            Invitation.objects.filter(
+                invitee_id=F("reservation__creator_id")
+            ).exists()
+        )
+
+    def test_standing_meetings_repeat_every_week(self):
+        self.seed(standing=2)
+        weekly = Reservation.objects.filter(title__startswith="Weekly")
+        self.assertTrue(weekly.exists())
+        for title in set(weekly.values_list("title", flat=True)):
+            meetings = list(
+                weekly.filter(title=title, room=weekly[0].room).order_by(
+                    "from_date"
+                )
+            )
+            for previous, meeting in zip(meetings, meetings[1:]):
+                self.assertEqual(
+                    (meeting.from_date - previous.from_date).days, 7
+                )
+                self.assertEqual(meeting.creator_id, previous.creator_id)
+
+    def test_new_rows_continue_after_the_seeded_ones(self):
+        self.seed()
+        room = MeetingRoom.objects.create(title="Board room")
+        self.assertEqual(
+            room.id, MeetingRoom.objects.order_by("-id")[1].id + 1
+        )
+
+
+class SeedCommandTests(TestCase):
+    def test_command_seeds_the_database(self):
+        out = StringIO()
+        call_command(
+            "seed",
+            rooms=2,
+            reservations_per_room=10,
+            users=5,
+            seed=3,
+            stdout=out,
+        )
+        self.assertEqual(Reservation.objects.count(), 20)
+        self.assertIn("reservations: 20", out.getvalue())
@@ -121,3 +121,94 @@ class ReservationSerializerTests(APITestCase):
         ]
         self.assertEqual(len(updated_invitation_data), 1)
         self.assertEqual(new_invitees[0].username, "zigmas")
+
+    def test_serializer_keeps_invitations_of_remaining_guests(self):
+        room = MeetingRoom.objects.create(title="Games room")
+        john = User.objects.create(username="john", password="123456")
+        peter = User.objects.create(username="peter", password="123456")
+        zigmas = User.objects.create(username="zigmas", password="123456")
+        reservation = Reservation.objects.create(
+            title="Another foosball break",
+            from_date=self.start,
+            to_date=self.end,
+            room=room,
+            creator=john,
+        )
+        kept = Invitation.objects.create(
+            reservation=reservation, invitee=peter, status=Invitation.ATTENDING
+        )
+        Invitation.objects.create(reservation=reservation, invitee=zigmas)
+
+        new_invitation_data = [{"invitee": john}, {"invitee": peter}]
+        serializer = ReservationSerializer(instance=reservation)
+        serializer.update_invitation_data(new_invitation_data)
+
+        invitations = {
+            invitation.invitee.username: invitation
+            for invitation in reservation.guests.all()
+        }
+        self.assertEqual(set(invitations), {"john", "peter"})
+        self.assertEqual(invitations["peter"].id, kept.id)
+        self.assertEqual(invitations["peter"].status, Invitation.ATTENDING)
+
+    def test_serializer_updates_the_status_of_invitations(self):
+        room = MeetingRoom.objects.create(title="Games room")
+        john = User.objects.create(username="john", password="123456")
+        peter = User.objects.create(username="peter", password="123456")
+        reservation = Reservation.objects.create(
+            title="Another foosball break",
+            from_date=self.start,
+            to_date=self.end,
+            room=room,
+            creator=john,
+        )
+        Invitation.objects.create(reservation=reservation, invitee=peter)
+
+        new_invitation_data = [
+            {"invitee": peter, "status": Invitation.NOT_ATTENDING}
+        ]
+        serializer = ReservationSerializer(instance=reservation)
+        serializer.update_invitation_data(new_invitation_data)
+
+        self.assertEqual(
+            reservation.guests.get().status, Invitation.NOT_ATTENDING
+        )
+
+    def test_serializer_updates_invitations_with_a_constant_number_of_queries(
+        self,
+    ):
+        room = MeetingRoom.objects.create(title="Games room")
+        john = User.objects.create(username="john", password="123456")
+        guests = [
+            User.objects.create(username=f"guest{number}", password="123456")
+            for number in range(30)
+        ]
+        reservation = Reservation.objects.create(
+            title="All hands",
+            from_date=self.start,
+            to_date=self.end,
+            room=room,
+            creator=john,
+        )
+        for guest in guests[:20]:
+            Invitation.objects.create(reservation=reservation, invitee=guest)
+
+        new_invitation_data = [
+            {"invitee": guest, "status": Invitation.ATTENDING}
+            for guest in guests[10:]
+        ]
+        serializer = ReservationSerializer(instance=reservation)
+        # select, delete, insert and update inside a transaction, plus
+        # selecting the deleted invitations for their signals, recording the
+        # change for everyone and for the participants, who are selected,
+        # and the users whose cached lists are invalidated
+        with self.assertNumQueries(11):
+            serializer.update_invitation_data(new_invitation_data)
+
+        self.assertEqual(
+            set(reservation.guests.values_list("invitee", flat=True)),
+            {guest.id for guest in guests[10:]},
+        )
+        self.assertEqual(
+            reservation.guests.filter(status=Invitation.ATTENDING).count(), 20
+        )
@@ -0,0 +1,203 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+from reservations.models import (
+    MeetingRoom,
+    Reservation,
+    Invitation,
+    ReservationChange,
+)
+
+User = get_user_model()
+
+
+class SyncTests(APITransactionTestCase):
+    """
+    On PostgreSQL changes are ordered by the transactions writing them, and
+    only the committed ones are synced, so the tests commit
+    """
+
+    def setUp(self):
+        self.url = reverse("reservations-sync")
+        self.user = User.objects.create(username="jim", password="123456")
+        self.guest = User.objects.create(username="tom", password="123456")
+        self.room = MeetingRoom.objects.create(title="Board room")
+        self.reservations = [
+            Reservation.objects.create(
+                title=f"Meeting {number}",
+                from_date=f"2021-09-06T{9 + number:02}:00:00Z",
+                to_date=f"2021-09-06T{9 + number:02}:30:00Z",
+                room=self.room,
+                creator=self.user,
+            )
+            for number in range(3)
+        ]
+        self.invitation = Invitation.objects.create(
+            reservation=self.reservations[1], invitee=self.guest
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def sync(self, token=None, **params):
+        if token is not None:
+            params["since"] = token
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def sync_all(self, token=None, **params):
+        """Follow the tokens until the client is up to date"""
+        changed, deleted = [], []
+        while True:
+            data = self.sync(token, **params)
+            changed += [reservation["id"] for reservation in data["changed"]]
+            deleted += data["deleted"]
+            token = data["token"]
+            if not data["more"]:
+                return changed, deleted, token
+
+    def test_full_sync_then_nothing_changed(self):
+        changed, deleted, token = self.sync_all(page_size=2)
+        self.assertEqual(
+            changed, [reservation.id for reservation in self.reservations]
+        )
+        self.assertEqual(deleted, [])
+        self.assertEqual(self.sync(token)["changed"], [])
+
+    def test_changes_since_token(self):
+        _, _, token = self.sync_all()
+        created = self.client.post(
+            reverse("reservations-list"),
+            {
+                "title": "Review",
+                "from_date": "2021-09-06T15:00:00Z",
+                "to_date": "2021-09-06T16:00:00Z",
+                "room": self.room.id,
+                "creator": self.user.id,
+            },
+            format="json",
+        ).data
+        self.client.delete(
+            reverse("reservations-detail", args=[self.reservations[0].id])
+        )
+        self.invitation.status = Invitation.ATTENDING
+        self.invitation.save()
+
+        data = self.sync(token)
+        self.assertEqual(
+            [reservation["id"] for reservation in data["changed"]],
+            [self.reservations[1].id, created["id"]],
+        )
+        self.assertEqual(
+            data["changed"][0]["guests"][0]["status"], Invitation.ATTENDING
+        )
+        self.assertEqual(data["deleted"], [self.reservations[0].id])
+        self.assertFalse(data["more"])
+        self.assertEqual(self.sync(data["token"])["changed"], [])
+
+    def test_changes_are_paged(self):
+        _, _, token = self.sync_all()
+        for reservation in self.reservations:
+            reservation.title += " (moved)"
+            reservation.save()
+        changed, _, _ = self.sync_all(token, page_size=2)
+        self.assertEqual(
+            changed, [reservation.id for reservation in self.reservations]
+        )
+
+    def test_reservations_leaving_the_users_scope_are_deleted(self):
+        changed, _, token = self.sync_all(user_id=self.guest.id)
+        self.assertEqual(changed, [self.reservations[1].id])
+        self.client.patch(
+            reverse("reservations-detail", args=[self.reservations[1].id]),
+            {"guests": []},
+            format="json",
+        )
+        self.assertEqual(
+            self.sync_all(token, user_id=self.guest.id)[:2],
+            ([], [self.reservations[1].id]),
+        )
+
+    def test_users_only_get_the_changes_of_their_reservations(self):
+        _, _, token = self.sync_all(user_id=self.guest.id)
+        other = self.reservations[0]
+        other.title = "Someone else's"
+        other.save()
+        self.invitation.status = Invitation.ATTENDING
+        self.invitation.save()
+        self.assertEqual(
+            self.sync_all(token, user_id=self.guest.id)[:2],
+            ([self.reservations[1].id], []),
+        )
+
+        _, _, token = self.sync_all(user_id=self.guest.id)
+        deleted = [other.id, self.reservations[1].id]
+        other.delete()
+        self.reservations[1].delete()
+        self.assertEqual(
+            self.sync_all(token, user_id=self.guest.id)[:2], ([], deleted[1:])
+        )
+        # the creator learns about both
+        self.assertEqual(
+            self.sync_all(token, user_id=self.user.id)[:2], ([], deleted)
+        )
+
+    def test_a_previous_creator_gets_the_change(self):
+        _, _, token = self.sync_all(user_id=self.user.id)
+        self.reservations[2].creator = self.guest
+        self.reservations[2].save()
+        self.assertEqual(
+            self.sync_all(token, user_id=self.user.id)[:2],
+            ([], [self.reservations[2].id]),
+        )
+
+    def test_batch_bookings_and_cascading_deletes_are_recorded(self):
+        _, _, token = self.sync_all()
+        response = self.client.post(
+            reverse("reservations-batch"),
+            [
+                {
+                    "title": "Sync",
+                    "from_date": "2021-09-07T09:00:00Z",
+                    "to_date": "2021-09-07T10:00:00Z",
+                    "room": self.room.id,
+                    "creator": self.user.id,
+                }
+            ],
+            format="json",
+        )
+        booked = response.data["results"][0]["id"]
+        changed, _, token = self.sync_all(token)
+        self.assertEqual(changed, [booked])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.delete(reverse("rooms-detail", args=[self.room.id]))
+        # one query records the whole cascade, one for its participants
+        self.assertEqual(
+            sum(
+                query["sql"].startswith("INSERT INTO")
+                and "change" in query["sql"]
+                for query in queries
+            ),
+            2,
+        )
+        _, deleted, _ = self.sync_all(token)
+        self.assertEqual(
+            deleted,
+            sorted([booked, *(item.id for item in self.reservations)]),
+        )
+        self.assertEqual(ReservationChange.objects.count(), 4)
+
+    def test_invalid_parameters(self):
+        for params in (
+            {"since": "invalid"},
+            {"since": "e30="},
+            {"user_id": "x"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
@@ -0,0 +1,53 @@
+import secrets
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from .cache import get_cache
+
+SALT = "reservations.tickets"
+
+User = get_user_model()
+
+
+def get_ticket_timeout():
+    """Seconds a ticket to open a room's event stream with is valid"""
+    return getattr(settings, "RESERVATIONS_EVENTS_TICKET_TIMEOUT", 30)
+
+
+def issue_ticket(user, room_id):
+    """
+    A ticket for `user` to open the event stream of a room with. It goes in
+    the URL instead of the token, which would end up in access logs, and
+    is signed rather than stored, so any process can check it
+    """
+    return signing.dumps(
+        {"user": user.pk, "room": room_id, "nonce": secrets.token_urlsafe(9)},
+        salt=SALT,
+    )
+
+
+def redeem_ticket(ticket, room_id):
+    """
+    The user a ticket to open the event stream of a room was issued to.
+    Tickets are used once, as far as the reservations cache tells, then
+    expire after get_ticket_timeout(). Raises AuthenticationFailed
+    otherwise
+    """
+    timeout = get_ticket_timeout()
+    try:
+        data = signing.loads(ticket, salt=SALT, max_age=timeout)
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed(_("Invalid or expired ticket."))
+    if data.get("room") != room_id:
+        raise exceptions.AuthenticationFailed(_("Invalid or expired ticket."))
+    cache = get_cache()
+    if cache is not None and not cache.add(
+        f"ticket:{data['nonce']}", True, timeout
+    ):
+        raise exceptions.AuthenticationFailed(_("Ticket already used."))
+    user = User.objects.filter(pk=data["user"], is_active=True).first()
+    if user is None:
+        raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+    return user
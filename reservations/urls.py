@@ -1,4 +1,6 @@
+from django.urls import path
 from rest_framework import routers
+from . import async_views
 from .views import MeetingRoomViewset, ReservationViewset
 
 app_name = "reservations"
@@ -6,3 +8,22 @@ app_name = "reservations"
 router = routers.SimpleRouter()
 router.register(r"reservations", ReservationViewset, basename="reservations")
 router.register(r"rooms", MeetingRoomViewset, basename="rooms")
+
+# async views for the busiest reads, served under ASGI
+async_urlpatterns = [
+    path(
+        "reservations/",
+        async_views.reservation_list,
+        name="async-reservations-list",
+    ),
+    path(
+        "reservations/<pk>/",
+        async_views.reservation_detail,
+        name="async-reservations-detail",
+    ),
+    path(
+        "rooms/availability/",
+        async_views.room_availability,
+        name="async-rooms-availability",
+    ),
+]
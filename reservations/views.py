@@ -1,43 +1,314 @@
 import logging
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch
 from django.db.models.query_utils import Q
-from rest_framework import viewsets
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import serializers, viewsets
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from meetings.pagination import KeysetPagination
+from .analytics import cached_report
+from .availability import find_free_slots
+from .batch import book_reservations, get_batch_max_size
+from .cache import ROOM, USER, batched_invalidation, cached_user_list
+from .changes import batched_changes
+from .export import CONTENT_TYPES, export, exported_reservations
+from .ics import ICalendarRenderer, calendar_response
+from .intervals import window_filter
 from .models import MeetingRoom, Reservation, Invitation
+from .representations import (
+    fast_reads_enabled,
+    represent_availability,
+    represent_reservations,
+    represent_rooms,
+    reservation_values,
+)
+from .schedule import batched_schedules, week_grid
 from .serializers import (
+    AnalyticsSerializer,
+    AvailabilitySerializer,
+    ExportSerializer,
     MeetingRoomSerializer,
     ReservationSerializer,
     InvitationSerializer,
+    ScheduleSerializer,
 )
+from .sync import changes_since
+from .tickets import get_ticket_timeout, issue_ticket
 
 logger = logging.getLogger("django")
 
+User = get_user_model()
+
+# a client asking for text/calendar gets errors as text instead of a 406
+CALENDAR_RENDERERS = [
+    *api_settings.DEFAULT_RENDERER_CLASSES,
+    ICalendarRenderer,
+]
+
+
+def reservations_with_guests():
+    """
+    Reservations with their invitations prefetched in one extra query. The
+    prefetch also caches each invitation's reservation, which
+    InvitationSerializer renders
+    """
+    return Reservation.objects.prefetch_related(
+        Prefetch("guests", queryset=Invitation.objects.order_by("id"))
+    )
+
+
+def user_filter(user_id):
+    """
+    Reservations a user created or is invited to. The invitations are
+    checked in a subquery rather than a join, which would repeat
+    reservations the user both created and is invited to
+    """
+    return Q(creator__id=user_id) | Q(
+        id__in=Invitation.objects.filter(invitee_id=user_id).values(
+            "reservation_id"
+        )
+    )
+
+
+def get_window(query_params):
+    """
+    Get the optional `from` and `to` datetimes limiting listed reservations
+    to the ones overlapping that window
+    """
+    field = serializers.DateTimeField()
+    window = []
+    for name in ("from", "to"):
+        value = query_params.get(name, None)
+        if value is not None:
+            try:
+                value = field.to_internal_value(value)
+            except serializers.ValidationError as error:
+                raise serializers.ValidationError({name: error.detail})
+        window.append(value)
+    return window
+
+
+def get_room_window_days():
+    return getattr(settings, "RESERVATIONS_ROOM_WINDOW_DAYS", 30)
+
+
+def get_room_window(query_params):
+    """
+    The window the reservations nested in rooms are limited to, so that a
+    room doesn't list its whole history: `from` - `to`, a missing end being
+    RESERVATIONS_ROOM_WINDOW_DAYS days from the other one, or the days from
+    now when neither is given
+    """
+    start, end = get_window(query_params)
+    length = timedelta(days=get_room_window_days())
+    if start is None and end is None:
+        start = timezone.now()
+    if start is None:
+        start = end - length
+    if end is None:
+        end = start + length
+    return start, end
+
+
+class ReservationPagination(KeysetPagination):
+    ordering = ("from_date", "id")
+
 
 class ReservationViewset(viewsets.ModelViewSet):
     serializer_class = ReservationSerializer
+    pagination_class = ReservationPagination
 
     def get_queryset(self):
+        return self.filter_reservations(reservations_with_guests())
+
+    def filter_reservations(self, queryset):
         """
         Shows only reservations related to the provided user, if the
-        user_id is provided as a query parameter in the URL
+        user_id is provided as a query parameter in the URL, and only the
+        ones overlapping the `from` - `to` window if it is provided
         """
-        queryset = Reservation.objects.all()
+        queryset = queryset.filter(
+            window_filter(*get_window(self.request.query_params))
+        )
         user_id = self.request.query_params.get("user_id", None)
         if user_id is not None:
             logger.info(f"Filtering reservations with user_id: {user_id}")
-            queryset = queryset.filter(
-                Q(creator__id=user_id) | Q(attendees__id=user_id)
-            )
+            queryset = queryset.filter(user_filter(user_id))
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        Lists of a user's reservations are cached until any of them changes
+        """
+
+        def get_response():
+            if fast_reads_enabled():
+                return self.fast_list()
+            return super(ReservationViewset, self).list(
+                request, *args, **kwargs
+            )
+
+        user_id = request.query_params.get("user_id", None)
+        if user_id is None:
+            return get_response()
+        return cached_user_list(request, user_id, get_response)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not fast_reads_enabled():
+            return super().retrieve(request, *args, **kwargs)
+        row = get_object_or_404(
+            self.filter_reservations(
+                reservation_values(Reservation.objects.all())
+            ),
+            pk=kwargs["pk"],
+        )
+        self.check_object_permissions(request, row)
+        return Response(represent_reservations([row])[0])
+
+    def fast_list(self):
+        """
+        The list built from rows rather than through the serializer, which
+        costs several times more than the queries for long lists
+        """
+        page = self.paginate_queryset(
+            self.filter_reservations(
+                reservation_values(Reservation.objects.all())
+            )
+        )
+        return self.get_paginated_response(represent_reservations(page))
+
+    @action(detail=False, renderer_classes=CALENDAR_RENDERERS)
+    def calendar(self, request):
+        """
+        Streams the reservations the user given by `user_id` created or is
+        invited to as an iCalendar feed
+        """
+        user_id = request.query_params.get("user_id", "")
+        if not user_id.isdigit():
+            raise serializers.ValidationError(
+                {"user_id": ["A user id is required"]}
+            )
+        user = get_object_or_404(User, pk=user_id)
+        return calendar_response(
+            request,
+            Reservation.objects.filter(user_filter(user.id)),
+            f"Meetings of {user.username}",
+            user.id,
+            USER,
+        )
+
+    @action(detail=False)
+    def export(self, request):
+        """
+        Streams every reservation overlapping the optional `from` - `to`
+        window, of the given `rooms`, with their guests as CSV or JSON Lines
+        """
+        query = ExportSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        reservations = exported_reservations(
+            params.get("from"), params.get("to"), params.get("rooms")
+        )
+        output = params["output"]
+        filename = f"reservations.{output}"
+        if params["gzip"]:
+            content_type = "application/gzip"
+            filename += ".gz"
+        else:
+            content_type = f"{CONTENT_TYPES[output]}; charset=utf-8"
+        response = StreamingHttpResponse(
+            export(reservations, output, params["gzip"]),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{filename}"'
+        )
+        return response
+
+    @action(detail=False)
+    def sync(self, request):
+        """
+        The reservations created or changed since the `since` token, with
+        the ids of the deleted ones, so clients only fetch what changed.
+        Limited to the reservations of the user given by `user_id`, if any
+        """
+        reservations = Reservation.objects.all()
+        user_id = request.query_params.get("user_id", None)
+        if user_id is not None:
+            if not user_id.isdigit():
+                raise serializers.ValidationError(
+                    {"user_id": ["A valid user id is required"]}
+                )
+            reservations = reservations.filter(user_filter(user_id))
+        return Response(
+            changes_since(
+                reservations,
+                request.query_params.get("since", None),
+                self.paginator.get_page_size(request),
+                user_id=user_id,
+            )
+        )
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """
+        Book a list of reservations at once. Every item is booked unless it
+        is invalid or overlaps another reservation, and gets its own result
+        """
+        if not isinstance(request.data, list):
+            raise serializers.ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        "Expected a list of reservations"
+                    ]
+                }
+            )
+        max_size = get_batch_max_size()
+        if len(request.data) > max_size:
+            raise serializers.ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        f"A batch can't contain more than {max_size} "
+                        f"reservations"
+                    ]
+                }
+            )
+        return Response({"results": book_reservations(request.data)})
+
+    def perform_destroy(self, instance):
+        with transaction.atomic(), batched_invalidation(), batched_changes():
+            instance.delete()
+
 
 class MeetingRoomViewset(viewsets.ModelViewSet):
     serializer_class = MeetingRoomSerializer
 
     def get_queryset(self):
+        window = get_room_window(self.request.query_params)
+        return self.filter_rooms(
+            MeetingRoom.objects.prefetch_related(
+                Prefetch(
+                    "reservations",
+                    queryset=reservations_with_guests()
+                    .filter(window_filter(*window))
+                    .order_by("from_date", "id"),
+                )
+            )
+        )
+
+    def filter_rooms(self, queryset):
         """
         Shows only reservations related to the provided user, if the
-        user_id is provided as a query parameter in the URL
+        user_id is provided as a query parameter in the URL. Nested
+        reservations are limited to the window of get_room_window()
         """
-        queryset = MeetingRoom.objects.all()
         user_id = self.request.query_params.get("user_id", None)
         if user_id is not None:
             logger.info(f"Filtering reservations with user_id: {user_id}")
@@ -46,3 +317,111 @@ class MeetingRoomViewset(viewsets.ModelViewSet):
                 | Q(reservations__attendees__id=user_id),
             ).distinct()
         return queryset
+
+    def represent(self, rooms):
+        """
+        Build rooms from rows rather than through the serializer, with
+        their reservations in the `from` - `to` window fetched in one query
+        """
+        reservations = reservation_values(
+            Reservation.objects.filter(
+                window_filter(*get_room_window(self.request.query_params)),
+                room_id__in=[room["id"] for room in rooms],
+            ).order_by("room_id", "from_date", "id")
+        )
+        return represent_rooms(rooms, list(reservations))
+
+    def list(self, request, *args, **kwargs):
+        if not fast_reads_enabled():
+            return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(
+            self.filter_rooms(MeetingRoom.objects.all()).values("id", "title")
+        )
+        return self.get_paginated_response(self.represent(page))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not fast_reads_enabled():
+            return super().retrieve(request, *args, **kwargs)
+        room = get_object_or_404(
+            self.filter_rooms(MeetingRoom.objects.all()).values("id", "title"),
+            pk=kwargs["pk"],
+        )
+        self.check_object_permissions(request, room)
+        return Response(self.represent([room])[0])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic(), batched_invalidation(), batched_changes():
+            # the days of the room go with it
+            with batched_schedules():
+                instance.delete()
+
+    @action(detail=True, renderer_classes=CALENDAR_RENDERERS)
+    def calendar(self, request, pk=None):
+        """Streams the room's reservations as an iCalendar feed"""
+        room = get_object_or_404(MeetingRoom, pk=pk)
+        return calendar_response(
+            request, room.reservations.all(), room.title, room.id, ROOM
+        )
+
+    @action(detail=True, methods=["post"], url_path="events/ticket")
+    def events_ticket(self, request, pk=None):
+        """
+        Issues a ticket to open the room's event stream with, since the
+        stream's URL is the only place EventSource can put credentials in
+        """
+        room = get_object_or_404(MeetingRoom, pk=pk)
+        return Response(
+            {
+                "ticket": issue_ticket(request.user, room.id),
+                "expires_in": get_ticket_timeout(),
+            }
+        )
+
+    @action(detail=False)
+    def availability(self, request):
+        """
+        Shows the free slots of at least `duration` minutes between `from`
+        and `to` of every room which has any
+        """
+        query = AvailabilitySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        available = find_free_slots(
+            params["from"],
+            params["to"],
+            timedelta(minutes=params["duration"]),
+            room_ids=params.get("rooms"),
+        )
+        return Response(represent_availability(available))
+
+    @action(detail=False)
+    def schedule(self, request):
+        """
+        Shows the reservations of every room, or of the comma separated
+        `rooms`, day by day for `days` days from `from`
+        """
+        query = ScheduleSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        return Response(
+            {
+                "from": params["from"],
+                "days": params["days"],
+                "results": week_grid(
+                    params["from"], params["days"], params.get("rooms")
+                ),
+            }
+        )
+
+    @action(detail=False)
+    def analytics(self, request):
+        """
+        Shows the utilization of every room, or of the comma separated
+        `rooms`, from the `from` day to the `to` day
+        """
+        query = AnalyticsSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        return Response(
+            cached_report(params["from"], params["to"], params.get("rooms"))
+        )